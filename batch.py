@@ -0,0 +1,246 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator
+
+from instance import Instance
+from solution import Solution
+from solver import SOLVERS
+
+# 出力レコードの列（CSVのヘッダ順）
+FIELDS = ["id", "solver", "status", "is_feasible", "total_distance", "num_vehicles_used", "runtime_s", "routes", "error"]
+
+
+def iter_instance_specs(source: str) -> Iterator[tuple[str, dict]]:
+    """入力元から (インスタンスID, 読み込み用の指定) を1件ずつ遅延して返す
+
+    - ディレクトリ: 中の .vrp / .tsp ファイル（ID はファイル名）
+    - .jsonl ファイル: 1行1インスタンス。以下のどちらかの形式
+        {"id": ..., "num_customers": N, "num_vehicles": K, "capacity": Q, "seed": s}（乱数生成）
+        {"id": ..., "xs": [...], "ys": [...], "demands": [...], "num_vehicles": K, "capacity": Q}（index 0 がデポ）
+    インスタンス本体はワーカー側で作るので、呼び出し側のメモリは件数によらず一定。
+    """
+    if os.path.isdir(source):
+        with os.scandir(source) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_file() and entry.name.endswith((".vrp", ".tsp")):
+                    yield os.path.splitext(entry.name)[0], {"path": entry.path}
+        return
+
+    with open(source) as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            yield str(record.get("id", lineno)), record
+
+
+def load_instance(spec: dict, *, cache_dir: str | None = None) -> Instance:
+    """iter_instance_specs の指定から Instance を作る"""
+    if "path" in spec:
+        from cvrplib import load_cvrplib
+        return load_cvrplib(spec["path"], cache_dir=cache_dir)
+    if "xs" in spec:
+        return Instance.from_arrays(
+            spec["xs"], spec["ys"], spec["demands"], spec["num_vehicles"], spec["capacity"], name=spec.get("id"),
+        )
+    return Instance(spec["num_customers"], spec["num_vehicles"], spec["capacity"], seed=spec.get("seed", 42))
+
+
+def solve_chain(instance: Instance, chain: list[str]) -> Solution:
+    """ソルバーの連鎖で解く: 先頭で初期解を作り、以降は improve() を持つソルバーで順に改善する"""
+    solution = SOLVERS[chain[0]](instance).solve()
+    for name in chain[1:]:
+        improver = SOLVERS[name](instance)
+        if not hasattr(improver, "improve"):
+            raise ValueError(f"{name} は改善ソルバーではありません（improve() がありません）")
+        solution = improver.improve(solution)
+    return solution
+
+
+def run_batch(
+    source: str,
+    out_path: str,
+    chain: list[str],
+    *,
+    workers: int | None = None,
+    cache_dir: str | None = None,
+    resume: bool = True,
+) -> dict:
+    """入力元の全インスタンスをワーカープールで解き、終わった順に out_path へ追記する
+
+    - 同時に投入するジョブ数をワーカー数の2倍までに抑え、未処理のインスタンスを溜め込まない
+    - resume=True なら、out_path に結果がある ID は解かずに飛ばす
+    - 戻り値: {"solved", "skipped", "errors", "wall_time_s"}
+    """
+    for name in chain:
+        if name not in SOLVERS:
+            raise ValueError(f"未知のソルバーです: {name}")
+    for name in chain[1:]:
+        if not hasattr(SOLVERS[name], "improve"):
+            raise ValueError(f"{name} は改善ソルバーではありません（improve() がありません）")
+    start = time.perf_counter()
+    done_ids = _completed_ids(out_path) if resume else set()
+    workers = workers or os.cpu_count() or 1
+    window = 2 * workers
+    counts = {"solved": 0, "skipped": 0, "errors": 0}
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with _ResultWriter(out_path, append=resume) as writer, ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: dict = {}
+        for instance_id, spec in iter_instance_specs(source):
+            if instance_id in done_ids:
+                counts["skipped"] += 1
+                continue
+            if len(pending) >= window:
+                _drain(pending, writer, counts, chain)
+            pending[executor.submit(_solve_one, instance_id, spec, chain, cache_dir)] = instance_id
+        while pending:
+            _drain(pending, writer, counts, chain)
+
+    counts["wall_time_s"] = time.perf_counter() - start
+    return counts
+
+
+# ===== 内部ヘルパー =====
+def _solve_one(instance_id: str, spec: dict, chain: list[str], cache_dir: str | None) -> dict:
+    """ワーカー内で1インスタンスを解き、出力レコードを返す（例外もレコードにする）"""
+    record = dict.fromkeys(FIELDS)
+    record.update({"id": instance_id, "solver": "+".join(chain)})
+    start = time.perf_counter()
+    try:
+        solution = solve_chain(load_instance(spec, cache_dir=cache_dir), chain)
+    except Exception as e:
+        record.update({"status": "Error", "is_feasible": False, "error": repr(e), "runtime_s": time.perf_counter() - start})
+        return record
+    record.update({
+        "solver": solution.solver_name,
+        "status": solution.status,
+        "is_feasible": bool(solution.is_feasible),
+        "total_distance": float(solution["total_distance"]),
+        "num_vehicles_used": solution.num_vehicles_used(),
+        "runtime_s": time.perf_counter() - start,
+        "routes": {str(k): [int(c) for c in r] for k, r in solution.routes.items()},
+    })
+    return record
+
+
+def _drain(pending: dict, writer: "_ResultWriter", counts: dict, chain: list[str]):
+    """完了したジョブを1件以上待って書き出し、pending から取り除く"""
+    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in finished:
+        instance_id = pending.pop(future)
+        try:
+            record = future.result()
+        except Exception as e:
+            # ワーカーごと落ちた場合など、_solve_one の外で起きた失敗
+            record = dict.fromkeys(FIELDS)
+            record.update({"id": instance_id, "solver": "+".join(chain), "status": "Error", "is_feasible": False, "error": repr(e)})
+        writer.write(record)
+        counts["errors" if record["status"] == "Error" else "solved"] += 1
+
+
+def _completed_ids(path: str) -> set[str]:
+    """既存の出力から結果のある ID を集める（途中で切れた最終行は無視）"""
+    if not os.path.exists(path):
+        return set()
+    ids: set[str] = set()
+    with open(path, newline="") as f:
+        # 改行で終わらない最終行は書き込み途中で落ちたもの（CSV は途中まででも行として読めてしまう）。
+        # 出力全体は読み込まず、1行ずつ流す
+        lines = (line for line in f if line.endswith("\n"))
+        if path.endswith(".csv"):
+            for row in csv.DictReader(lines):
+                if row.get("id") and row.get("status") != "Error":
+                    ids.add(row["id"])
+        else:
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("status") != "Error":
+                    ids.add(str(record["id"]))
+    return ids
+
+
+def _truncate_partial_line(path: str):
+    """途中で落ちた実行が残した、改行で終わらない最終行を切り捨てる（続けて書く行がつながらないように）"""
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # 末尾から最後の改行を探す（大きなファイルでも末尾だけを読む）
+        end = size
+        while end > 0:
+            begin = max(0, end - 65536)
+            f.seek(begin)
+            chunk = f.read(end - begin)
+            i = chunk.rfind(b"\n")
+            if i >= 0:
+                f.truncate(begin + i + 1)
+                return
+            end = begin
+        f.truncate(0)
+
+
+class _ResultWriter:
+    """結果を1件ずつ JSONL または CSV に書き出す（書くたびに flush）"""
+
+    def __init__(self, path: str, append: bool):
+        self.path = path
+        self.csv = path.endswith(".csv")
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            _truncate_partial_line(path)
+            exists = os.path.getsize(path) > 0
+        self.file = open(path, "a" if append else "w", newline="")
+        self.writer = None
+        if self.csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+            if not exists:
+                self.writer.writeheader()
+
+    def write(self, record: dict):
+        if self.csv:
+            row = dict(record)
+            row["routes"] = json.dumps(row["routes"]) if row["routes"] is not None else ""
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="多数のVRPインスタンスを並列に解いて結果をストリーム出力する")
+    parser.add_argument("source", help="入力（.vrp/.tsp のディレクトリ、または .jsonl ファイル）")
+    parser.add_argument("--out", required=True, help="出力先（.jsonl または .csv）")
+    parser.add_argument("--chain", nargs="+", default=["NN", "LS"], choices=list(SOLVERS), help="ソルバーの連鎖（先頭で構築、以降で改善）")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", default=None, help="CVRPLIB 距離行列のキャッシュ先")
+    parser.add_argument("--no-resume", action="store_true", help="既存の結果を無視して最初から解き直す")
+    args = parser.parse_args(argv)
+
+    counts = run_batch(
+        args.source, args.out, args.chain,
+        workers=args.workers, cache_dir=args.cache_dir, resume=not args.no_resume,
+    )
+    print(
+        f"solved={counts['solved']} skipped={counts['skipped']} errors={counts['errors']} "
+        f"time={counts['wall_time_s']:.2f}s -> {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
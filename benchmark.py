@@ -0,0 +1,301 @@
+import argparse
+import csv
+import datetime
+import gc
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict, fields
+
+from instance import Instance
+from solver import SOLVERS
+
+
+@dataclass
+class BenchmarkRecord:
+    """1インスタンス x 1ソルバーの計測結果
+
+    - runtime_s: solve() の実行時間（perf_counter、tracemalloc なしで計測）
+    - peak_memory_bytes: solve() 中の Python ヒープのピーク（tracemalloc、別実行で計測）
+    - gap: 参照値に対する相対差 (objective - reference) / reference
+    - reference_source: 'MIP'（同一インスタンスでMIPが最適解を出した場合）または 'best'（計測中の最良値）
+    """
+
+    solver: str
+    num_customers: int
+    num_vehicles: int
+    capacity: int
+    seed: int
+    status: str
+    is_feasible: bool
+    objective: float | None
+    num_vehicles_used: int | None
+    runtime_s: float | None
+    peak_memory_bytes: int | None
+    instance_build_s: float
+    gap: float | None = None
+    reference: float | None = None
+    reference_source: str | None = None
+    error: str | None = None
+
+
+def run_benchmark(
+    solver_names: list[str],
+    customers: list[int],
+    vehicles: list[int],
+    capacities: list[int],
+    seeds: list[int],
+    *,
+    track_memory: bool = True,
+    mip_max_customers: int = 10,
+) -> list[BenchmarkRecord]:
+    """顧客数・車両数・容量・シードの全組み合わせで各ソルバーを計測する"""
+    records: list[BenchmarkRecord] = []
+    for n, k, cap, seed in itertools.product(customers, vehicles, capacities, seeds):
+        instance = Instance(n, k, cap, seed=seed)
+        build_s = instance.distance_stats.get("build_time_s", 0.0)
+        group: list[BenchmarkRecord] = []
+        for name in solver_names:
+            if name == "MIP" and n > mip_max_customers:
+                continue
+            record = _measure(name, instance, seed, build_s, track_memory)
+            print(
+                f"[{name}] N={n} K={k} Q={cap} seed={seed}: "
+                f"obj={_fmt(record.objective)} time={_fmt(record.runtime_s, '.4f')}s status={record.status}"
+            )
+            group.append(record)
+        _fill_gaps(group)
+        records.extend(group)
+    return records
+
+
+def write_results(records: list[BenchmarkRecord], path: str) -> None:
+    """拡張子に応じて JSON（メタ情報付き）または CSV で書き出す"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[fl.name for fl in fields(BenchmarkRecord)])
+            writer.writeheader()
+            for r in records:
+                writer.writerow(asdict(r))
+    else:
+        payload = {"meta": _run_meta(), "results": [asdict(r) for r in records]}
+        with open(path, "w") as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+    print(f"Saved benchmark results: {path}")
+
+
+def load_results(path: str) -> list[dict]:
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            return list(csv.DictReader(f))
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare_results(baseline: list[dict], current: list[dict]) -> None:
+    """同じ (ソルバー, N, K, Q, seed) の実行時間と目的関数値を比較して表示"""
+    def key(r: dict):
+        return (r["solver"], int(r["num_customers"]), int(r["num_vehicles"]), int(r["capacity"]), int(r["seed"]))
+
+    base = {key(r): r for r in baseline}
+    print(f"{'solver':<14}{'N':>7}{'K':>5}{'Q':>6}{'seed':>6}{'time ratio':>12}{'obj diff':>12}")
+    for r in current:
+        b = base.get(key(r))
+        if b is None or not b["runtime_s"] or not r["runtime_s"]:
+            continue
+        ratio = float(r["runtime_s"]) / float(b["runtime_s"])
+        obj_diff = (
+            float(r["objective"]) - float(b["objective"])
+            if r["objective"] not in (None, "") and b["objective"] not in (None, "")
+            else None
+        )
+        solver, n, k, cap, seed = key(r)
+        print(f"{solver:<14}{n:>7}{k:>5}{cap:>6}{seed:>6}{ratio:>12.2f}{_fmt(obj_diff):>12}")
+
+
+# 起動時に読み込まれてはいけない重い依存（使うソルバー・描画でだけ読み込む）
+HEAVY_MODULES = ("matplotlib", "pulp", "vroom", "pandas")
+
+
+def check_import_time(
+    module: str = "main",
+    *,
+    max_ratio: float = 2.0,
+    budget_s: float | None = None,
+    repeats: int = 3,
+    heavy: tuple[str, ...] = HEAVY_MODULES,
+) -> dict:
+    """python -X importtime で module の読み込み時間を測り、起動が遅くなっていないか調べる
+
+    別プロセスで `import module` だけを実行し、-X importtime の出力から
+    module の累積読み込み時間と、読み込まれたモジュールの一覧を得る。
+    時間は機械の速さで変わるので、同じ実行の中で測った `import numpy` の時間を基準にする
+    （それぞれ repeats 回測った最小値）。
+    - ok: heavy のどれも読み込まれておらず、累積時間が numpy の max_ratio 倍以下
+      （budget_s を指定したときは、その秒数以下であることも求める）
+    """
+    cumulative_s, imported = _import_time(module, repeats)
+    baseline_s, _ = _import_time("numpy", repeats)
+    heavy_imported = sorted(m for m in heavy if m in imported)
+    ratio = None if cumulative_s is None or not baseline_s else cumulative_s / baseline_s
+    ok = cumulative_s is not None and not heavy_imported and ratio is not None and ratio <= max_ratio
+    if budget_s is not None:
+        ok = ok and cumulative_s <= budget_s
+    return {
+        "module": module,
+        "cumulative_s": cumulative_s,
+        "numpy_s": baseline_s,
+        "ratio": ratio,
+        "max_ratio": max_ratio,
+        "budget_s": budget_s,
+        "heavy_imported": heavy_imported,
+        "ok": ok,
+    }
+
+
+# ===== 内部ヘルパー =====
+def _measure(name: str, instance: Instance, seed: int, build_s: float, track_memory: bool) -> BenchmarkRecord:
+    cls = SOLVERS[name]
+    record = BenchmarkRecord(
+        solver=name,
+        num_customers=instance.num_customers,
+        num_vehicles=instance.num_vehicles,
+        capacity=instance.capacity,
+        seed=seed,
+        status="Error",
+        is_feasible=False,
+        objective=None,
+        num_vehicles_used=None,
+        runtime_s=None,
+        peak_memory_bytes=None,
+        instance_build_s=build_s,
+    )
+    try:
+        gc.collect()
+        solver = cls(instance)
+        start = time.perf_counter()
+        solution = solver.solve()
+        record.runtime_s = time.perf_counter() - start
+
+        if track_memory:
+            # tracemalloc は実行を遅くするため、時間計測とは別に実行する
+            gc.collect()
+            solver = cls(instance)
+            tracemalloc.start()
+            try:
+                solver.solve()
+                _, record.peak_memory_bytes = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+    except Exception as e:
+        record.error = repr(e)
+        return record
+
+    record.status = solution.status
+    record.is_feasible = bool(solution.is_feasible) and solution.status != "Partial"
+    record.objective = float(solution.objective_value)
+    record.num_vehicles_used = solution.num_vehicles_used()
+    return record
+
+
+def _import_time(module: str, repeats: int) -> tuple[float | None, set[str]]:
+    """別プロセスで -X importtime を repeats 回実行し、module の累積読み込み時間の最小値と読み込まれたパッケージを返す"""
+    best_us = None
+    imported: set[str] = set()
+    for _ in range(max(1, repeats)):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        # 各行: "import time: <self [us]> | <cumulative> | <インデント付きのモジュール名>"
+        for line in result.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) != 3 or not line.startswith("import time:"):
+                continue
+            imported.add(parts[2].strip().split(".")[0])
+            if parts[2] == f" {module}" and parts[1].strip().isdigit():
+                us = int(parts[1])
+                best_us = us if best_us is None else min(best_us, us)
+    return (None if best_us is None else best_us / 1e6), imported
+
+
+def _fill_gaps(group: list[BenchmarkRecord]) -> None:
+    """同一インスタンスの結果に参照値とギャップを書き込む"""
+    mip = [r for r in group if r.solver == "MIP" and r.status == "Optimal" and r.objective is not None]
+    if mip:
+        reference, source = mip[0].objective, "MIP"
+    else:
+        feasible = [r.objective for r in group if r.is_feasible and r.objective is not None]
+        if not feasible:
+            return
+        reference, source = min(feasible), "best"
+    for r in group:
+        r.reference = reference
+        r.reference_source = source
+        if r.objective is not None and reference > 0:
+            r.gap = (r.objective - reference) / reference
+
+
+def _run_meta() -> dict:
+    meta = {"timestamp": datetime.datetime.now().isoformat(timespec="seconds")}
+    try:
+        meta["commit"] = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        meta["commit"] = None
+    return meta
+
+
+def _fmt(value, spec: str = ".2f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="VRPソルバーのスケーリングベンチマーク")
+    parser.add_argument("--solvers", nargs="+", default=["NN", "Sweep", "SweepNearest", "Savings"], choices=list(SOLVERS))
+    parser.add_argument("--customers", nargs="+", type=int, default=[50, 200, 1000])
+    parser.add_argument("--vehicles", nargs="+", type=int, default=[100])
+    parser.add_argument("--capacities", nargs="+", type=int, default=[30])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[42])
+    parser.add_argument("--mip-max-customers", type=int, default=10, help="MIPを実行する最大顧客数")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc によるメモリ計測を省略")
+    parser.add_argument("--out", default=None, help="出力先（.json または .csv）")
+    parser.add_argument("--compare", default=None, help="比較対象の過去の結果ファイル")
+    parser.add_argument("--import-time", nargs="*", default=None, metavar="MODULE", help="ベンチマークの代わりに起動時の読み込み時間を調べる（省略時は main）")
+    parser.add_argument("--import-ratio", type=float, default=2.0, help="--import-time: import numpy の何倍までを許すか")
+    parser.add_argument("--import-budget", type=float, default=None, help="--import-time: 絶対時間の上限（秒、指定したときだけ調べる）")
+    args = parser.parse_args(argv)
+
+    if args.import_time is not None:
+        failed = False
+        for module in args.import_time or ["main"]:
+            r = check_import_time(module, max_ratio=args.import_ratio, budget_s=args.import_budget)
+            budget = "" if r["budget_s"] is None else f" budget={r['budget_s']:.3f}s"
+            print(
+                f"import {r['module']}: {_fmt(r['cumulative_s'], '.3f')}s "
+                f"(numpy {_fmt(r['numpy_s'], '.3f')}s, x{_fmt(r['ratio'])} <= x{r['max_ratio']:.2f}{budget}) "
+                f"heavy={','.join(r['heavy_imported']) or '-'} {'OK' if r['ok'] else 'FAIL'}"
+            )
+            failed |= not r["ok"]
+        sys.exit(1 if failed else 0)
+
+    records = run_benchmark(
+        args.solvers, args.customers, args.vehicles, args.capacities, args.seeds,
+        track_memory=not args.no_memory, mip_max_customers=args.mip_max_customers,
+    )
+    out = args.out or os.path.join("results", f"benchmark_{datetime.datetime.now():%Y%m%d%H%M%S}.json")
+    write_results(records, out)
+    if args.compare:
+        compare_results(load_results(args.compare), [asdict(r) for r in records])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import hashlib
+import math
+import os
+import re
+import time
+
+import numpy as np
+
+from instance import Instance, build_distance_matrix
+
+# 明示的な距離行列（EXPLICIT）で対応している EDGE_WEIGHT_FORMAT
+EXPLICIT_FORMATS = ("FULL_MATRIX", "LOWER_ROW", "LOWER_DIAG_ROW", "UPPER_ROW", "UPPER_DIAG_ROW")
+
+
+class CVRPLibFormatError(ValueError):
+    """CVRPLIB / TSPLIB ファイルの形式が不正"""
+
+
+def load_cvrplib(
+    path: str,
+    *,
+    num_vehicles: int | None = None,
+    cache_dir: str | None = None,
+    round_distances: bool = True,
+    distance_dtype=np.float64,
+) -> Instance:
+    """CVRPLIB（.vrp）/ TSPLIB（.tsp）ファイルを読み込んで Instance を返す
+
+    - 対応: NODE_COORD_SECTION（EUC_2D）、EDGE_WEIGHT_SECTION（EXPLICIT）、DEMAND_SECTION、DEPOT_SECTION
+    - デポが index 0、残りのノードがファイル順に 1..N になるよう並べ替える（元のノード番号は instance.node_labels）
+    - round_distances: EUC_2D の距離を TSPLIB の規約どおり最も近い整数に丸める
+    - num_vehicles: 省略時は VEHICLES 行、名前の '-kN'、需要合計/容量の切り上げの順に決める
+    - cache_dir: 指定すると距離行列を .npy に保存し、次回以降は np.load(mmap_mode='r') で開く
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    spec = parse_cvrplib(raw.decode())
+
+    order = _node_order(spec)
+    coords = spec["coords"]
+    n = spec["dimension"]
+    xs = np.zeros(n)
+    ys = np.zeros(n)
+    if coords is not None:
+        xs = coords[order, 0].copy()
+        ys = coords[order, 1].copy()
+    demands = spec["demands"][order] if spec["demands"] is not None else np.zeros(n)
+    demands[0] = 0.0
+
+    capacity = spec["capacity"]
+    if capacity is None:
+        # TSP など容量のない問題は1台で全顧客を回れる容量にする
+        capacity = max(float(demands.sum()), 1.0)
+    if num_vehicles is None:
+        num_vehicles = _infer_num_vehicles(spec, demands, capacity)
+
+    distances, stats = _load_or_build_distances(
+        raw, spec, order, cache_dir, round_distances, np.dtype(distance_dtype),
+        os.path.splitext(os.path.basename(path))[0],
+    )
+    instance = Instance.from_arrays(
+        xs, ys, demands, num_vehicles, capacity,
+        distances=distances, name=spec["name"], distance_dtype=distance_dtype,
+    )
+    instance.distance_stats = stats
+    instance.node_labels = np.asarray(order, dtype=np.int64) + 1
+    return instance
+
+
+def parse_cvrplib(text: str) -> dict:
+    """CVRPLIB / TSPLIB 形式のテキストを辞書に分解する（0始まりのノード番号で返す）"""
+    header: dict[str, str] = {}
+    sections: dict[str, list[str]] = {}
+    current: str | None = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line == "EOF":
+            break
+        key = line.split(":", 1)[0].strip().upper()
+        if key.endswith("_SECTION"):
+            current = key
+            sections[current] = []
+            continue
+        match = re.match(r"^([A-Za-z_]+)\s*:\s*(.*)$", line)
+        if match:
+            header[match.group(1).upper()] = match.group(2).strip()
+            current = None
+            continue
+        if current is None:
+            raise CVRPLibFormatError(f"解釈できない行です: {line!r}")
+        sections[current].append(line)
+
+    if "DIMENSION" not in header:
+        raise CVRPLibFormatError("DIMENSION がありません")
+    dimension = int(header["DIMENSION"])
+    edge_type = header.get("EDGE_WEIGHT_TYPE", "EUC_2D").upper()
+
+    coords = None
+    coord_lines = sections.get("NODE_COORD_SECTION") or sections.get("DISPLAY_DATA_SECTION")
+    if coord_lines:
+        coords = np.zeros((dimension, 2))
+        for row in coord_lines:
+            idx, x, y = row.split()[:3]
+            coords[int(idx) - 1] = (float(x), float(y))
+
+    demands = None
+    if "DEMAND_SECTION" in sections:
+        demands = np.zeros(dimension)
+        for row in sections["DEMAND_SECTION"]:
+            idx, q = row.split()[:2]
+            demands[int(idx) - 1] = float(q)
+
+    depots: list[int] = []
+    for row in sections.get("DEPOT_SECTION", []):
+        for token in row.split():
+            if int(token) == -1:
+                break
+            depots.append(int(token) - 1)
+
+    weights = None
+    if edge_type == "EXPLICIT":
+        values = [float(t) for row in sections.get("EDGE_WEIGHT_SECTION", []) for t in row.split()]
+        weights = _explicit_matrix(values, dimension, header.get("EDGE_WEIGHT_FORMAT", "FULL_MATRIX").upper())
+    elif edge_type not in ("EUC_2D", "CEIL_2D"):
+        raise CVRPLibFormatError(f"未対応の EDGE_WEIGHT_TYPE です: {edge_type}")
+    elif coords is None:
+        raise CVRPLibFormatError("NODE_COORD_SECTION がありません")
+
+    return {
+        "name": header.get("NAME"),
+        "type": header.get("TYPE", "CVRP").upper(),
+        "dimension": dimension,
+        "capacity": float(header["CAPACITY"]) if "CAPACITY" in header else None,
+        "vehicles": int(header["VEHICLES"]) if "VEHICLES" in header else None,
+        "edge_weight_type": edge_type,
+        "coords": coords,
+        "demands": demands,
+        "depots": depots,
+        "weights": weights,
+    }
+
+
+# ===== 内部ヘルパー =====
+def _explicit_matrix(values: list[float], n: int, fmt: str) -> np.ndarray:
+    """EDGE_WEIGHT_SECTION の値の並びから対称な n x n 行列を作る"""
+    if fmt not in EXPLICIT_FORMATS:
+        raise CVRPLibFormatError(f"未対応の EDGE_WEIGHT_FORMAT です: {fmt}")
+    if fmt == "FULL_MATRIX":
+        if len(values) != n * n:
+            raise CVRPLibFormatError("EDGE_WEIGHT_SECTION の要素数が合いません")
+        return np.asarray(values, dtype=np.float64).reshape(n, n)
+
+    diag = "DIAG" in fmt
+    expected = n * (n + 1) // 2 if diag else n * (n - 1) // 2
+    if len(values) != expected:
+        raise CVRPLibFormatError("EDGE_WEIGHT_SECTION の要素数が合いません")
+    matrix = np.zeros((n, n))
+    if fmt.startswith("LOWER"):
+        rows, cols = np.tril_indices(n, k=0 if diag else -1)
+    else:
+        rows, cols = np.triu_indices(n, k=0 if diag else 1)
+    # TSPLIB の下三角・上三角は行優先で並ぶ
+    matrix[rows, cols] = values
+    matrix[cols, rows] = values
+    return matrix
+
+
+def _node_order(spec: dict) -> list[int]:
+    """デポを先頭に、残りをファイル順に並べたノード番号（0始まり）"""
+    n = spec["dimension"]
+    depot = spec["depots"][0] if spec["depots"] else 0
+    return [depot] + [i for i in range(n) if i != depot]
+
+
+def _infer_num_vehicles(spec: dict, demands: np.ndarray, capacity: float) -> int:
+    if spec["vehicles"]:
+        return spec["vehicles"]
+    match = re.search(r"-k(\d+)", spec["name"] or "")
+    if match:
+        return int(match.group(1))
+    return max(1, math.ceil(float(demands.sum()) / capacity))
+
+
+def _load_or_build_distances(
+    raw: bytes, spec: dict, order: list[int], cache_dir: str | None,
+    round_distances: bool, dtype: np.dtype, stem: str,
+) -> tuple[np.ndarray, dict]:
+    """距離行列を作る。cache_dir があれば .npy にキャッシュし、メモリマップで開く"""
+    cache_path = None
+    if cache_dir is not None:
+        key = hashlib.sha1(raw + f"|{round_distances}|{dtype.str}".encode()).hexdigest()[:16]
+        cache_path = os.path.join(cache_dir, f"{stem}-{key}.npy")
+        if os.path.exists(cache_path):
+            start = time.perf_counter()
+            distances = np.load(cache_path, mmap_mode="r")
+            return distances, {
+                "build_time_s": time.perf_counter() - start,
+                "nbytes": distances.nbytes,
+                "dtype": distances.dtype.name,
+                "cache_path": cache_path,
+                "cache_hit": True,
+            }
+
+    start = time.perf_counter()
+    if spec["weights"] is not None:
+        idx = np.asarray(order)
+        distances = np.ascontiguousarray(spec["weights"][np.ix_(idx, idx)], dtype=dtype)
+        stats = {"nbytes": distances.nbytes, "dtype": dtype.name}
+    else:
+        coords = spec["coords"][order]
+        distances, stats = build_distance_matrix(coords[:, 0], coords[:, 1], dtype=np.float64)
+        if spec["edge_weight_type"] == "CEIL_2D":
+            np.ceil(distances, out=distances)
+        elif round_distances:
+            # TSPLIB の nint: 0.5 は切り上げ
+            np.floor(distances + 0.5, out=distances)
+        distances = distances.astype(dtype, copy=False)
+        stats["nbytes"] = distances.nbytes
+        stats["dtype"] = dtype.name
+    stats["build_time_s"] = time.perf_counter() - start
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # 並行実行で壊れたファイルを読まないよう、一時ファイルに書いてから置き換える
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, distances)
+        os.replace(tmp_path, cache_path)
+        distances = np.load(cache_path, mmap_mode="r")
+        stats.update({"cache_path": cache_path, "cache_hit": False})
+    return distances, stats
@@ -0,0 +1,382 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+# 距離の提供元（Instance.distances）
+#
+# ソルバーは距離を NumPy 配列と同じ書き方で読む:
+#   d[i, j] / d.item(i, j)（1要素）、d[a, b]（配列の組、ブロードキャスト可）、d[i]（1行）、
+#   d[r0:r1]（行のブロック）、d[np.ix_(rows, cols)]、d.shape / d.dtype
+# 小さい問題では密な ndarray をそのまま使い、大きい問題では LazyDistances が座標から必要な分だけ計算する。
+
+
+class LazyDistances:
+    """座標から距離をその都度計算する距離行列（(N+1)^2 の配列を作らない）
+
+    - 1要素・配列の組: 座標から直接計算する（キャッシュしない）
+    - 行 d[i]、矩形ブロック d[r0:r1, c0:c1]: 行と tile_size 四方のタイル単位で計算し、
+      合計 cache_bytes までを LRU で保持する（対称なのでタイルは上三角側だけを持つ）
+    - キャッシュより大きいブロック（k近傍を作るときの行ブロック等）は保持せずに計算だけする
+    - knn(k): k近傍グラフ（KNNGraph）。座標の kd 木で近い点だけを比べて作り、k ごとに保持する
+
+    計算式は build_distance_matrix と同じ（同じ dtype なら密な行列と同じ値になる）。
+    stats() でキャッシュのヒット率と使用メモリを返す。
+    """
+
+    def __init__(
+        self,
+        xs: np.ndarray,
+        ys: np.ndarray,
+        *,
+        dtype=np.float64,
+        tile_size: int = 512,
+        cache_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.dtype = np.dtype(dtype)
+        self.tile_size = max(1, int(tile_size))
+        self.cache_bytes = cache_bytes
+        self._cache: OrderedDict = OrderedDict()
+        self._graphs: dict[int, KNNGraph] = {}
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "uncached_blocks": 0, "direct_elements": 0}
+        self._cached_bytes = 0
+        self._peak_cached_bytes = 0
+        self.resize(xs, ys)
+
+    def resize(self, xs: np.ndarray, ys: np.ndarray):
+        """座標を差し替える（地点の追加後など）。キャッシュとk近傍グラフは捨てる"""
+        self.xs = np.asarray(xs).astype(self.dtype, copy=False)
+        self.ys = np.asarray(ys).astype(self.dtype, copy=False)
+        n = len(self.xs)
+        self.shape = (n, n)
+        self._cache.clear()
+        self._cached_bytes = 0
+        self._graphs.clear()
+        if self.dtype == np.float64:
+            # 1要素の参照（局所探索の内側のループ）は Python の float で計算する
+            self._xl, self._yl = self.xs.tolist(), self.ys.tolist()
+            self.item = self._item_float
+        else:
+            self.item = self._item_numpy
+
+    @property
+    def ndim(self) -> int:
+        return 2
+
+    @property
+    def nbytes(self) -> int:
+        """実際に使っているメモリ（座標 + キャッシュ）"""
+        return self.xs.nbytes + self.ys.nbytes + self._cached_bytes
+
+    def stats(self) -> dict:
+        lookups = self._counts["hits"] + self._counts["misses"]
+        return {
+            "mode": "lazy",
+            **self._counts,
+            "hit_rate": self._counts["hits"] / lookups if lookups else 0.0,
+            "cached_bytes": self._cached_bytes,
+            "peak_cached_bytes": self._peak_cached_bytes,
+            "cache_bytes": self.cache_bytes,
+            "nbytes": self.nbytes,
+            "dense_nbytes": self.shape[0] * self.shape[1] * self.dtype.itemsize,
+            "knn_nbytes": sum(g.nbytes for g in self._graphs.values()),
+            "tile_size": self.tile_size,
+            "dtype": self.dtype.name,
+        }
+
+    # ===== 参照 =====
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) == 1:
+            key = (key[0], slice(None))
+        a, b = key
+        a_int, b_int = _is_int(a), _is_int(b)
+        if a_int and b_int:
+            return self.dtype.type(self.item(int(a), int(b)))
+        if a_int and isinstance(b, slice):
+            return self.row(int(a))[b]
+        if b_int and isinstance(a, slice):
+            return self.row(int(b))[a]
+        if isinstance(a, slice) and isinstance(b, slice):
+            r0, r1, rs = a.indices(self.shape[0])
+            c0, c1, cs = b.indices(self.shape[1])
+            if rs == 1 and cs == 1:
+                return self.block(r0, r1, c0, c1)
+        if isinstance(a, slice) or isinstance(b, slice):
+            # スライスと配列の組は NumPy と同じく外積の形になる
+            rows = np.arange(self.shape[0])[a] if isinstance(a, slice) else np.asarray(a)
+            cols = np.arange(self.shape[1])[b] if isinstance(b, slice) else np.asarray(b)
+            return self._pairs(rows.reshape(rows.shape + (1,) * cols.ndim), cols)
+        return self._pairs(np.asarray(a), np.asarray(b))
+
+    def __array__(self, dtype=None, copy=None):
+        """密な行列にする（N が大きいと (N+1)^2 のメモリを使う。明示的に変換したときだけ）"""
+        matrix = self.block(0, self.shape[0], 0, self.shape[1])
+        return matrix if dtype is None else matrix.astype(dtype, copy=False)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def _item_float(self, i: int, j: int) -> float:
+        x, y = self._xl, self._yl
+        dx = x[i] - x[j]
+        dy = y[i] - y[j]
+        return math.sqrt(dx * dx + dy * dy)
+
+    def _item_numpy(self, i: int, j: int) -> float:
+        dx = self.xs[i] - self.xs[j]
+        dy = self.ys[i] - self.ys[j]
+        return float(np.sqrt(dx * dx + dy * dy))
+
+    def row(self, i: int) -> np.ndarray:
+        """i 行目（読み取り専用。キャッシュする）"""
+        key = ("row", i)
+        row = self._lookup(key)
+        if row is None:
+            row = self._compute(slice(i, i + 1), slice(None))[0]
+            self._store(key, row)
+        return row
+
+    def block(self, r0: int, r1: int, c0: int, c1: int) -> np.ndarray:
+        """矩形ブロック [r0:r1, c0:c1]（タイル単位でキャッシュする）"""
+        out = np.empty((max(0, r1 - r0), max(0, c1 - c0)), dtype=self.dtype)
+        if out.size == 0:
+            return out
+        if out.nbytes > self.cache_bytes // 4:
+            # キャッシュに載らない大きさは保持せずに計算する（保持すると他のタイルを追い出すだけ）
+            self._counts["uncached_blocks"] += 1
+            out[...] = self._compute(slice(r0, r1), slice(c0, c1))
+            return out
+        t = self.tile_size
+        for ti in range(r0 // t, (r1 - 1) // t + 1):
+            for tj in range(c0 // t, (c1 - 1) // t + 1):
+                tile = self._tile(ti, tj)
+                rs, re = max(r0, ti * t), min(r1, (ti + 1) * t)
+                cs, ce = max(c0, tj * t), min(c1, (tj + 1) * t)
+                out[rs - r0:re - r0, cs - c0:ce - c0] = tile[rs - ti * t:re - ti * t, cs - tj * t:ce - tj * t]
+        return out
+
+    def knn(self, k: int) -> "KNNGraph":
+        """k近傍グラフ（デポと自分自身は除く。k ごとに1度だけ作る）"""
+        k = max(0, min(k, self.shape[0] - 2))
+        graph = self._graphs.get(k)
+        if graph is None:
+            graph = KNNGraph.from_coordinates(self.xs, self.ys, k)
+            self._graphs[k] = graph
+        return graph
+
+    def __getstate__(self):
+        # プロセス間で渡すときは座標と設定だけを送る（キャッシュは送らない）
+        return {"xs": self.xs, "ys": self.ys, "dtype": self.dtype, "tile_size": self.tile_size, "cache_bytes": self.cache_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(
+            state["xs"], state["ys"], dtype=state["dtype"], tile_size=state["tile_size"], cache_bytes=state["cache_bytes"],
+        )
+
+    # ===== 内部ヘルパー =====
+    def _tile(self, ti: int, tj: int) -> np.ndarray:
+        # 対称なので (小, 大) の順のタイルだけを持ち、逆側は転置して使う
+        key = ("tile", min(ti, tj), max(ti, tj))
+        tile = self._lookup(key)
+        if tile is None:
+            t = self.tile_size
+            lo, hi = min(ti, tj), max(ti, tj)
+            tile = self._compute(slice(lo * t, (lo + 1) * t), slice(hi * t, (hi + 1) * t))
+            self._store(key, tile)
+        return tile if ti <= tj else tile.T
+
+    def _compute(self, rows: slice, cols: slice) -> np.ndarray:
+        """build_distance_matrix と同じ式でブロックを計算する"""
+        dx = self.xs[rows, None] - self.xs[None, cols]
+        dy = self.ys[rows, None] - self.ys[None, cols]
+        dx *= dx
+        dy *= dy
+        dx += dy
+        np.sqrt(dx, out=dx)
+        return dx
+
+    def _pairs(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        dx = self.xs[a] - self.xs[b]
+        dy = self.ys[a] - self.ys[b]
+        dx *= dx
+        dy *= dy
+        dx += dy
+        self._counts["direct_elements"] += dx.size
+        return np.sqrt(dx, out=dx) if dx.ndim else self.dtype.type(np.sqrt(dx))
+
+    def _lookup(self, key):
+        value = self._cache.get(key)
+        if value is None:
+            self._counts["misses"] += 1
+            return None
+        self._cache.move_to_end(key)
+        self._counts["hits"] += 1
+        return value
+
+    def _store(self, key, value: np.ndarray):
+        value.flags.writeable = False
+        if value.nbytes > self.cache_bytes:
+            return
+        self._cache[key] = value
+        self._cached_bytes += value.nbytes
+        while self._cached_bytes > self.cache_bytes:
+            _, old = self._cache.popitem(last=False)
+            self._cached_bytes -= old.nbytes
+            self._counts["evictions"] += 1
+        self._peak_cached_bytes = max(self._peak_cached_bytes, self._cached_bytes)
+
+
+class KNNGraph:
+    """各地点から近い順に k 個の顧客（デポと自分自身は除く）と、その距離だけを持つ疎なグラフ
+
+    - neighbors: shape (N+1, k) の顧客ID（距離 → ID の昇順）
+    - distances: 同じ形の距離
+    """
+
+    def __init__(self, neighbors: np.ndarray, distances: np.ndarray):
+        self.neighbors = neighbors
+        self.distances = distances
+
+    @property
+    def k(self) -> int:
+        return self.neighbors.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.neighbors.nbytes + self.distances.nbytes
+
+    @classmethod
+    def from_coordinates(
+        cls, xs: np.ndarray, ys: np.ndarray, k: int, *, leaf_size: int | None = None, block_bytes: int = 64 * 1024**2,
+    ) -> "KNNGraph":
+        """座標から作る。顧客を kd 木の葉（leaf_size 点以下の箱）に分け、近い葉の点だけと比べる
+
+        葉は点の多い側を中央値で2分して作るので、座標が偏っていても1つの葉の点数は leaf_size 以下になる。
+        葉ごとに、近い葉3つの点で k 番目までの距離の上限 R を求め、箱までの距離が R 以内の葉だけを
+        候補にする（それより遠い葉に近い点はない）。距離はブロックが block_bytes 以下になるよう
+        問い合わせ点を分けて計算する。
+        """
+        n = len(xs)
+        k = max(0, min(k, n - 2))
+        neighbors = np.empty((n, k), dtype=np.int64)
+        dists = np.empty((n, k), dtype=np.asarray(xs).dtype)
+        if k == 0:
+            return cls(neighbors, dists)
+
+        # デポ（index 0）は候補に入れない。デポからは全顧客と比べる
+        customers = np.arange(1, n, dtype=np.int64)
+        _knn_block(xs, ys, np.zeros(1, dtype=np.int64), customers, k, neighbors, dists, block_bytes, self_first=False)
+
+        leaves = _kd_leaves(xs, ys, customers, leaf_size or max(64, 2 * k))
+        lo_x = np.array([xs[leaf].min() for leaf in leaves])
+        hi_x = np.array([xs[leaf].max() for leaf in leaves])
+        lo_y = np.array([ys[leaf].min() for leaf in leaves])
+        hi_y = np.array([ys[leaf].max() for leaf in leaves])
+        nearest = min(3, len(leaves))
+        for i, query in enumerate(leaves):
+            # 葉 i の箱から各葉の箱までの距離（葉 i のどの点からもこれ以上は離れている）
+            gap_x = np.maximum(0.0, np.maximum(lo_x - hi_x[i], lo_x[i] - hi_x))
+            gap_y = np.maximum(0.0, np.maximum(lo_y - hi_y[i], lo_y[i] - hi_y))
+            gap = np.hypot(gap_x, gap_y)
+            gap[i] = -1.0  # 自分の葉は必ず候補に入れ、候補の先頭に置く
+            near = np.argpartition(gap, nearest - 1)[:nearest] if nearest < len(leaves) else np.arange(len(leaves))
+            cand = np.concatenate([query] + [leaves[j] for j in near if j != i])
+            radius = _kth_distance_bound(xs, ys, query, cand, k, block_bytes)
+            # 丸め誤差で境界の葉を落とさないよう、少しだけ広げる
+            within = np.flatnonzero(gap <= radius * (1 + 1e-9) + 1e-12)
+            cand = np.concatenate([query] + [leaves[j] for j in within if j != i])
+            _knn_block(xs, ys, query, cand, k, neighbors, dists, block_bytes)
+        return cls(neighbors, dists)
+
+
+def _kd_leaves(xs: np.ndarray, ys: np.ndarray, ids: np.ndarray, leaf_size: int) -> list[np.ndarray]:
+    """ids を広い方の座標軸の中央値で2分し続け、leaf_size 点以下の葉（ID の配列）に分ける"""
+    leaves = []
+    stack = [ids]
+    while stack:
+        idx = stack.pop()
+        if len(idx) <= leaf_size:
+            leaves.append(idx)
+            continue
+        px, py = xs[idx], ys[idx]
+        axis = px if np.ptp(px) >= np.ptp(py) else py
+        half = len(idx) // 2
+        part = np.argpartition(axis, half)
+        stack.append(idx[part[:half]])
+        stack.append(idx[part[half:]])
+    return leaves
+
+
+def _block_rows(num_cand: int, block_bytes: int) -> int:
+    """問い合わせ点 x 候補 の距離ブロックが block_bytes に収まる問い合わせ点の数"""
+    return max(1, block_bytes // (16 * max(num_cand, 1)))
+
+
+def _block_squared(xs: np.ndarray, ys: np.ndarray, query: np.ndarray, cand: np.ndarray, offset: int | None) -> np.ndarray:
+    """query x cand の距離の2乗（sqrt は選んだ k 個にだけかける）
+
+    offset: cand[offset + r] が query[r] 自身なら、その要素を inf にする（None なら cand に自分はいない）
+    """
+    dx = xs[query, None] - xs[None, cand]
+    dy = ys[query, None] - ys[None, cand]
+    dx *= dx
+    dy *= dy
+    dx += dy
+    if offset is not None:
+        rows = np.arange(len(query))
+        dx[rows, rows + offset] = np.inf
+    return dx
+
+
+def _kth_distance_bound(xs: np.ndarray, ys: np.ndarray, query: np.ndarray, cand: np.ndarray, k: int, block_bytes: int) -> float:
+    """cand（先頭が query 自身）の中での k 番目の距離の、query 全体での最大値（真の k 番目の距離の上限）"""
+    if len(cand) <= k:
+        return math.inf
+    bound = 0.0
+    step = _block_rows(len(cand), block_bytes)
+    for begin in range(0, len(query), step):
+        sq = _block_squared(xs, ys, query[begin:begin + step], cand, begin)
+        bound = max(bound, float(np.partition(sq, k - 1, axis=1)[:, k - 1].max()))
+    return math.sqrt(bound)
+
+
+def _knn_block(
+    xs: np.ndarray, ys: np.ndarray, query: np.ndarray, cand: np.ndarray, k: int,
+    neighbors: np.ndarray, dists: np.ndarray, block_bytes: int, *, self_first: bool = True,
+):
+    """query の各点について cand から近い k 点を（距離 → ID の昇順で）neighbors・dists に書く
+
+    self_first=True なら cand の先頭 len(query) 個が query 自身（自分は除く）。
+    """
+    step = _block_rows(len(cand), block_bytes)
+    for begin in range(0, len(query), step):
+        rows = query[begin:begin + step]
+        sq = _block_squared(xs, ys, rows, cand, begin if self_first else None)
+        part = np.argpartition(sq, k - 1, axis=1)[:, :k]
+        part_sq = np.take_along_axis(sq, part, axis=1)
+        # k 番目と同じ距離の点が選ばれなかった行は、密な行列と同じく ID の小さい順で選び直す
+        kth = part_sq.max(axis=1)
+        for r in np.flatnonzero((sq <= kth[:, None]).sum(axis=1) > k):
+            order = np.lexsort((cand, sq[r]))[:k]
+            part[r], part_sq[r] = order, sq[r, order]
+        # build_distance_matrix と同じ値になるよう、2乗の和に sqrt をかける
+        part_d = np.sqrt(part_sq)
+        ids = cand[part]
+        idx = np.lexsort((ids, part_d), axis=1)
+        neighbors[rows] = np.take_along_axis(ids, idx, axis=1)
+        dists[rows] = np.take_along_axis(part_d, idx, axis=1)
+
+
+def distance_stats(distances) -> dict:
+    """距離の提供元の統計（密な行列ならサイズだけ、LazyDistances ならキャッシュの状況も）"""
+    if distances is None:
+        return {}
+    if isinstance(distances, LazyDistances):
+        return distances.stats()
+    return {"mode": "dense", "nbytes": distances.nbytes, "dtype": distances.dtype.name}
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, (int, np.integer))
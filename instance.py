@@ -1,17 +1,117 @@
-import random
+import time
 import numpy as np
-import matplotlib.pyplot as plt
 
-random.seed(42)
+from distances import LazyDistances, distance_stats
+
+
+def build_distance_matrix(
+    xs: np.ndarray,
+    ys: np.ndarray,
+    *,
+    dtype=np.float64,
+    block_size: int = 1024,
+    symmetric: bool = True,
+) -> tuple[np.ndarray, dict]:
+    """座標配列からユークリッド距離行列を行ブロック単位で計算する
+
+    - 1ブロックあたりの作業領域は block_size x N 要素に抑える
+    - symmetric=True なら上三角のブロックだけを計算し、転置で下三角を埋める
+    - 戻り値: (距離行列, 統計情報 {build_time_s, nbytes, peak_block_bytes, ...})
+    """
+    start = time.perf_counter()
+    dtype = np.dtype(dtype)
+    xs = np.asarray(xs, dtype=dtype)
+    ys = np.asarray(ys, dtype=dtype)
+    n = xs.shape[0]
+    block_size = max(1, int(block_size))
+
+    distances = np.empty((n, n), dtype=dtype)
+    peak_block_bytes = 0
+    for r0 in range(0, n, block_size):
+        r1 = min(r0 + block_size, n)
+        # 対称なら列は r0 以降だけでよい
+        c0 = r0 if symmetric else 0
+        dx = xs[r0:r1, None] - xs[None, c0:]
+        dy = ys[r0:r1, None] - ys[None, c0:]
+        dx *= dx
+        dy *= dy
+        dx += dy
+        np.sqrt(dx, out=dx)
+        distances[r0:r1, c0:] = dx
+        if symmetric:
+            distances[c0:, r0:r1] = dx.T
+        peak_block_bytes = max(peak_block_bytes, dx.nbytes + dy.nbytes)
+
+    stats = {
+        "build_time_s": time.perf_counter() - start,
+        "nbytes": distances.nbytes,
+        "peak_block_bytes": peak_block_bytes,
+        "dtype": dtype.name,
+        "block_size": block_size,
+        "symmetric": symmetric,
+    }
+    return distances, stats
 
 
 class Customer:
-    """顧客を表すクラス"""
+    """顧客を表すクラス
+
+    Instance が生成する顧客は配列（Instance.xs / ys / demands）へのビューで、
+    読み書きは配列に直接反映される（書き込むと持ち主の Instance.version が進む）。
+    単独で生成した場合は自前の1要素配列を持つ。
+    """
+    __slots__ = ("id", "_xs", "_ys", "_demands", "_index", "_owner")
+
     def __init__(self, id: int, demand: float, x: float, y: float):
         self.id = id
-        self.demand = demand
-        self.x = x
-        self.y = y
+        self._xs = np.array([x], dtype=np.float64)
+        self._ys = np.array([y], dtype=np.float64)
+        self._demands = np.array([demand], dtype=np.float64)
+        self._index = 0
+        self._owner = None
+
+    @classmethod
+    def view(cls, xs: np.ndarray, ys: np.ndarray, demands: np.ndarray, index: int, owner: "Instance | None" = None) -> "Customer":
+        """配列の index 番目を指すビューを作る（ID = index。owner は書き込みを知らせる Instance）"""
+        customer = cls.__new__(cls)
+        customer.id = index
+        customer._xs = xs
+        customer._ys = ys
+        customer._demands = demands
+        customer._index = index
+        customer._owner = owner
+        return customer
+
+    @property
+    def demand(self) -> float:
+        return float(self._demands[self._index])
+
+    @demand.setter
+    def demand(self, value: float):
+        self._demands[self._index] = value
+        self._touch()
+
+    @property
+    def x(self) -> float:
+        return float(self._xs[self._index])
+
+    @x.setter
+    def x(self, value: float):
+        self._xs[self._index] = value
+        self._touch()
+
+    @property
+    def y(self) -> float:
+        return float(self._ys[self._index])
+
+    @y.setter
+    def y(self, value: float):
+        self._ys[self._index] = value
+        self._touch()
+
+    def _touch(self):
+        if self._owner is not None:
+            self._owner.touch()
 
 
 class Vehicle:
@@ -37,47 +137,267 @@ class Vehicle:
 
 
 class Instance:
-    """問題例を表すクラス"""
-    def __init__(self, num_customers: int, num_vehicles: int, capacity: int):
-        self.num_customers = num_customers
+    """問題例を表すクラス
+
+    顧客データは ID をインデックスとする連続配列（ids, xs, ys, demands）で保持し、
+    index 0 がデポ。customers / depot はこれらの配列へのビュー。
+
+    距離（distances）は distance_mode で選ぶ:
+    - "dense": 密な距離行列（ndarray）を作る
+    - "lazy": 座標から必要な分だけ計算する LazyDistances（キャッシュは distance_cache_bytes まで）
+    - "auto": 密な行列が max_dense_bytes に収まれば dense、超えるなら lazy
+    """
+    def __init__(
+        self,
+        num_customers: int,
+        num_vehicles: int,
+        capacity: int,
+        *,
+        seed: int | None = 42,
+        distance_dtype=np.float64,
+        distance_block_size: int = 1024,
+        distance_mode: str = "auto",
+        max_dense_bytes: int = 2 * 1024**3,
+        distance_cache_bytes: int = 256 * 1024**2,
+    ):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.name: str | None = None
+
+        # 顧客データを配列で生成（IDは1..N、デポはID=0）
+        _, xs, ys, demands = self.generate_arrays(num_customers)
+        self._setup(
+            xs, ys, demands, num_vehicles, capacity,
+            distance_dtype=distance_dtype, distance_block_size=distance_block_size,
+            distance_mode=distance_mode, max_dense_bytes=max_dense_bytes, distance_cache_bytes=distance_cache_bytes,
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        xs: np.ndarray,
+        ys: np.ndarray,
+        demands: np.ndarray,
+        num_vehicles: int,
+        capacity: float,
+        *,
+        distances: np.ndarray | None = None,
+        name: str | None = None,
+        distance_dtype=np.float64,
+        distance_block_size: int = 1024,
+        compute_distances: bool = True,
+        distance_mode: str = "auto",
+        max_dense_bytes: int = 2 * 1024**3,
+        distance_cache_bytes: int = 256 * 1024**2,
+    ) -> "Instance":
+        """座標・需要配列（index 0 がデポ）から問題例を作る
+
+        distances を渡した場合はそれをそのまま距離行列として使う（明示的な行列やメモリマップ用）。
+        compute_distances=False なら距離行列を作らない（distances は None。座標だけで解く分割ソルバー用）。
+        distance_mode 以下はクラスの説明を参照。
+        """
+        instance = cls.__new__(cls)
+        instance.seed = None
+        instance.rng = np.random.default_rng()
+        instance.name = name
+        instance._setup(
+            np.asarray(xs, dtype=np.float64).copy(),
+            np.asarray(ys, dtype=np.float64).copy(),
+            np.asarray(demands, dtype=np.float64).copy(),
+            num_vehicles, capacity,
+            distances=distances,
+            distance_dtype=distance_dtype, distance_block_size=distance_block_size,
+            compute_distances=compute_distances,
+            distance_mode=distance_mode, max_dense_bytes=max_dense_bytes, distance_cache_bytes=distance_cache_bytes,
+        )
+        return instance
+
+    def _setup(
+        self,
+        xs: np.ndarray,
+        ys: np.ndarray,
+        demands: np.ndarray,
+        num_vehicles: int,
+        capacity: float,
+        *,
+        distances: np.ndarray | None = None,
+        distance_dtype=np.float64,
+        distance_block_size: int = 1024,
+        compute_distances: bool = True,
+        distance_mode: str = "auto",
+        max_dense_bytes: int = 2 * 1024**3,
+        distance_cache_bytes: int = 256 * 1024**2,
+    ):
+        """配列から顧客・車両・距離行列を組み立てる（生成元によらず共通）"""
+        if distance_mode not in ("dense", "lazy", "auto"):
+            raise ValueError(f"未知の distance_mode です: {distance_mode}")
+        self.num_customers = len(xs) - 1
         self.num_vehicles = num_vehicles
         self.capacity = capacity
+        self.distance_dtype = np.dtype(distance_dtype)
+        self.distance_block_size = distance_block_size
+        self.distance_mode = distance_mode
+        self.max_dense_bytes = max_dense_bytes
+        self.distance_cache_bytes = distance_cache_bytes
+        self.distance_stats: dict = {}
+        # 内容（座標・需要・顧客数）を変えるたびに進むカウンタ（描画の作り直しなどの判定用）
+        self.version = 0
 
-        # 顧客を生成（IDは1..N、デポはID=0）
-        self.customers = self.create_customers(num_customers)
-        self.depot = Customer(0, 0, 0, 0)
+        self.ids = np.arange(len(xs), dtype=np.int64)
+        self.node_labels = self.ids  # 元データでのノード番号（ファイルから読んだ場合に使う）
+        self.xs, self.ys, self.demands = xs, ys, demands
+        self.customers = self.create_customers(self.num_customers)
+        self.depot = Customer.view(self.xs, self.ys, self.demands, 0, self)
         self.customers_with_depot = [self.depot] + self.customers
 
         # 車両を生成（Vehicleオブジェクトのリスト）
         self.vehicles = self.create_vehicles(num_vehicles)
+        self.vehicle_capacities = np.array([v.capacity for v in self.vehicles], dtype=np.float64)
 
         # 距離行列（NumPy配列）を計算
-        self.distances = self.compute_distances()
+        if distances is None:
+            self.distances = self.compute_distances() if compute_distances else None
+        else:
+            self.distances = distances
+            self.distance_stats = {"build_time_s": 0.0, **distance_stats(distances)}
+
+    def generate_arrays(self, num_customers: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """顧客の座標・需要を乱数で一括生成（index 0 はデポ: 原点・需要0）"""
+        n = num_customers + 1
+        ids = np.arange(n, dtype=np.int64)
+        demands = np.zeros(n, dtype=np.float64)
+        xs = np.zeros(n, dtype=np.float64)
+        ys = np.zeros(n, dtype=np.float64)
+        demands[1:] = self.rng.uniform(1, 10, num_customers)
+        xs[1:] = self.rng.uniform(-10, 10, num_customers)
+        ys[1:] = self.rng.uniform(-10, 10, num_customers)
+        return ids, xs, ys, demands
 
     def create_customers(self, num_customers: int) -> list[Customer]:
-        return [Customer(i, random.uniform(1, 10), random.uniform(-10, 10), random.uniform(-10, 10)) for i in range(1, num_customers + 1)]
+        return [Customer.view(self.xs, self.ys, self.demands, i, self) for i in range(1, num_customers + 1)]
     
     def create_vehicles(self, num_vehicles: int) -> list[Vehicle]:
         return [Vehicle(i, self.capacity) for i in range(1, num_vehicles + 1)]
     
-    def compute_distances(self) -> np.ndarray:
-        """任意の2点間の距離を計算してNumPy配列に格納"""
-        n = self.num_customers + 1
-        distances = np.zeros((n, n))
-        for i in range(n):
-            for j in range(n):
-                distances[i, j] = self.distance(self.customers_with_depot[i], self.customers_with_depot[j])
+    def compute_distances(self) -> "np.ndarray | LazyDistances":
+        """任意の2点間の距離を用意する（構築時間とメモリは distance_stats に記録）
+
+        密な行列（NumPy配列）か、大きすぎる・lazy 指定なら座標から計算する LazyDistances を返す。
+        """
+        n = len(self.xs)
+        dense_bytes = n * n * self.distance_dtype.itemsize
+        if self.distance_mode == "lazy" or (self.distance_mode == "auto" and dense_bytes > self.max_dense_bytes):
+            start = time.perf_counter()
+            distances = LazyDistances(
+                self.xs, self.ys, dtype=self.distance_dtype, cache_bytes=self.distance_cache_bytes,
+            )
+            self.distance_stats = {"build_time_s": time.perf_counter() - start, **distances.stats()}
+            return distances
+        distances, self.distance_stats = build_distance_matrix(
+            self.xs, self.ys, dtype=self.distance_dtype, block_size=self.distance_block_size
+        )
+        self.distance_stats["mode"] = "dense"
         return distances
 
+    def add_customer(
+        self,
+        x: float,
+        y: float,
+        demand: float,
+        *,
+        distances_row: np.ndarray | None = None,
+        distances_col: np.ndarray | None = None,
+    ) -> int:
+        """顧客を1人追加して新しいIDを返す
+
+        距離行列は作り直さず、新しい顧客の行と列だけを計算して拡張する。配列と距離行列は
+        余裕を持った領域に置き、足りなくなったときだけ 1/8 ほど大きく確保し直す。
+        - distances_row: 新しい顧客から既存の全地点（デポ含む）への距離。省略時はユークリッド距離
+        - distances_col: 既存の全地点から新しい顧客への距離（非対称な場合のみ。省略時は distances_row）
+        """
+        n = len(self.xs)
+        self._reserve(n + 1)
+        buf = self._buffers
+        buf["xs"][n], buf["ys"][n], buf["demands"][n] = x, y, demand
+        self.xs, self.ys, self.demands = buf["xs"][:n + 1], buf["ys"][:n + 1], buf["demands"][:n + 1]
+
+        if isinstance(self.distances, LazyDistances):
+            if distances_row is not None or distances_col is not None:
+                raise ValueError("座標から計算する距離（LazyDistances）では距離の行・列を指定できません")
+            self.distances.resize(self.xs, self.ys)
+        elif self.distances is not None:
+            if distances_row is None:
+                distances_row = np.hypot(self.xs[:n] - x, self.ys[:n] - y)
+            matrix = buf["distances"]
+            matrix[n, :n] = distances_row
+            matrix[:n, n] = distances_row if distances_col is None else distances_col
+            matrix[n, n] = 0
+            self.distances = matrix[:n + 1, :n + 1]
+            self.distance_stats["nbytes"] = self.distances.nbytes
+
+        self.num_customers += 1
+        self.ids = np.arange(n + 1, dtype=np.int64)
+        self.node_labels = np.append(self.node_labels, self.node_labels.max() + 1)
+        customer = Customer.view(buf["xs"], buf["ys"], buf["demands"], n, self)
+        self.customers.append(customer)
+        self.customers_with_depot.append(customer)
+        self.touch()
+        return n
+
+    def set_demand(self, cid: int, demand: float):
+        """顧客 cid の需要を変える"""
+        self.demands[cid] = demand
+        self.touch()
+
+    def touch(self):
+        """内容が変わったことを記録する（version を進める）
+
+        add_customer・set_demand・Customer の setter は自動で呼ぶ。xs / ys / demands を直接書き換えたときは呼ぶこと。
+        """
+        self.version += 1
+
+    def __getstate__(self):
+        # add_customer 用の予備領域（_buffers、距離行列の余白を含む）は送らない。距離行列は使っている範囲だけ
+        state = self.__dict__.copy()
+        state.pop("_buffers", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # 顧客のビューを受け取った配列に付け替える（予備領域は次の add_customer で作り直す）
+        for c in self.customers_with_depot:
+            c._xs, c._ys, c._demands = self.xs, self.ys, self.demands
+
+    def _reserve(self, size: int):
+        """配列と距離行列の領域を size 地点分以上にする（確保し直したらビューを付け替える）"""
+        buf = getattr(self, "_buffers", None)
+        if buf is not None and len(buf["xs"]) >= size:
+            return
+        capacity = size + max(16, size // 8)
+        n = len(self.xs)
+        new = {}
+        for name in ("xs", "ys", "demands"):
+            new[name] = np.zeros(capacity, dtype=np.float64)
+            new[name][:n] = getattr(self, name)
+        if isinstance(self.distances, np.ndarray):
+            new["distances"] = np.zeros((capacity, capacity), dtype=self.distances.dtype)
+            new["distances"][:n, :n] = self.distances
+            self.distances = new["distances"][:n, :n]
+        self._buffers = new
+        self.xs, self.ys, self.demands = new["xs"][:n], new["ys"][:n], new["demands"][:n]
+        for c in self.customers_with_depot:
+            c._xs, c._ys, c._demands = new["xs"], new["ys"], new["demands"]
+
     def distance(self, customer1: Customer, customer2: Customer) -> float:
         """2点間のユークリッド距離を計算"""
         return ((customer1.x - customer2.x) ** 2 + (customer1.y - customer2.y) ** 2) ** 0.5
 
     def plot_instance(self):
         """顧客とデポを可視化"""
-        xs = [c.x for c in self.customers]
-        ys = [c.y for c in self.customers]
-        plt.scatter(xs, ys, c="blue", label="Customers")
+        # matplotlib は読み込みが重いので、描画するときだけ読み込む
+        import matplotlib.pyplot as plt
+
+        plt.scatter(self.xs[1:], self.ys[1:], c="blue", label="Customers")
         plt.scatter([self.depot.x], [self.depot.y], c="red", marker="s", label="Depot")
         plt.legend()
         plt.xlabel("X")
@@ -1,36 +1,139 @@
-from instance import Instance
-from solver import VRPSolverMIP, NNSolver, SweepSolver, SweepNearestSolver
-from plot_graph import save_solution_plot
+import argparse
 import datetime
+import json
 import os
 
+from instance import Instance
+from solver import SOLVERS
+
+
+def load_instance(args: argparse.Namespace) -> Instance:
+    """--file（CVRPLIB/TSPLIB または JSON）か、--customers などの乱数生成の指定から Instance を作る
+
+    JSON は {"xs": [...], "ys": [...], "demands": [...], "num_vehicles": K, "capacity": Q}（index 0 がデポ）。
+    """
+    if args.file is None:
+        return Instance(
+            args.customers, args.vehicles or 10, args.capacity,
+            seed=args.seed, distance_mode=args.distance_mode,
+        )
+    if args.file.endswith(".json"):
+        with open(args.file) as f:
+            spec = json.load(f)
+        return Instance.from_arrays(
+            spec["xs"], spec["ys"], spec["demands"], args.vehicles or spec["num_vehicles"], spec["capacity"],
+            name=spec.get("name", os.path.splitext(os.path.basename(args.file))[0]),
+            distance_mode=args.distance_mode,
+        )
+    from cvrplib import load_cvrplib
+    return load_cvrplib(args.file, num_vehicles=args.vehicles, cache_dir=args.cache_dir)
+
+
+def run(instance: Instance, solver_names: list[str], improver_names: list[str], *, quiet: bool = False, plot_dir: str | None = None) -> list:
+    """各ソルバーで解き、improver_names の順に improve() をかける。得られた解（改善前も含む）を順に返す"""
+    for name in improver_names:
+        if not hasattr(SOLVERS[name], "improve"):
+            raise ValueError(f"{name} は改善ソルバーではありません（improve() がありません）")
+
+    plotter = None
+    if plot_dir is not None:
+        # matplotlib は図を描くときだけ読み込む
+        from plot_graph import BackgroundPlotter
+        plotter = BackgroundPlotter(instance)
+
+    solutions = []
+    try:
+        for name in solver_names:
+            solver = SOLVERS[name](instance)
+            solution = solver.solve()
+            _report(solver, solution, quiet)
+            solutions.append(solution)
+            if plotter is not None:
+                plotter.submit(solution, plot_dir)
 
-def main():
-    # 問題設定
-    num_customers = 30
-    num_vehicles = 10
-    capacity = 20
-    # インスタンス生成
-    instance = Instance(num_customers, num_vehicles, capacity)
-
-    # 実行するソルバー（MIP と NN）
-    solvers = [
-        #VRPSolverMIP(instance),
-        NNSolver(instance),
-        SweepSolver(instance),
-        SweepNearestSolver(instance),
-    ]
-
-    now = datetime.datetime.now()
-    date_str = now.strftime("%Y%m%d%H%M%S")
-    dated_dir = os.path.join("results", date_str)
-    os.makedirs(dated_dir, exist_ok=True)
-
-    for solver in solvers:
-        solution = solver.solve()
+            for improver_name in improver_names:
+                improved = SOLVERS[improver_name](instance).improve(solution)
+                print(f"{improver_name}: {solution.total_distance:.2f} -> {improved.total_distance:.2f}（{improved.solver_name}）")
+                solution = improved
+                solutions.append(solution)
+                if plotter is not None:
+                    plotter.submit(solution, plot_dir)
+    finally:
+        if plotter is not None:
+            for path in plotter.close():
+                print(f"Saved route plot: {path}")
+    return solutions
+
+
+def write_solutions(solutions: list, instance: Instance, path: str) -> None:
+    """解を JSON で書き出す（ルートは 車両ID -> [0, 顧客..., 0]）"""
+    payload = {
+        "instance": {
+            "name": instance.name,
+            "num_customers": instance.num_customers,
+            "num_vehicles": instance.num_vehicles,
+            "capacity": float(instance.capacity),
+        },
+        "solutions": [
+            {
+                "solver": s.solver_name,
+                "status": s.status,
+                "is_feasible": bool(s.is_feasible),
+                "total_distance": float(s.total_distance),
+                "num_vehicles_used": s.num_vehicles_used(),
+                "runtime_s": s.runtime_s,
+                "routes": {str(k): [int(c) for c in r] for k, r in s.routes.items()},
+            }
+            for s in solutions
+        ],
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    print(f"Saved solutions: {path}")
+
+
+# ===== 内部ヘルパー =====
+def _report(solver, solution, quiet: bool):
+    if quiet:
+        print(f"{solution.solver_name}: {solution.total_distance:.2f}（{solution.status}, 車両 {solution.num_vehicles_used()} 台, {solution.runtime_s:.3f}s）")
+    else:
         solver.print_solution()
-        save_solution_plot(solution, instance, out_path=dated_dir)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="VRPを指定したソルバーで解く")
+    parser.add_argument("-s", "--solvers", nargs="+", default=["NN", "Sweep", "SweepNearest", "Savings"], choices=list(SOLVERS), help="解を作るソルバー（それぞれ独立に解く）")
+    parser.add_argument("--improve", nargs="*", default=["LS"], choices=list(SOLVERS), help="各解に順にかける改善ソルバー（空なら改善しない）")
+
+    source = parser.add_argument_group("インスタンス")
+    source.add_argument("-f", "--file", default=None, help="読み込むファイル（.vrp/.tsp または .json）。省略時は乱数で生成")
+    source.add_argument("-n", "--customers", type=int, default=30)
+    source.add_argument("-k", "--vehicles", type=int, default=None, help="車両数（生成時の既定は 10、ファイルでは上書き）")
+    source.add_argument("-q", "--capacity", type=int, default=20)
+    source.add_argument("--seed", type=int, default=42)
+    source.add_argument("--distance-mode", choices=["auto", "dense", "lazy"], default="auto", help="距離行列の持ち方（lazy はその都度計算）")
+    source.add_argument("--cache-dir", default=None, help="CVRPLIB 距離行列のキャッシュ先")
+
+    output = parser.add_argument_group("出力")
+    output.add_argument("-o", "--out", default=None, help="解を書き出す JSON ファイル")
+    output.add_argument("--plot", action="store_true", help="ルート図を保存する（matplotlib が必要）")
+    output.add_argument("--plot-dir", default=None, help="ルート図の保存先（省略時は results/<日時>）")
+    output.add_argument("--quiet", action="store_true", help="ルートを表示せず1行の要約だけを出す")
+    args = parser.parse_args(argv)
+    for name in args.improve:
+        if not hasattr(SOLVERS[name], "improve"):
+            parser.error(f"{name} は改善ソルバーではありません（improve() がありません）")
+
+    instance = load_instance(args)
+    plot_dir = None
+    if args.plot or args.plot_dir:
+        plot_dir = args.plot_dir or os.path.join("results", datetime.datetime.now().strftime("%Y%m%d%H%M%S"))
+        os.makedirs(plot_dir, exist_ok=True)
+    solutions = run(instance, args.solvers, args.improve, quiet=args.quiet, plot_dir=plot_dir)
+    if args.out:
+        write_solutions(solutions, instance, args.out)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
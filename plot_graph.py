@@ -1,38 +1,150 @@
 import os
-import matplotlib.pyplot as plt
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
 from instance import Instance
 
+# ワーカープロセス側で使い回すレンダラー
+_worker_renderer: "RouteRenderer | None" = None
+
+
+class RouteRenderer:
+    """ルート図を描くレンダラー（pyplot を使わず Agg のオブジェクト指向APIで描画）
+
+    デポ・顧客の点と軸の設定はインスタンスごとに1度だけ作るテンプレートにし、
+    解ごとには全ルートを1つの LineCollection として差し替えて保存する。
+    """
+
+    def __init__(self, xs: np.ndarray, ys: np.ndarray, *, dpi: int = 100, figsize: tuple[float, float] = (7, 7)):
+        self.xs = np.asarray(xs, dtype=np.float64)
+        self.ys = np.asarray(ys, dtype=np.float64)
+        self.dpi = dpi
+        self.colors = colormaps["tab20"].colors
+
+        self.figure = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+        ax.scatter(self.xs[1:], self.ys[1:], c="blue", s=20, alpha=0.6, zorder=3)
+        ax.scatter(self.xs[0], self.ys[0], c="red", marker="*", s=200, label="Depot", zorder=4)
+        ax.grid(True)
+        ax.set_aspect("equal", adjustable="datalim")
+        ax.legend(loc="upper right")
+        self.routes = LineCollection([], linewidths=1.2, zorder=2)
+        ax.add_collection(self.routes)
+        ax.autoscale_view()
+        # タイトルの高さを確保してからレイアウトを固定する
+        self.title = ax.set_title("Routes")
+        self.figure.tight_layout()
+
+    @classmethod
+    def for_instance(cls, instance: Instance, **kwargs) -> "RouteRenderer":
+        return cls(instance.xs, instance.ys, **kwargs)
+
+    def render(self, routes: dict[int, list[int]], title: str, path: str) -> str:
+        """routes を描いて path に保存する（テンプレートの図を使い回す）"""
+        lines = []
+        colors = []
+        for i, (_, route) in enumerate(sorted(routes.items())):
+            if len(route) < 2:
+                continue
+            nodes = np.asarray(route)
+            lines.append(np.column_stack((self.xs[nodes], self.ys[nodes])))
+            colors.append(self.colors[i % len(self.colors)])
+        self.routes.set_segments(lines)
+        self.routes.set_color(colors)
+        self.title.set_text(title)
+        self.figure.savefig(path, dpi=self.dpi)
+        return path
+
+
+def plot_path(solution, out_dir: str) -> str:
+    """保存先のファイル名（ソルバー名.png）"""
+    solver_tag = (solution.solver_name or "solver").replace(" ", "_")
+    return os.path.join(out_dir, f"{solver_tag}.png")
+
+
+def plot_title(solution) -> str:
+    return f"Routes: {solution.solver_name} | dist={solution.total_distance:.2f}"
+
+
+# (インスタンスへの弱参照, Instance.version, レンダラー)。id() だと回収後に別のインスタンスが同じ値になりうる
+_renderer_cache: "tuple[weakref.ref, int, RouteRenderer] | None" = None
+
+
 def save_solution_plot(solution, instance: Instance, out_path: str) -> None:
     # 実行ごとに: results/YYYYMMDD/ に保存し、ファイル名に時刻＋ソルバー名を付与
-    solver_tag = (solution.solver_name or "solver").replace(" ", "_")
-    out_path = os.path.join(out_path, f"{solver_tag}.png")
-
-    id_to_customer = {c.id: c for c in instance.customers_with_depot}
-    depot = id_to_customer[0]
-
-    plt.figure(figsize=(7, 7))
-    # デポ
-    plt.scatter(depot.x, depot.y, c="red", marker="*", s=200, label="Depot")
-
-    colors = plt.cm.tab20.colors
-    for i, (k, route) in enumerate(sorted(solution.routes.items())):
-        if len(route) < 2:
-            continue
-        xs = [id_to_customer[n].x for n in route]
-        ys = [id_to_customer[n].y for n in route]
-        color = colors[i % len(colors)]
-        plt.plot(xs, ys, marker="o", color=color, label=f"Veh {k}")
-
-    # 顧客点（重ね描画・識別用）
-    cust_x = [c.x for c in instance.customers]
-    cust_y = [c.y for c in instance.customers]
-    plt.scatter(cust_x, cust_y, c="blue", s=20, alpha=0.6)
-
-    plt.title(f"Routes: {solution.solver_name} | dist={solution.total_distance:.2f}")
-    plt.legend()
-    plt.grid(True)
-    plt.axis("equal")
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=200)
-    plt.close()
-    print(f"Saved route plot: {out_path}")
+    global _renderer_cache
+    # 別のインスタンス、または地点の追加・移動で version が進んだら作り直す
+    if _renderer_cache is None or _renderer_cache[0]() is not instance or _renderer_cache[1] != instance.version:
+        _renderer_cache = (weakref.ref(instance), instance.version, RouteRenderer.for_instance(instance))
+    path = _renderer_cache[2].render(solution.routes, plot_title(solution), plot_path(solution, out_path))
+    print(f"Saved route plot: {path}")
+
+
+class BackgroundPlotter:
+    """ルート図をプロセスプールで描画し、solve のループを止めないようにする
+
+    - submit(solution, out_dir): 描画を予約して Future を返す（enabled=False なら何もせず None）
+    - ワーカーには座標だけを1度渡し、解ごとにはルート・タイトル・保存先だけを送る
+      （地点の追加・移動で Instance.version が進んだら、新しい座標でプールを作り直して1度だけ渡す。
+      残っている描画は古いプールで最後まで描く）
+    - close() / with 文の終了時に残りの描画を待つ
+    """
+
+    def __init__(self, instance: Instance, *, workers: int = 1, enabled: bool = True, dpi: int = 100):
+        self.enabled = enabled
+        self.futures: list[Future] = []
+        self.executor = None
+        self.instance = instance
+        self.dpi = dpi
+        self.workers = workers
+        self.version = instance.version
+        if enabled:
+            self.executor = self._start_pool()
+
+    def submit(self, solution, out_dir: str) -> Future | None:
+        if not self.enabled:
+            return None
+        if self.instance.version != self.version:
+            # 各ワーカーのテンプレートが古い座標のままなので、新しい座標でプールを作り直す
+            self.executor.shutdown(wait=False)
+            self.version = self.instance.version
+            self.executor = self._start_pool()
+        routes = {int(k): [int(c) for c in r] for k, r in solution.routes.items()}
+        future = self.executor.submit(_render_in_worker, routes, plot_title(solution), plot_path(solution, out_dir))
+        self.futures.append(future)
+        return future
+
+    def close(self) -> list[str]:
+        """残りの描画を待って保存したパスを返す"""
+        if self.executor is None:
+            return []
+        self.executor.shutdown(wait=True)
+        paths = [f.result() for f in self.futures]
+        self.futures = []
+        return paths
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        coords = (np.array(self.instance.xs), np.array(self.instance.ys))
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(*coords, self.dpi))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _init_worker(xs: np.ndarray, ys: np.ndarray, dpi: int):
+    global _worker_renderer
+    _worker_renderer = RouteRenderer(xs, ys, dpi=dpi)
+
+
+def _render_in_worker(routes: dict[int, list[int]], title: str, path: str) -> str:
+    return _worker_renderer.render(routes, title, path)
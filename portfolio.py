@@ -0,0 +1,181 @@
+import copy
+import inspect
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from instance import Instance
+from solution import Solution, solution_rank
+
+# ワーカープロセス側で保持するインスタンス（距離行列は共有メモリ上のビュー）
+_worker_instance: Instance | None = None
+_worker_shm: shared_memory.SharedMemory | None = None
+
+
+@dataclass
+class PortfolioResult:
+    """ポートフォリオ実行の結果
+
+    - best: 最良の解（実行可能な解を優先し、総距離最小）
+    - solutions: ラベル -> 解（時間内に終わったもののみ）
+    - timings: ラベル -> ワーカー内での実行時間（秒）
+    - cancelled: 時間切れで打ち切ったジョブのラベル
+    - errors: ラベル -> 例外メッセージ
+    """
+
+    best: Solution | None
+    solutions: dict[str, Solution] = field(default_factory=dict)
+    timings: dict[str, float] = field(default_factory=dict)
+    cancelled: list[str] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)
+    wall_time_s: float = 0.0
+
+
+def run_portfolio(
+    instance: Instance,
+    solvers: list,
+    *,
+    seeds: list[int] | None = None,
+    max_workers: int | None = None,
+    time_limit: float | None = None,
+) -> PortfolioResult:
+    """複数のソルバー（とシード）をプロセスプールで並列に実行し、最良解を返す
+
+    - solvers: ソルバークラス、または (ソルバークラス, kwargs) の組のリスト
+    - seeds: コンストラクタに seed 引数を持つソルバーはシードごとに別ジョブとして実行
+    - time_limit: 全体の実行時間上限（秒）。超過したジョブは取り消し、実行中のワーカーは停止する
+
+    距離行列は共有メモリに1度だけ置き、各ワーカーはそれをコピーせずに参照する。
+    """
+    start = time.perf_counter()
+    jobs = _expand_jobs(solvers, seeds)
+
+    if isinstance(instance.distances, np.ndarray):
+        distances = np.ascontiguousarray(instance.distances)
+        shm = shared_memory.SharedMemory(create=True, size=max(distances.nbytes, 1))
+        np.ndarray(distances.shape, dtype=distances.dtype, buffer=shm.buf)[...] = distances
+        # 距離行列を除いたインスタンスを各ワーカーに1度だけ渡す（予備領域 _buffers は __getstate__ で除かれる）
+        light = copy.copy(instance)
+        light.distances = None
+        initargs = (shm.name, distances.shape, distances.dtype.str, light)
+    else:
+        # 座標から計算する距離（LazyDistances）は座標だけを送り、ワーカーごとに計算する
+        shm = None
+        initargs = (None, None, None, instance)
+    # 時間切れで止めるワーカーの PID（各ワーカーが起動時に書き込む）
+    worker_pids = multiprocessing.SimpleQueue()
+    try:
+        result = PortfolioResult(best=None)
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers or min(len(jobs), os.cpu_count() or 1),
+            initializer=_init_worker,
+            initargs=(worker_pids, *initargs),
+        )
+        try:
+            futures = {executor.submit(_run_job, cls, kwargs): label for label, cls, kwargs in jobs}
+            done, not_done = wait(futures, timeout=time_limit)
+            for future in done:
+                label = futures[future]
+                try:
+                    solution, elapsed = future.result()
+                except Exception as e:
+                    result.errors[label] = repr(e)
+                    continue
+                solution.meta.setdefault("portfolio_label", label)
+                result.solutions[label] = solution
+                result.timings[label] = elapsed
+            result.cancelled = sorted(futures[f] for f in not_done)
+        except BaseException:
+            _terminate(executor, worker_pids)
+            raise
+        if result.cancelled:
+            _terminate(executor, worker_pids)
+        else:
+            executor.shutdown(wait=True)
+    finally:
+        worker_pids.close()
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    result.best = _pick_best(result.solutions.values())
+    result.wall_time_s = time.perf_counter() - start
+    return result
+
+
+# ===== 内部ヘルパー =====
+def _expand_jobs(solvers: list, seeds: list[int] | None) -> list[tuple[str, type, dict]]:
+    """ソルバー指定とシードから (ラベル, クラス, kwargs) のジョブ列を作る"""
+    jobs = []
+    for spec in solvers:
+        cls, kwargs = spec if isinstance(spec, tuple) else (spec, {})
+        name = cls.__name__
+        if seeds and "seed" in inspect.signature(cls.__init__).parameters:
+            for seed in seeds:
+                jobs.append((f"{name}[seed={seed}]", cls, {**kwargs, "seed": seed}))
+        else:
+            jobs.append((name, cls, dict(kwargs)))
+
+    # 同名ジョブ（同じクラスを別パラメータで複数回）は連番で区別する
+    counts: dict[str, int] = {}
+    labeled = []
+    for label, cls, kwargs in jobs:
+        counts[label] = counts.get(label, 0) + 1
+        labeled.append((label if counts[label] == 1 else f"{label}#{counts[label]}", cls, kwargs))
+    return labeled
+
+
+def _init_worker(
+    worker_pids, shm_name: str | None, shape: tuple[int, ...] | None, dtype: str | None, instance: Instance,
+):
+    global _worker_instance, _worker_shm
+    # ワーカーごとにプロセスグループを分け、停止時に子プロセス（CBC等）もまとめて止められるようにする
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    worker_pids.put(os.getpid())
+    if shm_name is None:
+        _worker_instance = instance
+        return
+    if sys.version_info >= (3, 13):
+        _worker_shm = shared_memory.SharedMemory(name=shm_name, track=False)
+    else:
+        _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    distances = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_worker_shm.buf)
+    distances.flags.writeable = False
+    instance.distances = distances
+    _worker_instance = instance
+
+
+def _run_job(cls: type, kwargs: dict) -> tuple[Solution, float]:
+    start = time.perf_counter()
+    solution = cls(_worker_instance, **kwargs).solve()
+    return solution, time.perf_counter() - start
+
+
+def _terminate(executor: ProcessPoolExecutor, worker_pids):
+    """未着手のジョブを取り消し、実行中のワーカープロセスを停止する"""
+    # 実行中のジョブを中断する公開APIがないため、起動時に受け取った PID でワーカーを直接止める
+    pids = []
+    while not worker_pids.empty():
+        pids.append(worker_pids.get())
+    for pid in pids:
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(pid, signal.SIGTERM)
+            else:
+                os.kill(pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+    # ワーカーが止まったので、残りのジョブを取り消して終了を待つ
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _pick_best(solutions) -> Solution | None:
+    return min(solutions, key=solution_rank, default=None)
@@ -1,6 +1,8 @@
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Any
 
+import numpy as np
+
 
 @dataclass
 class Solution:
@@ -14,6 +16,7 @@ class Solution:
     - runtime_s: 実行時間（秒）
     - solver_name: ソルバー名（例: 'MIP(CBC)', 'Savings'）
     - meta: 任意メタ情報（パラメータ等）
+    - store: attach_store() で作る配列ベースの経路表現（RouteStore）。作っていなければ None
     """
 
     routes: Dict[int, List[int]]
@@ -24,6 +27,7 @@ class Solution:
     runtime_s: Optional[float] = None
     solver_name: Optional[str] = None
     meta: Dict[str, Any] = field(default_factory=dict)
+    store: Optional["RouteStore"] = field(default=None, repr=False, compare=False)
 
     # 後方互換: dict風アクセスを一部サポート
     def __getitem__(self, key: str):
@@ -42,9 +46,239 @@ class Solution:
         raise KeyError(key)
 
     def num_vehicles_used(self) -> int:
+        if self.store is not None:
+            return self.store.num_routes_used()
         return sum(1 for r in self.routes.values() if len(r) > 2)
 
+    def attach_store(self, instance) -> "RouteStore":
+        """routes から RouteStore を作って保持する（instance の distances / demands を使う）"""
+        self.store = RouteStore(self.routes, instance.distances, instance.demands)
+        return self.store
+
+    def sync_routes(self) -> None:
+        """store への編集を routes / 総距離に書き戻す"""
+        if self.store is None:
+            return
+        self.routes = self.store.to_dict()
+        self.total_distance = self.objective_value = self.store.total_cost()
+
     def ratio_to(self, reference_value: float) -> Optional[float]:
         if reference_value and reference_value > 0:
             return self.objective_value / reference_value
-        return None
\ No newline at end of file
+        return None
+
+def solution_rank(solution: Solution) -> tuple:
+    """解の良さの比較キー（小さいほど良い）: 実行可能を優先し、全顧客を訪問した解、総距離の順"""
+    value = solution.total_distance if solution.total_distance is not None else solution.objective_value
+    return (not solution.is_feasible, solution.status == "Partial", value)
+
+
+class RouteStore:
+    """配列ベースのコンパクトな経路表現（デポ 0 は持たず、顧客だけを並べる）
+
+    - nodes: 全経路の顧客を経路ごとのブロックに並べた平坦な配列（各ブロックの末尾は挿入用の空き、-1）
+    - starts / lengths: 経路 r の顧客は nodes[starts[r]:starts[r] + lengths[r]]
+    - route_ids: 経路 r の車両ID
+    - route_of / pos: ノード -> 経路番号 / 経路内の位置（未訪問は -1）
+    - loads / costs: 経路ごとの積載量と距離（デポとの往復を含む）のキャッシュ
+
+    ノードの経路・位置の参照は O(1)、挿入・削除は該当経路内のずらしだけで済む。
+    """
+
+    def __init__(self, routes: Dict[int, List[int]], distances, demands, *, slack: int = 4):
+        self.distances = distances
+        self.demands = np.asarray(demands, dtype=np.float64)
+        self.slack = slack
+        items = sorted(routes.items())
+        self.route_ids = np.array([k for k, _ in items], dtype=np.int64)
+        self._pack([[c for c in r if c != 0] for _, r in items])
+        self._recompute()
+
+    # ===== 参照 =====
+    def route_index(self, node: int) -> int:
+        """ノードが属する経路番号（未訪問は -1）"""
+        return int(self.route_of[node])
+
+    def position(self, node: int) -> int:
+        """経路内の位置（デポを除いて 0 始まり）"""
+        return int(self.pos[node])
+
+    def vehicle_of(self, node: int) -> Optional[int]:
+        r = self.route_of[node]
+        return None if r < 0 else int(self.route_ids[r])
+
+    def route(self, r: int) -> np.ndarray:
+        """経路 r の顧客列（デポを含まない、nodes のビュー）"""
+        s = self.starts[r]
+        return self.nodes[s:s + self.lengths[r]]
+
+    def load(self, r: int) -> float:
+        return float(self.loads[r])
+
+    def cost(self, r: int) -> float:
+        return float(self.costs[r])
+
+    def total_cost(self) -> float:
+        return float(self.costs.sum())
+
+    def num_routes(self) -> int:
+        return len(self.route_ids)
+
+    def num_routes_used(self) -> int:
+        return int(np.count_nonzero(self.lengths))
+
+    def unvisited(self) -> np.ndarray:
+        """どの経路にも入っていない顧客ID"""
+        return np.flatnonzero(self.route_of[1:] < 0) + 1
+
+    def is_feasible(self, capacity: float) -> bool:
+        """全顧客を訪問し、どの経路も容量以内か"""
+        return bool(np.all(self.loads <= capacity + 1e-9)) and len(self.unvisited()) == 0
+
+    def to_dict(self) -> Dict[int, List[int]]:
+        """Solution.routes と同じ 車両ID -> [0, ..., 0] の形に戻す"""
+        return {
+            int(k): [0] + self.route(r).tolist() + [0]
+            for r, k in enumerate(self.route_ids)
+        }
+
+    # ===== 差分評価 =====
+    def insertion_delta(self, node: int, r: int, position: int) -> float:
+        """node を経路 r の position に挿入したときの距離の増分"""
+        a, b = self._neighbors(r, position)
+        d = self.distances
+        return float(d[a, node] + d[node, b] - d[a, b])
+
+    def removal_delta(self, node: int) -> float:
+        """node を今の経路から外したときの距離の増分（通常は負）"""
+        r, p = self.route_of[node], self.pos[node]
+        a = self._at(r, p - 1)
+        b = self._at(r, p + 1)
+        d = self.distances
+        return float(d[a, b] - d[a, node] - d[node, b])
+
+    # ===== 編集 =====
+    def insert(self, node: int, r: int, position: int) -> None:
+        """未訪問の node を経路 r の position（0..lengths[r]）に挿入する"""
+        if self.route_of[node] >= 0:
+            raise ValueError(f"ノード {node} は既に経路 {self.route_of[node]} にあります")
+        length = self.lengths[r]
+        if not 0 <= position <= length:
+            raise IndexError(position)
+        delta = self.insertion_delta(node, r, position)
+        if length == self.block_sizes[r]:
+            self._grow(r)
+        s = self.starts[r]
+        tail = self.nodes[s + position:s + length]
+        self.pos[tail] += 1
+        self.nodes[s + position + 1:s + length + 1] = tail.copy()
+        self.nodes[s + position] = node
+        self.route_of[node] = r
+        self.pos[node] = position
+        self.lengths[r] += 1
+        self.loads[r] += self.demands[node]
+        self.costs[r] += delta
+
+    def remove(self, node: int) -> None:
+        """node を今の経路から外す（未訪問に戻る）"""
+        r = self.route_of[node]
+        if r < 0:
+            raise ValueError(f"ノード {node} はどの経路にもありません")
+        delta = self.removal_delta(node)
+        p, s, length = self.pos[node], self.starts[r], self.lengths[r]
+        tail = self.nodes[s + p + 1:s + length]
+        self.pos[tail] -= 1
+        self.nodes[s + p:s + length - 1] = tail.copy()
+        self.nodes[s + length - 1] = -1
+        self.route_of[node] = -1
+        self.pos[node] = -1
+        self.lengths[r] -= 1
+        self.loads[r] -= self.demands[node]
+        self.costs[r] += delta
+
+    def move(self, node: int, r: int, position: int) -> None:
+        """node を経路 r の position に移す（position は node を外した後の経路での位置）"""
+        self.remove(node)
+        self.insert(node, r, position)
+
+    def set_route(self, r: int, nodes) -> None:
+        """経路 r の顧客列を nodes（デポを含まない、同じ顧客の並べ替え）に置き換える"""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if len(nodes) != self.lengths[r] or not np.array_equal(np.sort(nodes), np.sort(self.route(r))):
+            raise ValueError("set_route は同じ顧客の並べ替えにだけ使えます")
+        s = self.starts[r]
+        self.nodes[s:s + len(nodes)] = nodes
+        self.pos[nodes] = np.arange(len(nodes))
+        path = np.concatenate(([0], nodes, [0]))
+        self.costs[r] = float(np.asarray(self.distances[path[:-1], path[1:]], dtype=np.float64).sum())
+
+    def rebind(self, distances, demands) -> None:
+        """インスタンスに地点が追加された後、新しい距離行列・需要配列に付け替える"""
+        self.distances = distances
+        self.demands = np.asarray(demands, dtype=np.float64)
+        extra = len(self.demands) - len(self.route_of)
+        if extra > 0:
+            self.route_of = np.concatenate((self.route_of, np.full(extra, -1, dtype=np.int64)))
+            self.pos = np.concatenate((self.pos, np.full(extra, -1, dtype=np.int64)))
+
+    def add_route(self, vehicle_id: int) -> int:
+        """空の経路を追加して経路番号を返す"""
+        bodies = [self.route(r).tolist() for r in range(self.num_routes())] + [[]]
+        self.route_ids = np.append(self.route_ids, vehicle_id)
+        self.loads = np.append(self.loads, 0.0)
+        self.costs = np.append(self.costs, 0.0)
+        self._pack(bodies)
+        return self.num_routes() - 1
+
+    # ===== 内部ヘルパー =====
+    def _pack(self, bodies: List[List[int]], sizes: Optional[np.ndarray] = None) -> None:
+        """経路ごとの顧客列から平坦な配列と索引を作り直す（ブロックサイズ = 顧客数 + slack）"""
+        lengths = np.array([len(b) for b in bodies], dtype=np.int64)
+        if sizes is None:
+            sizes = lengths + self.slack
+        self.lengths = lengths
+        self.block_sizes = np.asarray(sizes, dtype=np.int64)
+        self.starts = np.concatenate(([0], np.cumsum(self.block_sizes)[:-1])).astype(np.int64)
+
+        self.nodes = np.full(int(self.block_sizes.sum()), -1, dtype=np.int64)
+        flat = np.fromiter((c for b in bodies for c in b), dtype=np.int64, count=int(lengths.sum()))
+        route_idx = np.repeat(np.arange(len(bodies), dtype=np.int64), lengths)
+        offsets = np.arange(len(flat), dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        self.nodes[self.starts[route_idx] + offsets] = flat
+
+        self.route_of = np.full(len(self.demands), -1, dtype=np.int64)
+        self.pos = np.full(len(self.demands), -1, dtype=np.int64)
+        self.route_of[flat] = route_idx
+        self.pos[flat] = offsets
+
+    def _recompute(self) -> None:
+        """積載量と距離のキャッシュを配列演算でまとめて計算し直す"""
+        num = self.num_routes()
+        used = self.nodes >= 0
+        flat = self.nodes[used]
+        route_idx = self.route_of[flat]
+        offsets = self.pos[flat]
+        # 各顧客の直前の地点（経路先頭ならデポ）
+        prev = np.zeros_like(flat)
+        prev[1:] = flat[:-1]
+        prev[offsets == 0] = 0
+        last = flat[offsets == self.lengths[route_idx] - 1]
+        d = self.distances
+        self.loads = np.bincount(route_idx, weights=self.demands[flat], minlength=num).astype(np.float64)
+        self.costs = np.bincount(route_idx, weights=np.asarray(d[prev, flat], dtype=np.float64), minlength=num)
+        self.costs[self.route_of[last]] += np.asarray(d[last, 0], dtype=np.float64)
+
+    def _grow(self, r: int) -> None:
+        """経路 r のブロックが満杯になったら、ブロックを倍にして詰め直す"""
+        sizes = self.block_sizes.copy()
+        sizes[r] = max(2 * sizes[r], sizes[r] + self.slack, 1)
+        self._pack([self.route(i).tolist() for i in range(self.num_routes())], sizes)
+
+    def _at(self, r: int, p: int) -> int:
+        """経路 r の p 番目の地点（範囲外はデポ 0）"""
+        if p < 0 or p >= self.lengths[r]:
+            return 0
+        return int(self.nodes[self.starts[r] + p])
+
+    def _neighbors(self, r: int, position: int) -> tuple:
+        return self._at(r, position - 1), self._at(r, position)
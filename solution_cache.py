@@ -0,0 +1,237 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+
+from instance import Instance
+from solution import Solution
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# キャッシュファイルの拡張子（この形式を変えたら上げる）
+CACHE_VERSION = 1
+_SUFFIX = f".v{CACHE_VERSION}.pkl"
+
+
+class SolutionCache:
+    """同一インスタンス x 同一ソルバー設定の解をディスクに保存して再利用するキャッシュ
+
+    - キー: インスタンスの配列（座標・需要・距離行列）・容量・車両と、ソルバーのクラス・コンストラクタ引数のハッシュ
+    - 保存先: directory/<キー>.v1.pkl（1エントリ1ファイル）
+    - 容量: 合計が max_bytes を超えたら、最後に使われた時刻（mtime）が古いものから消す
+    - 複数プロセスから同時に使える: 書き込みは一時ファイル + os.replace、読めないファイルはミス扱い、
+      削除はロックファイルで1プロセスずつ行う
+
+    乱数シードを固定しないソルバーや時間制限付きのソルバーは、同じキーでも毎回同じ解になるとは限らない点に注意。
+    """
+
+    def __init__(self, directory: str, *, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "stale": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def solve(self, solver) -> Solution:
+        """キャッシュにあればそれを、なければ solver.solve() の結果を保存して返す"""
+        start = time.perf_counter()
+        key = self.key(solver)
+        cached = self.get(key)
+        if cached is not None and not _matches_instance(cached, solver.instance):
+            # ハッシュの衝突や、別の内容で書かれたファイル: ミスとして解き直す
+            self.stats["hits"] -= 1
+            self.stats["misses"] += 1
+            self.stats["stale"] += 1
+            cached = None
+        if cached is not None:
+            cached.meta["cache"] = {"hit": True, "key": key, "lookup_s": time.perf_counter() - start}
+            solver.solution = cached
+            return cached
+        solution = solver.solve()
+        self.put(key, solution)
+        solution.meta["cache"] = {"hit": False, "key": key}
+        return solution
+
+    def key(self, solver) -> str:
+        h = hashlib.sha256()
+        h.update(instance_fingerprint(solver.instance).encode())
+        h.update(type(solver).__module__.encode() + b"." + type(solver).__qualname__.encode())
+        h.update(json.dumps(solver_params(solver), sort_keys=True, default=_canonical).encode())
+        return h.hexdigest()
+
+    def get(self, key: str) -> Solution | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                solution = pickle.load(f)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            # 壊れたファイル（書き込み途中で落ちた等）は消してミス扱い
+            _remove(path)
+            self.stats["misses"] += 1
+            return None
+        # LRU のため最終利用時刻を更新
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.stats["hits"] += 1
+        return solution
+
+    def put(self, key: str, solution: Solution):
+        path = self._path(key)
+        stored = Solution(
+            routes=solution.routes,
+            objective_value=solution.objective_value,
+            total_distance=solution.total_distance,
+            status=solution.status,
+            is_feasible=solution.is_feasible,
+            runtime_s=solution.runtime_s,
+            solver_name=solution.solver_name,
+            meta={k: v for k, v in solution.meta.items() if k != "cache"},
+        )
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.stats["stores"] += 1
+        self.evict()
+
+    def evict(self):
+        """合計サイズが max_bytes 以下になるまで、最後に使われたのが古い順に消す"""
+        with self._lock():
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(_SUFFIX):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                if _remove(path):
+                    self.stats["evictions"] += 1
+                total -= size
+
+    def clear(self):
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(_SUFFIX):
+                    _remove(entry.path)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def _lock(self):
+        return _FileLock(os.path.join(self.directory, ".lock"))
+
+
+def instance_fingerprint(instance: Instance) -> str:
+    """インスタンスの内容のハッシュ（同じ内容なら別オブジェクトでも同じ値）
+
+    配列は呼び出し側から直接書き換えられることがあるので、インスタンスには保持せず毎回計算する
+    （SolutionCache.solve では1回の呼び出しにつき1度）。
+    """
+    h = hashlib.sha256()
+    for array in (instance.xs, instance.ys, instance.demands, instance.vehicle_capacities):
+        _update_array(h, array)
+    h.update(repr((float(instance.capacity), int(instance.num_vehicles))).encode())
+    # 距離行列は丸めや明示的な行列で座標と一致しないことがあるので中身ごと含める
+    # （座標から計算する LazyDistances は座標で決まるので、種類と dtype だけを含める）
+    if isinstance(instance.distances, np.ndarray):
+        _update_array(h, instance.distances)
+    elif instance.distances is not None:
+        h.update(f"{type(instance.distances).__name__}{instance.distances.dtype.str}".encode())
+    return h.hexdigest()
+
+
+def _matches_instance(solution: Solution, instance: Instance) -> bool:
+    """キャッシュした解が今のインスタンスで成り立つか（存在する顧客だけを訪問し、実行可能なら容量内か）"""
+    n = len(instance.demands)
+    for route in solution.routes.values():
+        if any(c < 0 or c >= n for c in route):
+            return False
+        if solution.is_feasible and float(instance.demands[route].sum()) > instance.capacity + 1e-9:
+            return False
+    return True
+
+
+def solver_params(solver) -> dict:
+    """ソルバーのコンストラクタ引数（instance 以外）を、同名の属性から集める"""
+    params = {}
+    for name in inspect.signature(type(solver).__init__).parameters:
+        if name in ("self", "instance"):
+            continue
+        if hasattr(solver, name):
+            params[name] = getattr(solver, name)
+    return params
+
+
+# ===== 内部ヘルパー =====
+def _update_array(h, array: np.ndarray):
+    array = np.ascontiguousarray(array)
+    h.update(f"{array.dtype.str}{array.shape}".encode())
+    h.update(memoryview(array).cast("B"))
+
+
+def _canonical(value):
+    """json.dumps で直接書けない引数を、内容を表す値に変換する"""
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if isinstance(value, Solution):
+        return {"routes": {str(k): list(map(int, r)) for k, r in sorted(value.routes.items())}}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, "instance") and hasattr(value, "solve"):
+        # 他のソルバー（LocalSearch の initial_solver 等）はクラスと引数で表す
+        return {"solver": _canonical(type(value)), "params": solver_params(value)}
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return repr(value)
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+class _FileLock:
+    """ディレクトリ単位の排他ロック（fcntl がない環境ではロックしない）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.file = open(self.path, "a")
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.file is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
@@ -1,60 +1,72 @@
 from .vrp_solver import VRPSolver
+from .neighbors import NearestNeighborEngine
+from instance import Instance
 import time
-from typing import Set
 
 
 class NNSolver(VRPSolver):
-    """最近傍(Nearest Neighbor)で貪欲にルートを作る簡易ソルバー"""
+    """最近傍(Nearest Neighbor)で貪欲にルートを作る簡易ソルバー
+
+    neighbor_k: 最近傍探索で事前計算する候補リストの長さ
+    """
+
+    def __init__(self, instance: Instance, neighbor_k: int = 32):
+        super().__init__(instance)
+        self.neighbor_k = neighbor_k
 
     def solve(self):
-        start = time.time()
+        start = self._begin_solve()
 
-        unvisited: Set[int] = {c.id for c in self.customers_with_depot}
+        with self.phase("candidates"):
+            engine = NearestNeighborEngine(self.distances, self.demands, k=self.neighbor_k)
         routes: dict[int, list[int]] = {}
         total_distance: float = 0.0
 
         # 各車両ごとにデポから開始して、積載が許す限り最近傍の顧客を追加
-        for v in self.vehicles:
-            capacity_left = v.capacity
-            current = 0
-            route: list[int] = [0]
+        with self.phase("construct"):
+            for v in self.vehicles:
+                capacity_left = v.capacity
+                current = 0
+                route: list[int] = [0]
 
-            while True:
-                # 追加可能な候補の中で最近傍
-                candidates = [cid for cid in unvisited if self._demand(cid) <= capacity_left]
-                if not candidates:
-                    break
-                next_id = min(candidates, key=lambda cid: self.distances[current, cid])
+                while True:
+                    # 追加可能な候補の中で最近傍
+                    next_id = engine.nearest_feasible(current, capacity_left)
+                    if next_id is None:
+                        break
 
-                # ルートに追加
-                route.append(next_id)
-                total_distance += self.distances[current, next_id]
-                capacity_left -= self._demand(next_id)
-                current = next_id
-                unvisited.remove(next_id)
+                    # ルートに追加
+                    route.append(next_id)
+                    total_distance += self.distances[current, next_id]
+                    capacity_left -= self._demand(next_id)
+                    current = next_id
+                    engine.visit(next_id)
 
-            # デポへ戻る
-            total_distance += self.distances[current, 0]
-            route.append(0)
-            routes[v.id] = route
+                # デポへ戻る
+                total_distance += self.distances[current, 0]
+                route.append(0)
+                routes[v.id] = route
+
+                if engine.remaining == 0:
+                    break
 
-            if not unvisited:
-                break
+        if self.instrumentation.enabled:
+            self.instrumentation.count("candidate_list_hits", engine.stats["list_hits"])
+            self.instrumentation.count("fallback_scans", engine.stats["fallback_scans"])
+            self.instrumentation.count("distance_lookups", sum(len(r) - 1 for r in routes.values()))
 
-        runtime = time.time() - start
-        status = "Feasible" if not unvisited else "Partial"
-        sol = self._make_solution(routes, total_distance, status=status, runtime_s=runtime, solver_name="NN")
+        runtime = time.perf_counter() - start
+        status = "Feasible" if engine.remaining == 0 else "Partial"
+        sol = self._make_solution(
+            routes, total_distance, status=status, runtime_s=runtime, solver_name="NN",
+            meta={"neighbor_k": self.neighbor_k, **engine.stats},
+        )
         self.solution = sol
         return sol
 
     def _demand(self, cid: int) -> float:
-        # 顧客ID -> 需要
-        # Vは [depot(0)] + customers(1..N) なので、idに一致するものを引く
-        # 規模が小さいため線形検索で充分
-        for c in self.customers_with_depot:
-            if c.id == cid:
-                return c.demand
-        return 0.0
+        # 顧客ID -> 需要（需要配列を ID で直接引く）
+        return float(self.demands[cid])
 
     def print_solution(self):
         if self.solution is None:
@@ -1,6 +1,77 @@
+import importlib
+from collections.abc import Mapping
+
 from .vrp_solver import VRPSolver
-from .mip_solver import VRPSolverMIP
-from .NN_solver import NNSolver
-from .sweep_solver import SweepSolver, SweepNearestSolver
 
-__all__ = ["VRPSolver", "VRPSolverMIP", "NNSolver", "SweepSolver", "SweepNearestSolver"]
\ No newline at end of file
+# クラス名 -> 定義しているモジュール
+# pulp（MIP）や pyvroom（VROOM）のように読み込みが重いソルバーがあるので、
+# `from solver import XxxSolver` や SOLVERS["Xxx"] で初めて使うときにモジュールを読み込む
+_LAZY_CLASSES = {
+    "VRPSolverMIP": ".mip_solver",
+    "NNSolver": ".NN_solver",
+    "SweepSolver": ".sweep_solver",
+    "SweepNearestSolver": ".sweep_solver",
+    "LocalSearch": ".local_search",
+    "SavingsSolver": ".savings_solver",
+    "DecompositionSolver": ".decomposition_solver",
+    "IncrementalReoptimizer": ".incremental",
+    "SplitSolver": ".split_solver",
+    "VroomSolver": ".vroom_solver",
+    "ALNSSolver": ".alns",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_CLASSES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    cls = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = cls
+    return cls
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_CLASSES))
+
+
+class _SolverRegistry(Mapping):
+    """名前 -> ソルバークラス
+
+    名前の一覧（list(SOLVERS)・in・len）ではモジュールを読み込まず、
+    SOLVERS[name] で引いたソルバーのモジュールだけを読み込む。
+    """
+
+    def __init__(self, class_names: dict[str, str]):
+        self._class_names = class_names
+
+    def __getitem__(self, name: str) -> type:
+        return __getattr__(self._class_names[name])
+
+    def __contains__(self, name) -> bool:
+        return name in self._class_names
+
+    def __iter__(self):
+        return iter(self._class_names)
+
+    def __len__(self) -> int:
+        return len(self._class_names)
+
+    def __repr__(self) -> str:
+        return f"SOLVERS({list(self._class_names)})"
+
+
+# 名前 -> ソルバークラス（CLI・バッチ・ベンチマークから名前で指定する用）
+SOLVERS = _SolverRegistry({
+    "NN": "NNSolver",
+    "Sweep": "SweepSolver",
+    "SweepNearest": "SweepNearestSolver",
+    "Savings": "SavingsSolver",
+    "LS": "LocalSearch",
+    "MIP": "VRPSolverMIP",
+    "Decomposition": "DecompositionSolver",
+    "Split": "SplitSolver",
+    "VROOM": "VroomSolver",
+    "ALNS": "ALNSSolver",
+})
+
+__all__ = ["VRPSolver", "VRPSolverMIP", "NNSolver", "SweepSolver", "SweepNearestSolver", "LocalSearch", "SavingsSolver", "DecompositionSolver", "IncrementalReoptimizer", "SplitSolver", "VroomSolver", "ALNSSolver", "SOLVERS"]
@@ -0,0 +1,490 @@
+import math
+import random
+import time
+from typing import Iterator
+
+import numpy as np
+
+from .vrp_solver import VRPSolver
+from .neighbors import k_nearest_neighbors
+from instance import Instance
+from solution import Solution
+
+# 改善とみなす最小の距離減少量（浮動小数誤差で往復しないように）
+EPS = 1e-9
+
+
+class ALNSSolver(VRPSolver):
+    """適応型大近傍探索（ALNS: 壊して作り直す）で既存の解を改善するソルバー
+
+    - 破壊: random（無作為） / worst（外すと距離が大きく減る顧客） / shaw（近くて需要の似た顧客） /
+      string（近いルートから連続する顧客の列）
+    - 修復: greedy（挿入コスト最小の顧客から） / regret（regret_k 番目までの差が大きい顧客から）
+    - 操作の選択: 重みに比例したルーレット。segment_length 回ごとに、得点（最良更新 / 改善 / 受理）で重みを更新
+    - 受理: 焼きなまし法。初期温度は「初期解の顧客1人あたりの距離の start_worse 倍だけ悪い解を 1/2 の確率で受理」
+      となる温度で、時間（なければ反復回数）の進みに応じて end_temperature_ratio 倍まで下げる
+      （1回に動かすのは一部の顧客だけなので、総距離ではなく1人あたりの距離を基準にする）
+
+    挿入コストは (未挿入の顧客 x ルート) の表にまとめて持ち、挿入したルートの列だけを計算し直す。
+    挿入先の候補は、外したルートと各顧客の近傍（neighbor_k）が乗るルート、空のルート1本に絞る。
+    入らない顧客は未訪問のまま残し、未訪問1人あたり「どの顧客を1台で往復するより大きい」罰則を加えた値で比べる。
+
+    solve() は initial_solver（既定: NNSolver）の解を improve() する。
+    他のソルバーの後処理として使う場合は improve(solution) を直接呼ぶ。
+    """
+
+    REMOVALS = ("random", "worst", "shaw", "string")
+    INSERTIONS = ("greedy", "regret")
+
+    def __init__(
+        self,
+        instance: Instance,
+        initial_solver: VRPSolver | None = None,
+        *,
+        time_limit: float | None = 10.0,
+        max_iterations: int | None = None,
+        seed: int | None = None,
+        removals: tuple[str, ...] = REMOVALS,
+        insertions: tuple[str, ...] = INSERTIONS,
+        min_remove: int = 5,
+        max_remove: int = 30,
+        regret_k: int = 3,
+        neighbor_k: int = 20,
+        max_string_length: int = 10,
+        segment_length: int = 100,
+        reaction: float = 0.1,
+        scores: tuple[float, float, float] = (33.0, 9.0, 13.0),
+        start_worse: float = 0.1,
+        end_temperature_ratio: float = 0.002,
+    ):
+        super().__init__(instance)
+        if time_limit is None and max_iterations is None:
+            raise ValueError("time_limit と max_iterations の少なくとも一方を指定してください")
+        unknown = (set(removals) - set(self.REMOVALS)) | (set(insertions) - set(self.INSERTIONS))
+        if unknown:
+            raise ValueError(f"未知の操作です: {sorted(unknown)}")
+        self.initial_solver = initial_solver
+        self.time_limit = time_limit
+        self.max_iterations = max_iterations
+        self.seed = seed
+        self.removals = tuple(removals)
+        self.insertions = tuple(insertions)
+        self.min_remove = min_remove
+        self.max_remove = max_remove
+        self.regret_k = regret_k
+        self.neighbor_k = neighbor_k
+        self.max_string_length = max_string_length
+        self.segment_length = segment_length
+        self.reaction = reaction
+        self.scores = scores
+        self.start_worse = start_worse
+        self.end_temperature_ratio = end_temperature_ratio
+        self._neighbors: list[list[int]] | None = None
+
+    def solve(self):
+        sol = self.improve(self._initial_solution())
+        self.solution = sol
+        return sol
+
+    def improve(self, solution: Solution) -> Solution:
+        """solution を ALNS で改善した新しい Solution を返す（元の solution は変更しない）"""
+        for result in self._search(solution, self.time_limit, every_best=False):
+            pass
+        return result
+
+    def iter_improve(self, solution: Solution, time_limit: float | None = None) -> Iterator[Solution]:
+        """improve() と同じ探索を行い、最良解を更新するたびにその解を返す"""
+        if self.time_limit is not None:
+            time_limit = self.time_limit if time_limit is None else min(time_limit, self.time_limit)
+        yield from self._search(solution, time_limit, every_best=True)
+
+    def iter_solutions(self, time_limit: float | None = None) -> Iterator[Solution]:
+        """初期解を返した後、ALNS で最良解を更新するたびにその解を返す"""
+        start = time.perf_counter()
+        initial = self._initial_solution()
+        yield initial
+        remaining = None if time_limit is None else max(0.0, time_limit - (time.perf_counter() - start))
+        yield from self.iter_improve(initial, remaining)
+
+    def print_solution(self):
+        if self.solution is None:
+            print("解がありません。")
+            return
+        alns = self.solution.meta.get("alns", {})
+        print(f"=== VRP解（{self.solution.solver_name}） ===")
+        print(f"総移動距離: {self.solution.total_distance:.2f}（改善前: {alns.get('initial_distance', float('nan')):.2f}）")
+        print(f"反復回数: {alns.get('iterations', 0)}（最良更新 {alns.get('new_best', 0)} 回）")
+        print(f"使用車両数: {self.solution.num_vehicles_used()}")
+        print("\n各車両のルート:")
+        for k, route in self.solution.routes.items():
+            route_str = " -> ".join(map(str, route))
+            print(f"車両{k}: {route_str}")
+
+    def _initial_solution(self) -> Solution:
+        if self.initial_solver is None:
+            from .NN_solver import NNSolver
+            self.initial_solver = NNSolver(self.instance)
+        return self.initial_solver.solve()
+
+    def _search(self, solution: Solution, time_limit: float | None, *, every_best: bool) -> Iterator[Solution]:
+        """ALNS の本体。every_best なら最良解を更新するたびに、そうでなければ最後に1回だけ解を返す"""
+        start = self._begin_solve()
+        rng = random.Random(self.seed)
+        with self.phase("load"):
+            current = self._load(solution)
+        if self._neighbors is None:
+            with self.phase("neighbors"):
+                self._neighbors = k_nearest_neighbors(self.distances, self.neighbor_k).tolist()
+
+        best = current
+        current_value = best_value = self._value(current)
+        initial_distance = float(current[1].sum())
+        served = int((current[4] >= 0).sum())
+        temperature0 = self.start_worse * initial_distance / max(served, 1) / math.log(2)
+
+        ops = {"removal": list(self.removals), "insertion": list(self.insertions)}
+        weights = {kind: [1.0] * len(names) for kind, names in ops.items()}
+        segment_scores = {kind: [0.0] * len(names) for kind, names in ops.items()}
+        segment_uses = {kind: [0] * len(names) for kind, names in ops.items()}
+        stats = {
+            name: {"uses": 0, "new_best": 0, "improved": 0, "accepted": 0}
+            for name in self.removals + self.insertions
+        }
+        iterations = accepted = new_best = 0
+        yielded = False
+        num_customers = len(self.demands) - 1
+        max_remove = max(1, min(self.max_remove, num_customers))
+        min_remove = max(1, min(self.min_remove, max_remove))
+
+        def snapshot() -> Solution:
+            runtime = time.perf_counter() - start
+            routes, costs, loads, unassigned, _ = best
+            meta = dict(solution.meta)
+            meta["alns"] = {
+                "runtime_s": runtime,
+                "iterations": iterations,
+                "accepted": accepted,
+                "new_best": new_best,
+                "initial_distance": initial_distance,
+                "seed": self.seed,
+                "unassigned": sorted(unassigned),
+                "operators": {
+                    name: dict(stats[name], weight=weights[kind][i])
+                    for kind, names in ops.items() for i, name in enumerate(names)
+                },
+            }
+            routes_dict = {vid: [0] + r + [0] for vid, r in zip(self._vehicle_ids, routes) if r}
+            if unassigned:
+                status = "Partial"
+            elif len(routes_dict) <= len(self.vehicles) and np.all(loads <= self._caps + EPS):
+                status = "Feasible"
+            else:
+                status = "Infeasible"
+            sol = self._make_solution(
+                routes_dict, float(costs.sum()), status=status,
+                runtime_s=(solution.runtime_s or 0.0) + runtime,
+                solver_name=f"{solution.solver_name or 'solver'}+ALNS",
+                meta=meta,
+            )
+            sol.is_feasible = status == "Feasible"
+            return sol
+
+        with self.phase("search"):
+            while True:
+                elapsed = time.perf_counter() - start
+                if time_limit is not None and elapsed >= time_limit:
+                    break
+                if self.max_iterations is not None and iterations >= self.max_iterations:
+                    break
+                if time_limit is not None:
+                    progress = elapsed / time_limit if time_limit > 0 else 1.0
+                else:
+                    progress = iterations / self.max_iterations
+                temperature = temperature0 * self.end_temperature_ratio ** min(progress, 1.0)
+
+                ri = rng.choices(range(len(ops["removal"])), weights=weights["removal"])[0]
+                ii = rng.choices(range(len(ops["insertion"])), weights=weights["insertion"])[0]
+                removal, insertion = ops["removal"][ri], ops["insertion"][ii]
+
+                routes, costs, loads, unassigned, route_of = current
+                # ルートのリストは、外す・入れるときに書き換えるものだけを複製する
+                routes = list(routes)
+                route_of = route_of.copy()
+                removed = getattr(self, f"_remove_{removal}")(routes, route_of, rng.randint(min_remove, max_remove), rng)
+                touched = sorted(set(current[4][removed].tolist()))
+                candidate = self._repair(routes, costs, loads, route_of, touched, removed, unassigned, insertion, rng)
+                value = self._value(candidate)
+                iterations += 1
+
+                score = 0.0
+                outcome = None
+                if value < best_value - EPS:
+                    best, best_value = candidate, value
+                    score, outcome = self.scores[0], "new_best"
+                    new_best += 1
+                    if every_best:
+                        yielded = True
+                        yield snapshot()
+                elif value < current_value - EPS:
+                    score, outcome = self.scores[1], "improved"
+                elif value > current_value + EPS and temperature > 0 and rng.random() < math.exp(-(value - current_value) / temperature):
+                    score, outcome = self.scores[2], "accepted"
+                if outcome is not None:
+                    current, current_value = candidate, value
+                    accepted += 1
+
+                for kind, i, name in (("removal", ri, removal), ("insertion", ii, insertion)):
+                    segment_scores[kind][i] += score
+                    segment_uses[kind][i] += 1
+                    stats[name]["uses"] += 1
+                    if outcome is not None:
+                        stats[name][outcome] += 1
+
+                if iterations % self.segment_length == 0:
+                    self._update_weights(weights, segment_scores, segment_uses)
+
+        self.instrumentation.count("iterations", iterations)
+        self.instrumentation.count("accepted", accepted)
+        if not (every_best and yielded):
+            yield snapshot()
+
+    # ===== 解の状態 =====
+    def _load(self, solution: Solution) -> tuple:
+        """Solution を内部の状態 (routes, costs, loads, unassigned, route_of) にする
+
+        - routes: 全車両のルート（デポを除いた顧客のリスト。空のルートも持ち、修復時に新しい車両を使えるようにする）
+        - costs / loads: ルートごとの距離・積載量
+        - unassigned: 未訪問の顧客
+        - route_of: 顧客 -> ルート番号（未訪問は -1）
+        状態は受理されたら以後書き換えず、次の候補は書き換えるルートだけを複製して作る。
+        """
+        self._dem = np.asarray(self.demands, dtype=np.float64)
+        capacity_of = {v.id: v.capacity for v in self.vehicles}
+        self._vehicle_ids: list[int] = list(self.vehicle_ids)
+        # 車両にない ID のルート（車両数を超えた解）もそのまま持つ
+        self._vehicle_ids += sorted(k for k in solution.routes if k not in capacity_of)
+        self._caps = np.array([capacity_of.get(vid, self.capacity) for vid in self._vehicle_ids], dtype=np.float64)
+        d0 = np.asarray(self.distances[0], dtype=np.float64)
+        # 未訪問の顧客1人の罰則は、どの顧客を1台で往復するよりも大きくする
+        self._penalty = 2.0 * float(d0.max(initial=0.0)) + 1.0
+
+        routes = [[c for c in solution.routes.get(vid, []) if c != 0] for vid in self._vehicle_ids]
+        costs = np.array([self._route_cost(r) for r in routes], dtype=np.float64)
+        loads = np.array([self._dem[r].sum() if r else 0.0 for r in routes], dtype=np.float64)
+        route_of = np.full(len(self._dem), -1, dtype=np.int64)
+        for i, r in enumerate(routes):
+            route_of[r] = i
+        unassigned = tuple((np.flatnonzero(route_of[1:] < 0) + 1).tolist())
+        return routes, costs, loads, unassigned, route_of
+
+    def _value(self, state: tuple) -> float:
+        costs, unassigned = state[1], state[3]
+        return float(costs.sum()) + self._penalty * len(unassigned)
+
+    def _route_cost(self, route: list[int]) -> float:
+        if not route:
+            return 0.0
+        path = np.array([0] + route + [0])
+        return float(np.asarray(self.distances[path[:-1], path[1:]], dtype=np.float64).sum())
+
+    def _update_weights(self, weights: dict, segment_scores: dict, segment_uses: dict):
+        """区間の平均得点で重みを更新し、区間の集計を空にする"""
+        for kind in weights:
+            for i, uses in enumerate(segment_uses[kind]):
+                if uses:
+                    weights[kind][i] = (1 - self.reaction) * weights[kind][i] + self.reaction * segment_scores[kind][i] / uses
+                weights[kind][i] = max(weights[kind][i], 0.01)
+                segment_scores[kind][i] = 0.0
+                segment_uses[kind][i] = 0
+
+    # ===== 破壊（routes / route_of から外し、外した顧客のリストを返す） =====
+    def _remove_random(self, routes: list[list[int]], route_of: np.ndarray, q: int, rng: random.Random) -> list[int]:
+        visited = np.flatnonzero(route_of >= 0).tolist()
+        return self._detach(routes, route_of, rng.sample(visited, min(q, len(visited))))
+
+    def _remove_worst(self, routes: list[list[int]], route_of: np.ndarray, q: int, rng: random.Random) -> list[int]:
+        """外したときの距離の減少が大きい顧客から（順位を乱数で少しずらして）選ぶ"""
+        prev, cur, nxt = [], [], []
+        for r in routes:
+            if r:
+                path = [0] + r + [0]
+                prev += path[:-2]
+                cur += r
+                nxt += path[2:]
+        if not cur:
+            return []
+        d = self.distances
+        prev, cur, nxt = np.array(prev), np.array(cur), np.array(nxt)
+        gain = (
+            np.asarray(d[prev, cur], dtype=np.float64) + np.asarray(d[cur, nxt], dtype=np.float64)
+            - np.asarray(d[prev, nxt], dtype=np.float64)
+        )
+        ranked = cur[np.argsort(-gain, kind="stable")].tolist()
+        removed = []
+        for _ in range(min(q, len(ranked))):
+            removed.append(ranked.pop(int(rng.random() ** 3 * len(ranked))))
+        return self._detach(routes, route_of, removed)
+
+    def _remove_shaw(self, routes: list[list[int]], route_of: np.ndarray, q: int, rng: random.Random) -> list[int]:
+        """外した顧客の近傍から、距離と需要が近い顧客を順に選ぶ"""
+        visited = np.flatnonzero(route_of >= 0).tolist()
+        if not visited:
+            return []
+        q = min(q, len(visited))
+        d, dem = self.distances, self._dem
+        scale_d = float(np.asarray(d[0], dtype=np.float64).max(initial=0.0)) or 1.0
+        scale_q = float(dem.max(initial=0.0)) or 1.0
+        taken = {rng.choice(visited)}
+        removed = list(taken)
+        while len(removed) < q:
+            ref = rng.choice(removed)
+            candidates = [c for c in self._neighbors[ref] if route_of[c] >= 0 and c not in taken]
+            if not candidates:
+                c = rng.choice([c for c in visited if c not in taken])
+            else:
+                related = [float(d[ref, c]) / scale_d + abs(dem[ref] - dem[c]) / scale_q for c in candidates]
+                order = [c for _, c in sorted(zip(related, candidates))]
+                c = order[int(rng.random() ** 3 * len(order))]
+            taken.add(c)
+            removed.append(c)
+        return self._detach(routes, route_of, removed)
+
+    def _remove_string(self, routes: list[list[int]], route_of: np.ndarray, q: int, rng: random.Random) -> list[int]:
+        """無作為な顧客とその近傍が乗るルートから、連続する顧客の列を1本ずつ外す"""
+        visited = np.flatnonzero(route_of >= 0)
+        if not len(visited):
+            return []
+        seed = int(visited[rng.randrange(len(visited))])
+        ruined = set()
+        removed: list[int] = []
+        for v in [seed] + self._neighbors[seed]:
+            if len(removed) >= q:
+                break
+            i = int(route_of[v])
+            if i < 0 or i in ruined:
+                continue
+            ruined.add(i)
+            route = routes[i]
+            length = rng.randint(1, min(self.max_string_length, len(route), q - len(removed)))
+            p = route.index(v)
+            begin = min(max(0, p - rng.randint(0, length - 1)), len(route) - length)
+            removed += route[begin:begin + length]
+        return self._detach(routes, route_of, removed)
+
+    def _detach(self, routes: list[list[int]], route_of: np.ndarray, removed: list[int]) -> list[int]:
+        """removed の顧客を外す（該当するルートだけを新しいリストに置き換える）"""
+        gone = set(removed)
+        for i in set(route_of[removed].tolist()):
+            routes[i] = [c for c in routes[i] if c not in gone]
+        route_of[removed] = -1
+        return removed
+
+    # ===== 修復 =====
+    def _repair(
+        self,
+        routes: list[list[int]],
+        costs: np.ndarray,
+        loads: np.ndarray,
+        route_of: np.ndarray,
+        touched: list[int],
+        removed: list[int],
+        unassigned: tuple,
+        insertion: str,
+        rng: random.Random,
+    ) -> tuple:
+        """外した顧客（と前から未訪問の顧客）を挿入し、新しい状態を返す
+
+        routes / route_of は外した後のもの（touched 以外のルートは元の状態と共有）。costs / loads は元の状態のもの。
+        挿入コストの表は、容量に入らない組を inf にして持ち、挿入したルートの列だけを計算し直す。
+        """
+        costs = costs.copy()
+        loads = loads.copy()
+        for r in touched:
+            costs[r] = self._route_cost(routes[r])
+            loads[r] = self._dem[routes[r]].sum() if routes[r] else 0.0
+        pending = list(removed) + list(unassigned)
+        rng.shuffle(pending)
+        pending = np.array(pending, dtype=np.int64)
+        cols = self._candidate_routes(routes, route_of, pending, touched)
+        if not len(pending) or not cols:
+            return routes, costs, loads, tuple(pending.tolist()), route_of
+
+        d = self.distances
+        owned = set(touched)
+        q = self._dem[pending]
+        caps = self._caps[cols]
+        # table[i, j]: 顧客 pending[i] をルート cols[j] に入れる最小の増分（容量に入らなければ inf）
+        table = self._insertion_table([routes[r] for r in cols], pending)
+        table[loads[cols][None, :] + q[:, None] > caps[None, :] + EPS] = np.inf
+        alive = np.ones(len(pending), dtype=bool)
+        k = min(max(2, self.regret_k), len(cols))
+        for _ in range(len(pending)):
+            if insertion == "greedy" or k < 2:
+                i, j = divmod(int(np.argmin(table)), table.shape[1])
+            else:
+                smallest = np.sort(np.partition(table, k - 1, axis=1)[:, :k], axis=1)
+                # 入れられるルートが少ない顧客ほど先に入れる（inf は大きな差として扱う）
+                with np.errstate(invalid="ignore"):
+                    gaps = np.where(np.isinf(smallest[:, 1:]), self._penalty, smallest[:, 1:] - smallest[:, :1])
+                regret = np.where(np.isinf(smallest[:, 0]), -np.inf, gaps.sum(axis=1))
+                i = int(np.argmax(regret - 1e-9 * smallest[:, 0]))
+                j = int(np.argmin(table[i]))
+            if not np.isfinite(table[i, j]):
+                break
+            r = cols[j]
+            c = int(pending[i])
+            if r not in owned:
+                routes[r] = list(routes[r])
+                owned.add(r)
+            route = routes[r]
+            path = np.array([0] + route + [0])
+            delta = (
+                np.asarray(d[path[:-1], c], dtype=np.float64) + np.asarray(d[c, path[1:]], dtype=np.float64)
+                - np.asarray(d[path[:-1], path[1:]], dtype=np.float64)
+            )
+            p = int(np.argmin(delta))
+            route.insert(p, c)
+            route_of[c] = r
+            costs[r] += float(delta[p])
+            loads[r] += q[i]
+            alive[i] = False
+            table[i] = np.inf
+            rest = np.flatnonzero(alive)
+            if len(rest):
+                column = self._insertion_column(route, pending[rest])
+                column[loads[r] + q[rest] > caps[j] + EPS] = np.inf
+                table[rest, j] = column
+        return routes, costs, loads, tuple(pending[alive].tolist()), route_of
+
+    def _candidate_routes(self, routes: list[list[int]], route_of: np.ndarray, pending: np.ndarray, touched: list[int]) -> list[int]:
+        """挿入先の候補ルート: 外したルート・各顧客の近傍が乗るルート・空のルート1本"""
+        near = route_of[[v for c in pending.tolist() for v in self._neighbors[c]]]
+        cols = set(touched) | set(near[near >= 0].tolist())
+        empty = next((i for i, r in enumerate(routes) if not r), None)
+        if empty is not None:
+            cols.add(empty)
+        return sorted(cols)
+
+    def _insertion_table(self, routes: list[list[int]], customers: np.ndarray) -> np.ndarray:
+        """(顧客 x ルート) の最小挿入増分。ルートの辺をまとめて計算し、ルートごとに最小を取る"""
+        a, b, starts = [], [], []
+        for r in routes:
+            starts.append(len(a))
+            path = [0] + r + [0]
+            a += path[:-1]
+            b += path[1:]
+        a, b = np.array(a), np.array(b)
+        return np.minimum.reduceat(self._edge_deltas(customers, a, b), np.array(starts), axis=1)
+
+    def _insertion_column(self, route: list[int], customers: np.ndarray) -> np.ndarray:
+        path = np.array([0] + route + [0])
+        return self._edge_deltas(customers, path[:-1], path[1:]).min(axis=1)
+
+    def _edge_deltas(self, customers: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """顧客 c を辺 (a, b) の間に入れたときの増分 d(a, c) + d(c, b) - d(a, b) の表（顧客 x 辺）"""
+        d = self.distances
+        return (
+            np.asarray(d[a[None, :], customers[:, None]], dtype=np.float64)
+            + np.asarray(d[customers[:, None], b[None, :]], dtype=np.float64)
+            - np.asarray(d[a, b], dtype=np.float64)[None, :]
+        )
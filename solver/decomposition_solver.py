@@ -0,0 +1,369 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .vrp_solver import VRPSolver
+from .savings_solver import SavingsSolver
+from .local_search import LocalSearch
+from instance import Instance, build_distance_matrix
+from solution import Solution
+
+
+class DecompositionSolver(VRPSolver):
+    """Cluster-first, route-second の分割ソルバー（大規模インスタンス向け）
+
+    1. 顧客を地理的にクラスタへ分ける（method: "sector" 角度順の扇形 / "kmeans" 容量を考慮した k-means）
+       各クラスタの需要は車両容量の整数倍程度に揃える
+    2. クラスタごとに小さなインスタンスを作って独立に解く
+       - 顧客数 mip_max_customers 以下: ヒューリスティック解を warm start にして VRPSolverMIP（two_index）
+       - それ以外: heuristic（既定 SavingsSolver）+ LocalSearch
+       クラスタはプロセスプールで並列に解く（workers）
+    3. 各クラスタのルートを元の顧客IDに戻して1つの Solution に繋ぐ
+    4. boundary_reopt=True なら、隣り合うクラスタの組ごとにルートを合わせて LocalSearch で再最適化する
+
+    全体の距離行列は使わない（instance.distances が None でもよい）。距離行列がある場合は
+    部分行列を切り出して使い、ない場合はクラスタごとに座標から計算する。
+    クラスタごとの顧客数・時間・距離は meta["clusters"] に入る。
+    """
+
+    METHODS = ("sector", "kmeans")
+
+    def __init__(
+        self,
+        instance: Instance,
+        *,
+        method: str = "kmeans",
+        cluster_size: int = 300,
+        heuristic: type = SavingsSolver,
+        improve: bool = True,
+        mip_max_customers: int = 8,
+        mip_time_limit: float | None = 10.0,
+        boundary_reopt: bool = True,
+        ls_time_limit: float | None = None,
+        workers: int | None = None,
+        seed: int | None = 0,
+    ):
+        super().__init__(instance)
+        if method not in self.METHODS:
+            raise ValueError(f"未知のクラスタリング方法です: {method}")
+        self.method = method
+        self.cluster_size = max(1, cluster_size)
+        self.heuristic = heuristic
+        self.improve = improve
+        self.mip_max_customers = mip_max_customers
+        self.mip_time_limit = mip_time_limit
+        self.boundary_reopt = boundary_reopt
+        self.ls_time_limit = ls_time_limit
+        self.workers = workers
+        self.seed = seed
+
+    def solve(self):
+        start = self._begin_solve()
+        if self.instance.num_customers == 0:
+            # 顧客がいなければクラスタも作らない（他のソルバーと同じく空の解を返す）
+            routes, total_distance = self._stitch([])
+            sol = self._make_solution(
+                routes, total_distance, status="Feasible", runtime_s=time.perf_counter() - start,
+                solver_name=f"Decomposition({self.method})",
+                meta={"method": self.method, "cluster_size": self.cluster_size, "num_clusters": 0,
+                      "clustering_s": 0.0, "clusters": []},
+            )
+            self.solution = sol
+            return sol
+
+        t = time.perf_counter()
+        with self.phase("clustering"):
+            labels = self.cluster()
+        clusters = [np.flatnonzero(labels == c) + 1 for c in range(int(labels.max()) + 1)]
+        clusters = [c for c in clusters if len(c)]
+        clustering_s = time.perf_counter() - t
+
+        config = (self.heuristic, self.improve, self.mip_max_customers, self.mip_time_limit, self.ls_time_limit)
+        jobs = [(self._sub_problem(ids), config) for ids in clusters]
+        with self.phase("clusters"):
+            results = self._map(_solve_cluster, jobs)
+        self.instrumentation.count("clusters", len(clusters))
+
+        # クラスタ内の番号 -> 元の顧客ID に戻して1本のルート列に繋ぐ
+        routes_list: list[list[int]] = []
+        cluster_meta = []
+        for i, (ids, (local_routes, distance, info)) in enumerate(zip(clusters, results)):
+            owner = np.concatenate(([0], ids))
+            routes_list.extend([int(owner[c]) for c in r] for r in local_routes)
+            cluster_meta.append({"cluster": i, "size": int(len(ids)), "demand": float(self.demands[ids].sum()),
+                                 "distance": distance, "routes": len(local_routes), **info})
+        route_cluster = [i for i, (local_routes, _, _) in enumerate(results) for _ in local_routes]
+
+        boundary_meta = None
+        if self.boundary_reopt and len(clusters) > 1:
+            with self.phase("boundary_reopt"):
+                routes_list, boundary_meta = self._reoptimize_boundaries(clusters, routes_list, route_cluster, config)
+
+        with self.phase("stitch"):
+            routes, total_distance = self._stitch(routes_list)
+        # 全顧客を訪問し、使った車両が車両数以内なら実行可能
+        visited = sum(len(r) - 2 for r in routes.values())
+        num_used = sum(1 for r in routes.values() if len(r) > 2)
+        if visited < self.instance.num_customers:
+            status = "Partial"
+        else:
+            status = "Feasible" if num_used <= len(self.vehicles) else "Infeasible"
+        meta = {
+            "method": self.method,
+            "cluster_size": self.cluster_size,
+            "num_clusters": len(clusters),
+            "clustering_s": clustering_s,
+            "clusters": cluster_meta,
+        }
+        if boundary_meta is not None:
+            meta["boundary_reopt"] = boundary_meta
+        sol = self._make_solution(
+            routes, total_distance, status=status, runtime_s=time.perf_counter() - start,
+            solver_name=f"Decomposition({self.method})", meta=meta,
+        )
+        sol.is_feasible = status == "Feasible"
+        self.solution = sol
+        return sol
+
+    def print_solution(self):
+        if self.solution is None:
+            print("解がありません。")
+            return
+        print(f"=== VRP解（{self.solution.solver_name}） ===")
+        print(f"総移動距離: {self.solution.total_distance:.2f}")
+        print(f"使用車両数: {self.solution.num_vehicles_used()}")
+        print(f"クラスタ数: {self.solution.meta.get('num_clusters')}")
+        print("\n各車両のルート:")
+        for k, route in self.solution.routes.items():
+            route_str = " -> ".join(map(str, route))
+            print(f"車両{k}: {route_str}")
+
+    # ===== クラスタリング =====
+    def cluster(self) -> np.ndarray:
+        """顧客 1..N のクラスタ番号（長さ N の配列）を返す"""
+        n = self.instance.num_customers
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        k = max(1, math.ceil(n / self.cluster_size))
+        budget = self._demand_budget(k)
+        if self.method == "sector":
+            return self._sector_labels(budget)
+        return self._kmeans_labels(k, budget)
+
+    def _demand_budget(self, k: int) -> float:
+        """1クラスタの需要の上限（車両容量の整数倍に切り上げ、k クラスタで全需要が入る値）"""
+        total = float(self.demands[1:].sum())
+        return max(1, math.ceil(total / k / self.capacity)) * float(self.capacity)
+
+    def _sector_labels(self, budget: float) -> np.ndarray:
+        """デポからの角度順に並べ、累積需要が budget を超えるごとに次のクラスタにする"""
+        xs, ys = self.instance.xs, self.instance.ys
+        order = np.argsort(np.arctan2(ys[1:] - ys[0], xs[1:] - xs[0]), kind="stable")
+        demand = self.demands[1:][order]
+        before = np.cumsum(demand) - demand
+        labels = np.empty(len(order), dtype=np.int64)
+        labels[order] = (before // budget).astype(np.int64)
+        return labels
+
+    def _kmeans_labels(self, k: int, budget: float, iterations: int = 10) -> np.ndarray:
+        """座標の k-means（Lloyd 法）で重心を求め、需要の上限を守りながら近い重心へ割り当てる"""
+        pts = np.column_stack((self.instance.xs[1:], self.instance.ys[1:]))
+        demand = self.demands[1:]
+        n = len(pts)
+        rng = np.random.default_rng(self.seed)
+        centers = pts[rng.choice(n, size=k, replace=False)]
+        for _ in range(iterations):
+            labels = _sq_dists(pts, centers).argmin(axis=1)
+            counts = np.bincount(labels, minlength=k)
+            for axis in range(2):
+                sums = np.bincount(labels, weights=pts[:, axis], minlength=k)
+                centers[counts > 0, axis] = sums[counts > 0] / counts[counts > 0]
+            # 空になったクラスタは重心から最も遠い点で作り直す
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                far = np.argsort(-_sq_dists(pts, centers).min(axis=1))[:len(empty)]
+                centers[empty] = pts[far]
+
+        # 容量を考慮した割り当て: 最寄りと次点の差（regret）が大きい顧客から、空きのある最も近い重心へ
+        dist = _sq_dists(pts, centers)
+        preference = np.argsort(dist, axis=1)
+        if k > 1:
+            regret = dist[np.arange(n), preference[:, 1]] - dist[np.arange(n), preference[:, 0]]
+        else:
+            regret = np.zeros(n)
+        load = np.zeros(k)
+        labels = np.empty(n, dtype=np.int64)
+        for i in np.argsort(-regret, kind="stable").tolist():
+            q = demand[i]
+            for c in preference[i].tolist():
+                if load[c] + q <= budget:
+                    break
+            else:
+                c = int(np.argmin(load))
+            labels[i] = c
+            load[c] += q
+        return labels
+
+    # ===== 部分問題 =====
+    def _sub_problem(self, ids: np.ndarray) -> dict:
+        """顧客ID列からワーカーに渡す部分問題（index 0 がデポ）を作る"""
+        nodes = np.concatenate(([0], ids))
+        demand = float(self.demands[ids].sum())
+        distances = None
+        if self.distances is not None:
+            distances = np.ascontiguousarray(self.distances[np.ix_(nodes, nodes)])
+        return {
+            "xs": self.instance.xs[nodes],
+            "ys": self.instance.ys[nodes],
+            "demands": self.demands[nodes],
+            "distances": distances,
+            "capacity": self.capacity,
+            # 容量から見た必要台数 + 1台の余裕
+            "num_vehicles": max(1, math.ceil(demand / self.capacity)) + 1,
+        }
+
+    def _reoptimize_boundaries(self, clusters, routes_list, route_cluster, config):
+        """重心が近いクラスタを互いに素な組にし、組ごとのルートを合わせて局所探索で改善する"""
+        start = time.perf_counter()
+        centers = np.array([
+            (self.instance.xs[ids].mean(), self.instance.ys[ids].mean()) for ids in clusters
+        ])
+        dist = _sq_dists(centers, centers)
+        np.fill_diagonal(dist, np.inf)
+        # 近い組から貪欲にマッチング（各クラスタは1組にだけ入るので組ごとに並列に解ける）
+        matched = np.zeros(len(clusters), dtype=bool)
+        pairs = []
+        for flat in np.argsort(dist, axis=None).tolist():
+            a, b = divmod(flat, len(clusters))
+            if a < b and not matched[a] and not matched[b] and np.isfinite(dist[a, b]):
+                matched[a] = matched[b] = True
+                pairs.append((a, b))
+
+        by_cluster: dict[int, list[int]] = {}
+        for r, c in enumerate(route_cluster):
+            by_cluster.setdefault(c, []).append(r)
+
+        jobs = []
+        for a, b in pairs:
+            ids = np.concatenate((clusters[a], clusters[b]))
+            local = {int(c): i + 1 for i, c in enumerate(ids)}
+            members = by_cluster.get(a, []) + by_cluster.get(b, [])
+            sub = self._sub_problem(ids)
+            sub["num_vehicles"] = max(len(members), 1)
+            sub["routes"] = [[local.get(c, 0) for c in routes_list[r]] for r in members]
+            jobs.append((sub, config))
+        results = self._map(_reoptimize_pair, jobs)
+
+        new_routes = list(routes_list)
+        before = after = 0.0
+        for (a, b), (sub, _), (local_routes, d_before, d_after) in zip(pairs, jobs, results):
+            ids = np.concatenate(([0], clusters[a], clusters[b]))
+            members = by_cluster.get(a, []) + by_cluster.get(b, [])
+            before += d_before
+            after += d_after
+            for r, route in zip(members, local_routes):
+                new_routes[r] = [int(ids[c]) for c in route]
+        return new_routes, {
+            "pairs": len(pairs),
+            "runtime_s": time.perf_counter() - start,
+            "distance_before": before,
+            "distance_after": after,
+        }
+
+    def _stitch(self, routes_list: list[list[int]]) -> tuple[dict[int, list[int]], float]:
+        """ルート列に車両IDを振り、総距離を求める（車両数を超えた分は新しいIDにする）"""
+        routes: dict[int, list[int]] = {}
+        total_distance = 0.0
+        vehicle_ids = list(self.vehicle_ids)
+        next_id = max(vehicle_ids, default=-1) + 1
+        for i, route in enumerate(r for r in routes_list if len(r) > 2):
+            if i < len(vehicle_ids):
+                vid = vehicle_ids[i]
+            else:
+                vid, next_id = next_id, next_id + 1
+            routes[vid] = route
+            total_distance += self._route_length(route)
+        for vid in vehicle_ids[len(routes):]:
+            routes[vid] = [0, 0]
+        return routes, total_distance
+
+    def _route_length(self, route: list[int]) -> float:
+        nodes = np.asarray(route)
+        if self.distances is not None:
+            return float(np.asarray(self.distances[nodes[:-1], nodes[1:]], dtype=np.float64).sum())
+        xs, ys = self.instance.xs[nodes], self.instance.ys[nodes]
+        return float(np.hypot(np.diff(xs), np.diff(ys)).sum())
+
+    def _map(self, fn, jobs: list) -> list:
+        """jobs を（workers > 1 なら）プロセスプールで処理し、入力順の結果を返す"""
+        workers = self.workers if self.workers is not None else (os.cpu_count() or 1)
+        if workers <= 1 or len(jobs) <= 1:
+            return [fn(*job) for job in jobs]
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            return list(executor.map(fn, *zip(*jobs)))
+
+
+# ===== ワーカー側の処理 =====
+def _sq_dists(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """点 x 重心 の二乗ユークリッド距離"""
+    dx = points[:, None, 0] - centers[None, :, 0]
+    dy = points[:, None, 1] - centers[None, :, 1]
+    return dx * dx + dy * dy
+
+
+def _build_sub_instance(sub: dict) -> Instance:
+    distances = sub["distances"]
+    if distances is None:
+        distances, _ = build_distance_matrix(sub["xs"], sub["ys"])
+    return Instance.from_arrays(
+        sub["xs"], sub["ys"], sub["demands"], sub["num_vehicles"], sub["capacity"], distances=distances,
+    )
+
+
+def _solve_cluster(sub: dict, config: tuple) -> tuple[list[list[int]], float, dict]:
+    """1クラスタを解き、(ルート列, 距離, 計測情報) を返す"""
+    heuristic, improve, mip_max_customers, mip_time_limit, ls_time_limit = config
+    start = time.perf_counter()
+    instance = _build_sub_instance(sub)
+    solution = heuristic(instance).solve()
+    if improve:
+        solution = LocalSearch(instance, time_limit=ls_time_limit).improve(solution)
+    if instance.num_customers <= mip_max_customers:
+        solution = _try_mip(instance, solution, mip_time_limit)
+    routes = [r for r in solution.routes.values() if len(r) > 2]
+    return routes, float(solution.total_distance), {
+        "solver": solution.solver_name,
+        "status": solution.status,
+        "runtime_s": time.perf_counter() - start,
+    }
+
+
+def _try_mip(instance: Instance, incumbent: Solution, time_limit: float | None) -> Solution:
+    """ヒューリスティック解を初期解に MIP で解き直し、良くなった場合だけ採用する"""
+    try:
+        # pulp は MIP を使うときだけ読み込む（入っていなければヒューリスティック解のまま）
+        from .mip_solver import VRPSolverMIP
+
+        solution = VRPSolverMIP(
+            instance, formulation="two_index", time_limit=time_limit,
+            warm_start=incumbent if incumbent.is_feasible else None,
+        ).solve()
+    except Exception:
+        return incumbent
+    if solution.total_distance < incumbent.total_distance or not incumbent.is_feasible:
+        return solution
+    return incumbent
+
+
+def _reoptimize_pair(sub: dict, config: tuple) -> tuple[list[list[int]], float, float]:
+    """2クラスタ分のルートを局所探索で改善し、(ルート列, 改善前の距離, 改善後の距離) を返す"""
+    ls_time_limit = config[4]
+    instance = _build_sub_instance(sub)
+    routes = {i: r for i, r in enumerate(sub["routes"])}
+    initial = Solution(routes=routes, objective_value=0.0)
+    improved = LocalSearch(instance, time_limit=ls_time_limit).improve(initial)
+    before = improved.meta["local_search"]["initial_distance"]
+    return [improved.routes[i] for i in range(len(routes))], before, float(improved.total_distance)
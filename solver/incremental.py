@@ -0,0 +1,177 @@
+import time
+
+import numpy as np
+
+from .vrp_solver import VRPSolver
+from instance import Instance
+from solution import RouteStore, Solution
+
+
+class IncrementalReoptimizer(VRPSolver):
+    """既存の解に顧客の追加・削除・需要変更を反映し、影響のあるルートだけを直す
+
+    - insert_customer(x, y, demand): インスタンスに顧客を追加し（距離行列は1行1列だけ拡張）、最安挿入で解に入れる
+    - remove_customer(cid): 解から外す（ID を変えないため、インスタンスには残して以降は訪問しない）
+    - change_demand(cid, demand): 需要を変え、容量を超えたルートからは顧客を外して最安挿入で入れ直す
+
+    ルートは RouteStore（積載量・距離のキャッシュ付き）で持ち、挿入候補の辺 (a, b) と d(a, b) は
+    ルートごとにキャッシュして、変更したルートの分だけ作り直す。
+    improve_routes=True なら、変更したルートに 2-opt をかける。
+    """
+
+    def __init__(self, instance: Instance, solution: Solution, *, improve_routes: bool = True):
+        super().__init__(instance)
+        self.improve_routes = improve_routes
+        self.store = RouteStore(solution.routes, instance.distances, instance.demands)
+        self.base_name = solution.solver_name or "solver"
+        self.removed: set[int] = set()
+        self.counts = {"inserted": 0, "removed": 0, "demand_changes": 0, "routes_repaired": 0, "new_routes": 0}
+        self.runtime_s = 0.0
+        self._edges: dict[int, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def solve(self):
+        """現在の解を Solution として返す"""
+        store = self.store
+        routes = store.to_dict()
+        # 削除した顧客以外を全て訪問し、容量・車両数を守っていれば実行可能
+        missing = [c for c in store.unvisited().tolist() if c not in self.removed]
+        within_capacity = bool(np.all(store.loads <= self.capacity + 1e-9))
+        if missing:
+            status = "Partial"
+        elif within_capacity and store.num_routes_used() <= len(self.vehicles):
+            status = "Feasible"
+        else:
+            status = "Infeasible"
+        sol = self._make_solution(
+            routes, store.total_cost(), status=status, runtime_s=self.runtime_s,
+            solver_name=f"{self.base_name}+Incremental",
+            meta={"incremental": dict(self.counts, removed_ids=sorted(self.removed))},
+        )
+        sol.is_feasible = status == "Feasible"
+        self.solution = sol
+        return sol
+
+    def print_solution(self):
+        if self.solution is None:
+            print("解がありません。")
+            return
+        print(f"=== VRP解（{self.solution.solver_name}） ===")
+        print(f"総移動距離: {self.solution.total_distance:.2f}")
+        print(f"使用車両数: {self.solution.num_vehicles_used()}")
+        print("\n各車両のルート:")
+        for k, route in self.solution.routes.items():
+            route_str = " -> ".join(map(str, route))
+            print(f"車両{k}: {route_str}")
+
+    # ===== 変更操作 =====
+    def insert_customer(self, x: float, y: float, demand: float, **distance_kwargs) -> int:
+        """顧客をインスタンスに追加して解に挿入し、新しい顧客IDを返す"""
+        start = time.perf_counter()
+        cid = self.instance.add_customer(x, y, demand, **distance_kwargs)
+        self.distances = self.instance.distances
+        self.demands = self.instance.demands
+        self.store.rebind(self.distances, self.demands)
+        self._insert_cheapest(cid)
+        self.counts["inserted"] += 1
+        self.runtime_s += time.perf_counter() - start
+        return cid
+
+    def remove_customer(self, cid: int):
+        """顧客を解から外す（前後の顧客をつなぎ、そのルートだけを直す）"""
+        start = time.perf_counter()
+        r = self.store.route_index(cid)
+        if r >= 0:
+            self.store.remove(cid)
+            self._touched(r)
+        self.removed.add(cid)
+        self.counts["removed"] += 1
+        self.runtime_s += time.perf_counter() - start
+
+    def change_demand(self, cid: int, demand: float):
+        """需要を変え、ルートが容量を超えたらその顧客だけを外して最安挿入で入れ直す"""
+        start = time.perf_counter()
+        store = self.store
+        r = store.route_index(cid)
+        old = float(self.demands[cid])
+        self.instance.set_demand(cid, demand)
+        if r >= 0:
+            store.loads[r] += demand - old
+            if store.loads[r] > self.capacity + 1e-9:
+                # 変更した顧客を外して最安挿入で入れ直す（同じルートに戻れるなら戻る）
+                store.remove(cid)
+                self._touched(r)
+                self._insert_cheapest(cid)
+        self.counts["demand_changes"] += 1
+        self.runtime_s += time.perf_counter() - start
+
+    # ===== 内部ヘルパー =====
+    def _insert_cheapest(self, cid: int):
+        """容量に入るルートの全ての辺のうち、挿入による増分が最小の位置に入れる"""
+        store = self.store
+        q = float(self.demands[cid])
+        candidates = np.flatnonzero(store.loads + q <= self.capacity + 1e-9)
+        best = None
+        if len(candidates):
+            route_idx, pos, a, b, dab = self._candidate_edges(candidates)
+            d = self.distances
+            delta = np.asarray(d[a, cid], dtype=np.float64) + np.asarray(d[cid, b], dtype=np.float64) - dab
+            i = int(np.argmin(delta))
+            best = (int(route_idx[i]), int(pos[i]))
+        if best is None:
+            # どのルートにも入らなければ、新しいルートを作る（車両数を超えたら Infeasible）
+            r = store.add_route(self._next_vehicle_id())
+            self.counts["new_routes"] += 1
+            best = (r, 0)
+        r, p = best
+        store.insert(cid, r, p)
+        self._touched(r)
+
+    def _candidate_edges(self, routes: np.ndarray):
+        """ルート群の全ての辺 (ルート, 挿入位置, a, b, d(a, b)) を、ルートごとのキャッシュから集める"""
+        parts = [self._route_edges(int(r)) for r in routes]
+        route_idx = np.concatenate([np.full(len(p[0]), r) for r, p in zip(routes, parts)])
+        pos = np.concatenate([np.arange(len(p[0])) for p in parts])
+        a = np.concatenate([p[0] for p in parts])
+        b = np.concatenate([p[1] for p in parts])
+        dab = np.concatenate([p[2] for p in parts])
+        return route_idx, pos, a, b, dab
+
+    def _route_edges(self, r: int):
+        edges = self._edges.get(r)
+        if edges is None:
+            path = np.concatenate(([0], self.store.route(r), [0]))
+            a, b = path[:-1], path[1:]
+            edges = (a, b, np.asarray(self.distances[a, b], dtype=np.float64))
+            self._edges[r] = edges
+        return edges
+
+    def _touched(self, r: int):
+        """ルート r を変更した: 必要なら 2-opt で直し、辺のキャッシュを捨てる"""
+        if self.improve_routes and self.store.lengths[r] >= 3:
+            self._two_opt(r)
+        self._edges.pop(r, None)
+        self.counts["routes_repaired"] += 1
+
+    def _two_opt(self, r: int):
+        """ルート r の中だけで 2-opt（改善がなくなるまで）"""
+        path = [0] + self.store.route(r).tolist() + [0]
+        d = self.distances.item
+        improved = True
+        while improved:
+            improved = False
+            for i in range(len(path) - 3):
+                a, b = path[i], path[i + 1]
+                for j in range(i + 2, len(path) - 1):
+                    c, e = path[j], path[j + 1]
+                    if d(a, c) + d(b, e) - d(a, b) - d(c, e) < -1e-9:
+                        path[i + 1:j + 1] = path[i + 1:j + 1][::-1]
+                        a, b = path[i], path[i + 1]
+                        improved = True
+        self.store.set_route(r, path[1:-1])
+
+    def _next_vehicle_id(self) -> int:
+        used = set(self.store.route_ids.tolist())
+        for vid in self.vehicle_ids:
+            if vid not in used:
+                return vid
+        return max(used | set(self.vehicle_ids), default=0) + 1
@@ -0,0 +1,136 @@
+import contextlib
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+PROFILERS = ("cprofile", "tracemalloc")
+
+# 無効時に phase() が返す何もしないコンテキスト（使い回す）
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class Instrumentation:
+    """solve() 1回分の計測（フェーズ時間・カウンタ・任意のプロファイル）
+
+    - phase(name): perf_counter で区間の時間を測る（同名は合算し、呼び出し回数も数える）
+    - count(name, n): カウンタを加算する（ホットループ内では呼ばず、ローカル変数で数えて最後に1回渡す）
+    - profile: "cprofile"（関数ごとの時間の上位）/ "tracemalloc"（メモリのピークと確保箇所の上位）
+    - report(): Solution.meta["instrumentation"] に入れる辞書を返す
+    """
+
+    enabled = True
+
+    def __init__(self, profile: str | None = None, *, top: int = 20):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"未知のプロファイラです: {profile}")
+        self.profile = profile
+        self.top = top
+        self.reset()
+
+    def reset(self):
+        self.phases: dict[str, dict] = {}
+        self.counters: dict[str, int] = {}
+        self._profiler: cProfile.Profile | None = None
+        self._started_tracemalloc = False
+        self._profile_report: dict | None = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, {"time_s": 0.0, "calls": 0})
+            entry["time_s"] += time.perf_counter() - start
+            entry["calls"] += 1
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def begin(self):
+        """solve() の開始時に呼ぶ（前回の結果を消してプロファイルを開始）"""
+        # 前回の solve() が例外で終わっていたら、動いたままのプロファイラを止める
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        self.reset()
+        if self.profile == "cprofile":
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # 別のプロファイラが動いている（入れ子の solve など）
+                self._profiler = None
+        elif self.profile == "tracemalloc":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+
+    def end(self):
+        """solve() の終了時に呼ぶ（プロファイルを止めて結果をまとめる）"""
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profile_report = {"cprofile": self._cprofile_top(self._profiler)}
+            self._profiler = None
+        elif self.profile == "tracemalloc" and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:self.top]
+            self._profile_report = {"tracemalloc": {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top": [{"location": str(s.traceback), "size_bytes": s.size, "count": s.count} for s in top],
+            }}
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def report(self) -> dict:
+        report = {
+            "phases": {name: dict(entry) for name, entry in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+        if self._profile_report is not None:
+            report.update(self._profile_report)
+        return report
+
+    def _cprofile_top(self, profiler: cProfile.Profile) -> list[dict]:
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        rows = []
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                "function": f"{filename}:{line}({func})",
+                "ncalls": ncalls,
+                "tottime_s": tottime,
+                "cumtime_s": cumtime,
+            })
+        rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+        return rows[:self.top]
+
+
+class _DisabledInstrumentation:
+    """計測しないときの実装（全メソッドが何もしない）"""
+
+    enabled = False
+    profile = None
+
+    def phase(self, name: str):
+        return _NULL_CONTEXT
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def begin(self):
+        pass
+
+    def end(self):
+        pass
+
+    def report(self) -> dict:
+        return {}
+
+
+DISABLED = _DisabledInstrumentation()
@@ -0,0 +1,413 @@
+import random
+import time
+from typing import Iterator
+
+from .vrp_solver import VRPSolver
+from .neighbors import k_nearest_neighbors
+from instance import Instance
+from solution import Solution
+
+# 改善とみなす最小の距離減少量（浮動小数誤差で往復しないように）
+EPS = 1e-9
+
+Move = tuple  # (delta, operator_name, *args)
+
+
+class LocalSearch(VRPSolver):
+    """既存の解を近傍操作で改善する局所探索ソルバー
+
+    - 近傍操作: relocate / swap / 2-opt / or-opt / 2-opt*
+    - 各操作の評価は距離の差分（O(1)）と、ルートごとにキャッシュした積載量・累積積載量で行う
+    - 候補は各顧客の近傍リスト（granular neighbor list）に限定する
+    - policy: "first"（最初に見つけた改善を即適用） / "best"（1パスで最良の改善を適用）
+
+    solve() は initial_solver（既定: NNSolver）で初期解を作ってから improve() する。
+    他のソルバーの後処理として使う場合は improve(solution) を直接呼ぶ。
+    """
+
+    OPERATORS = ("relocate", "swap", "two_opt", "or_opt", "two_opt_star")
+
+    def __init__(
+        self,
+        instance: Instance,
+        initial_solver: VRPSolver | None = None,
+        *,
+        policy: str = "first",
+        operators: tuple[str, ...] = OPERATORS,
+        neighbor_k: int = 20,
+        max_iterations: int | None = None,
+        time_limit: float | None = None,
+        seed: int | None = None,
+    ):
+        super().__init__(instance)
+        if policy not in ("first", "best"):
+            raise ValueError(f"未知のpolicyです: {policy}")
+        unknown = set(operators) - set(self.OPERATORS)
+        if unknown:
+            raise ValueError(f"未知の近傍操作です: {sorted(unknown)}")
+        self.initial_solver = initial_solver
+        self.policy = policy
+        self.operators = tuple(operators)
+        self.neighbor_k = neighbor_k
+        self.max_iterations = max_iterations
+        self.time_limit = time_limit
+        self.seed = seed
+        self._neighbors: list[list[int]] | None = None
+
+    def solve(self):
+        sol = self.improve(self._initial_solution())
+        self.solution = sol
+        return sol
+
+    def improve(self, solution: Solution) -> Solution:
+        """solution を局所探索で改善した新しい Solution を返す（元の solution は変更しない）"""
+        for result in self._search(solution, self.time_limit, every_pass=False):
+            pass
+        return result
+
+    def iter_improve(self, solution: Solution, time_limit: float | None = None) -> Iterator[Solution]:
+        """improve() と同じ探索を行い、改善があったパスごとにその時点の解を返す"""
+        if self.time_limit is not None:
+            time_limit = self.time_limit if time_limit is None else min(time_limit, self.time_limit)
+        yield from self._search(solution, time_limit, every_pass=True)
+
+    def iter_solutions(self, time_limit: float | None = None) -> Iterator[Solution]:
+        """初期解を返した後、局所探索で改善した解をパスごとに返す"""
+        start = time.perf_counter()
+        initial = self._initial_solution()
+        yield initial
+        remaining = None if time_limit is None else max(0.0, time_limit - (time.perf_counter() - start))
+        yield from self.iter_improve(initial, remaining)
+
+    def _initial_solution(self) -> Solution:
+        if self.initial_solver is None:
+            from .NN_solver import NNSolver
+            self.initial_solver = NNSolver(self.instance)
+        return self.initial_solver.solve()
+
+    def _search(self, solution: Solution, time_limit: float | None, *, every_pass: bool) -> Iterator[Solution]:
+        """局所探索の本体。every_pass なら改善したパスごとに、そうでなければ最後に1回だけ解を返す"""
+        start = self._begin_solve()
+        instrumented = self.instrumentation.enabled
+        with self.phase("load"):
+            self._load(solution)
+            initial_distance = self._total_distance()
+        if instrumented:
+            # 計測時だけ距離参照を数えるラッパーに差し替える（無効時は素の distances.item のまま）
+            lookups = [0]
+            item = self._d
+
+            def counted(a, b):
+                lookups[0] += 1
+                return item(a, b)
+            self._d = counted
+            evaluations = {op: 0 for op in self.operators}
+
+        if self._neighbors is None:
+            with self.phase("neighbors"):
+                self._neighbors = k_nearest_neighbors(self.distances, self.neighbor_k).tolist()
+
+        order = [c for c in range(1, len(self._route_of)) if self._route_of[c] >= 0]
+        rng = random.Random(self.seed)
+        move_counts = {op: 0 for op in self.operators}
+        improvements = 0
+        passes = 0
+        yielded = False
+
+        def snapshot() -> Solution:
+            runtime = time.perf_counter() - start
+            meta = dict(solution.meta)
+            meta["local_search"] = {
+                "runtime_s": runtime,
+                "improvements": improvements,
+                "passes": passes,
+                "moves": dict(move_counts),
+                "policy": self.policy,
+                "neighbor_k": self.neighbor_k,
+                "initial_distance": initial_distance,
+            }
+            base_name = solution.solver_name or "solver"
+            return self._make_solution(
+                {vid: list(r) for vid, r in zip(self._vehicle_ids, self._routes)},
+                self._total_distance(),
+                status=solution.status,
+                runtime_s=(solution.runtime_s or 0.0) + runtime,
+                solver_name=f"{base_name}+LS",
+                meta=meta,
+            )
+
+        with self.phase("search"):
+            while True:
+                if self.max_iterations is not None and improvements >= self.max_iterations:
+                    break
+                if time_limit is not None and time.perf_counter() - start >= time_limit:
+                    break
+                passes += 1
+                if self.seed is not None:
+                    rng.shuffle(order)
+
+                applied = 0
+                best: Move | None = None
+                for u in order:
+                    for op in self.operators:
+                        moves = getattr(self, f"_moves_{op}")(u)
+                        if instrumented:
+                            moves = _counted(moves, evaluations, op)
+                        for move in moves:
+                            if move[0] >= -EPS:
+                                continue
+                            if self.policy == "first":
+                                best = move
+                                break
+                            if best is None or move[0] < best[0]:
+                                best = move
+                        if self.policy == "first" and best is not None:
+                            break
+                    if self.policy == "first" and best is not None:
+                        self._apply(best)
+                        move_counts[best[1]] += 1
+                        improvements += 1
+                        applied += 1
+                        best = None
+                        if self.max_iterations is not None and improvements >= self.max_iterations:
+                            break
+                    if time_limit is not None and time.perf_counter() - start >= time_limit:
+                        break
+
+                if self.policy == "best" and best is not None:
+                    self._apply(best)
+                    move_counts[best[1]] += 1
+                    improvements += 1
+                    applied += 1
+                if applied == 0:
+                    break
+                if every_pass:
+                    yielded = True
+                    yield snapshot()
+
+        if instrumented:
+            self._d = item
+            self.instrumentation.count("distance_lookups", lookups[0])
+            for op, n in evaluations.items():
+                self.instrumentation.count(f"candidate_evaluations.{op}", n)
+
+        if not (every_pass and yielded):
+            yield snapshot()
+
+    def print_solution(self):
+        if self.solution is None:
+            print("解がありません。")
+            return
+        ls = self.solution.meta.get("local_search", {})
+        print(f"=== VRP解（{self.solution.solver_name}） ===")
+        print(f"総移動距離: {self.solution.total_distance:.2f}（改善前: {ls.get('initial_distance', float('nan')):.2f}）")
+        print(f"改善回数: {ls.get('improvements', 0)}")
+        print(f"使用車両数: {self.solution.num_vehicles_used()}")
+        print("\n各車両のルート:")
+        for k, route in self.solution.routes.items():
+            route_str = " -> ".join(map(str, route))
+            print(f"車両{k}: {route_str}")
+
+    # ===== ルート状態の管理 =====
+    def _load(self, solution: Solution):
+        """Solution のルートを内部表現（[0, ..., 0] のリスト + 位置・積載キャッシュ）に展開"""
+        self._d = self.distances.item
+        self._dem: list[float] = self.demands.tolist()
+        capacity_of = {v.id: v.capacity for v in self.vehicles}
+
+        self._vehicle_ids: list[int] = []
+        self._routes: list[list[int]] = []
+        self._caps: list[float] = []
+        for vid, route in sorted(solution.routes.items()):
+            # 途中のデポ訪問は除いて [0, 顧客..., 0] の形に揃える
+            self._vehicle_ids.append(vid)
+            self._routes.append([0] + [c for c in route if c != 0] + [0])
+            self._caps.append(capacity_of.get(vid, self.capacity))
+
+        n = len(self._dem)
+        self._route_of: list[int] = [-1] * n
+        self._pos: list[int] = [0] * n
+        self._loads: list[float] = [0.0] * len(self._routes)
+        self._prefix: list[list[float]] = [[] for _ in self._routes]
+        for r in range(len(self._routes)):
+            self._refresh(r)
+
+    def _refresh(self, r: int):
+        """ルート r の位置・積載量・累積積載量のキャッシュを更新"""
+        route = self._routes[r]
+        prefix = []
+        load = 0.0
+        for p, c in enumerate(route):
+            if c != 0:
+                self._route_of[c] = r
+                self._pos[c] = p
+            load += self._dem[c]
+            prefix.append(load)
+        self._prefix[r] = prefix
+        self._loads[r] = load
+
+    def _total_distance(self) -> float:
+        d = self._d
+        return sum(d(a, b) for route in self._routes for a, b in zip(route, route[1:]))
+
+    # ===== 近傍操作の列挙（差分評価のみ、状態は変更しない） =====
+    def _moves_relocate(self, u: int) -> Iterator[Move]:
+        """u を別の位置（同一/別ルート）に移す"""
+        d, dem = self._d, self._dem
+        r = self._route_of[u]
+        route = self._routes[r]
+        i = self._pos[u]
+        p, n = route[i - 1], route[i + 1]
+        remove_gain = d(p, n) - d(p, u) - d(u, n)
+        for v in self._neighbors[u]:
+            rv = self._route_of[v]
+            if rv < 0:
+                continue
+            if rv != r and self._loads[rv] + dem[u] > self._caps[rv]:
+                continue
+            route_v = self._routes[rv]
+            j = self._pos[v]
+            for a, b in ((v, route_v[j + 1]), (route_v[j - 1], v)):
+                if a == u or b == u:
+                    continue
+                yield (remove_gain + d(a, u) + d(u, b) - d(a, b), "relocate", u, rv, a)
+
+    def _moves_swap(self, u: int) -> Iterator[Move]:
+        """別ルートの顧客 v と u を入れ替える"""
+        d, dem = self._d, self._dem
+        r = self._route_of[u]
+        route = self._routes[r]
+        i = self._pos[u]
+        pu, nu = route[i - 1], route[i + 1]
+        for v in self._neighbors[u]:
+            rv = self._route_of[v]
+            if rv < 0 or rv == r:
+                continue
+            if self._loads[r] - dem[u] + dem[v] > self._caps[r]:
+                continue
+            if self._loads[rv] - dem[v] + dem[u] > self._caps[rv]:
+                continue
+            route_v = self._routes[rv]
+            j = self._pos[v]
+            pv, nv = route_v[j - 1], route_v[j + 1]
+            delta = (
+                d(pu, v) + d(v, nu) - d(pu, u) - d(u, nu)
+                + d(pv, u) + d(u, nv) - d(pv, v) - d(v, nv)
+            )
+            yield (delta, "swap", u, v)
+
+    def _moves_two_opt(self, u: int) -> Iterator[Move]:
+        """同一ルート内で区間を反転し、辺 (u, v) を作る"""
+        d = self._d
+        r = self._route_of[u]
+        route = self._routes[r]
+        for v in self._neighbors[u]:
+            if self._route_of[v] != r:
+                continue
+            i, j = self._pos[u], self._pos[v]
+            if i > j:
+                i, j = j, i
+            if j - i < 2:
+                continue
+            a, b, c, e = route[i], route[i + 1], route[j], route[j + 1]
+            yield (d(a, c) + d(b, e) - d(a, b) - d(c, e), "two_opt", r, i, j)
+
+    def _moves_or_opt(self, u: int) -> Iterator[Move]:
+        """u から始まる長さ2～3の区間を同一ルート内の別位置へ移す（反転も考慮）"""
+        d = self._d
+        r = self._route_of[u]
+        route = self._routes[r]
+        i = self._pos[u]
+        for length in (2, 3):
+            last = i + length - 1
+            if last > len(route) - 2:
+                break
+            s0, sl = route[i], route[last]
+            p, n = route[i - 1], route[last + 1]
+            remove_gain = d(p, n) - d(p, s0) - d(sl, n)
+            segment = route[i:last + 1]
+            for v in self._neighbors[u]:
+                if self._route_of[v] != r or v in segment:
+                    continue
+                j = self._pos[v]
+                for a, b in ((v, route[j + 1]), (route[j - 1], v)):
+                    if b == s0 or a == sl:
+                        continue
+                    base = remove_gain - d(a, b)
+                    yield (base + d(a, s0) + d(sl, b), "or_opt", r, i, length, a, False)
+                    yield (base + d(a, sl) + d(s0, b), "or_opt", r, i, length, a, True)
+
+    def _moves_two_opt_star(self, u: int) -> Iterator[Move]:
+        """2ルートの後半を交換し、辺 (u, v) を作る"""
+        d = self._d
+        r1 = self._route_of[u]
+        route1 = self._routes[r1]
+        i = self._pos[u]
+        su = route1[i + 1]
+        pre1, load1 = self._prefix[r1][i], self._loads[r1]
+        for v in self._neighbors[u]:
+            r2 = self._route_of[v]
+            if r2 < 0 or r2 == r1:
+                continue
+            route2 = self._routes[r2]
+            j = self._pos[v]
+            pv = route2[j - 1]
+            pre2, load2 = self._prefix[r2][j - 1], self._loads[r2]
+            if pre1 + (load2 - pre2) > self._caps[r1]:
+                continue
+            if pre2 + (load1 - pre1) > self._caps[r2]:
+                continue
+            yield (d(u, v) + d(pv, su) - d(u, su) - d(pv, v), "two_opt_star", r1, i, r2, j)
+
+    # ===== 近傍操作の適用 =====
+    def _apply(self, move: Move):
+        name = move[1]
+        if name == "relocate":
+            _, _, u, rv, a = move
+            r = self._route_of[u]
+            self._routes[r].pop(self._pos[u])
+            self._insert_after(rv, a, [u])
+            self._refresh(r)
+            if rv != r:
+                self._refresh(rv)
+        elif name == "swap":
+            _, _, u, v = move
+            r, rv = self._route_of[u], self._route_of[v]
+            self._routes[r][self._pos[u]] = v
+            self._routes[rv][self._pos[v]] = u
+            self._refresh(r)
+            self._refresh(rv)
+        elif name == "two_opt":
+            _, _, r, i, j = move
+            route = self._routes[r]
+            route[i + 1:j + 1] = route[i + 1:j + 1][::-1]
+            self._refresh(r)
+        elif name == "or_opt":
+            _, _, r, i, length, a, reverse = move
+            route = self._routes[r]
+            segment = route[i:i + length]
+            del route[i:i + length]
+            self._insert_after(r, a, segment[::-1] if reverse else segment)
+            self._refresh(r)
+        elif name == "two_opt_star":
+            _, _, r1, i, r2, j = move
+            route1, route2 = self._routes[r1], self._routes[r2]
+            self._routes[r1] = route1[:i + 1] + route2[j:]
+            self._routes[r2] = route2[:j] + route1[i + 1:]
+            self._refresh(r1)
+            self._refresh(r2)
+        else:
+            raise ValueError(f"未知の近傍操作です: {name}")
+
+    def _insert_after(self, r: int, a: int, nodes: list[int]):
+        """ルート r のノード a の直後に nodes を挿入（a=0 は始点のデポ）"""
+        route = self._routes[r]
+        idx = 1 if a == 0 else route.index(a) + 1
+        route[idx:idx] = nodes
+
+
+def _counted(moves: Iterator[Move], evaluations: dict[str, int], op: str) -> Iterator[Move]:
+    """近傍操作の候補数を数えながら流す（計測時のみ使う）"""
+    for move in moves:
+        evaluations[op] += 1
+        yield move
@@ -1,15 +1,63 @@
+import math
 import pulp
 import time
+from typing import Iterator
 from .vrp_solver import VRPSolver
+from instance import Instance
+from solution import Solution
 
 
 class VRPSolverMIP(VRPSolver):
-    """MTZ制約を用いたVRPのMIPソルバー"""
-    
+    """VRPのMIPソルバー（CBC）
+
+    - formulation="mtz": 車両添字付き x[i,j,k] + MTZ制約（従来の定式化）
+    - formulation="two_index": 車両添字なし x[i,j] + MTZ型の積載量制約（車両の対称性がなく変数が |V|² 個）
+    - formulation="cutting_plane": 次数制約だけの x[i,j] から始め、解の部分巡回路・容量超過を
+      丸め容量制約（rounded capacity cut）で切りながら同じモデルを解き直す
+    - time_limit / gap_rel / threads: CBCの時間上限（秒）・相対ギャップ・スレッド数
+    - warm_start: NNやSweepの解を初期解としてCBCに渡す（全顧客を訪問している解のみ）
+
+    iter_solutions() / solve_anytime() では、まずヒューリスティック解を返し、その後は CBC を
+    時間を倍々に延ばしながら直前の最良解を warm start にして解き直し、見つかった暫定解を返す。
+    """
+
+    FORMULATIONS = ("mtz", "two_index", "cutting_plane")
+    # iter_solutions: 最初の CBC 実行の時間（秒）。以降は倍にしていく
+    ANYTIME_FIRST_SLICE = 1.0
+    # cutting_plane: 切除平面の探索に使う支持グラフの閾値
+    SEPARATION_THRESHOLDS = (1e-6, 0.5)
+
+    def __init__(
+        self,
+        instance: Instance,
+        *,
+        formulation: str = "mtz",
+        time_limit: float | None = None,
+        gap_rel: float | None = None,
+        threads: int | None = None,
+        warm_start: Solution | None = None,
+        msg: bool = False,
+        max_iterations: int = 100,
+        lp_rounds: int = 20,
+    ):
+        super().__init__(instance)
+        if formulation not in self.FORMULATIONS:
+            raise ValueError(f"未知の定式化です: {formulation}")
+        self.formulation = formulation
+        self.time_limit = time_limit
+        self.gap_rel = gap_rel
+        self.threads = threads
+        self.warm_start = warm_start
+        self.msg = msg
+        self.max_iterations = max_iterations  # cutting_plane: 整数解の解き直し回数の上限
+        self.lp_rounds = lp_rounds  # cutting_plane: 最初にLP緩和で切除を行う回数
+        self.model_build_s: float = 0.0
+        self._warm_started = False
+
     def model_mtz(self):
         """MTZ制約を用いてVRPをMIPで解く"""
         self.model = pulp.LpProblem("VRP_MTZ", pulp.LpMinimize)
-        
+
         # 決定変数
         # x[i,j,k] = 1 if 車両kが地点iから地点jに移動する
         self.x = pulp.LpVariable.dicts(
@@ -17,21 +65,21 @@ class VRPSolverMIP(VRPSolver):
             ((i.id, j.id, k_id) for i in self.customers_with_depot for j in self.customers_with_depot for k_id in self.vehicle_ids),
             cat="Binary",
         )
-        
+
         # u[i] = MTZ制約用の変数（地点iの訪問順序を表す）
         self.u = pulp.LpVariable.dicts(
             "u",
             (i.id for i in self.customers),
             lowBound=0, upBound=self.capacity, cat="Continuous"
         )
-        
+
         # 目的関数：総移動距離の最小化
         self.model += pulp.lpSum([
             self.distances[i.id, j.id] * self.x[i.id, j.id, k_id]
             for i in self.customers_with_depot for j in self.customers_with_depot for k_id in self.vehicle_ids
             if i.id != j.id
         ])
-        
+
         # 制約1：各顧客はちょうど1台の車両によって訪問される
         for customer in self.customers:
             self.model += pulp.lpSum([
@@ -39,14 +87,14 @@ class VRPSolverMIP(VRPSolver):
                 for i in self.customers_with_depot for k_id in self.vehicle_ids
                 if i.id != customer.id
             ]) == 1
-        
+
         # 制約2：各車両はデポから出発し、デポに戻る
         for k_id in self.vehicle_ids:
             # デポからの出発
             self.model += pulp.lpSum([self.x[0, j.id, k_id] for j in self.customers_with_depot]) == 1
             # デポへの帰還
             self.model += pulp.lpSum([self.x[i.id, 0, k_id] for i in self.customers_with_depot]) == 1
-        
+
         # 制約3：フロー保存制約（各地点での入出のバランス）
         for customer in self.customers_with_depot:
             for k_id in self.vehicle_ids:
@@ -55,78 +103,480 @@ class VRPSolverMIP(VRPSolver):
                     ==
                     pulp.lpSum([self.x[customer.id, j.id, k_id] for j in self.customers_with_depot if j.id != customer.id])
                 )
-        
+
         # 制約4：MTZ制約（部分巡回路除去 + 容量制約）
         for i in self.customers:
             for j in self.customers:
                 if i.id != j.id:
-                    self.model += self.u[i.id] - self.u[j.id] + self.capacity * pulp.lpSum([self.x[i.id, j.id, k_id] for k_id in self.vehicle_ids]) <= self.capacity - j.demand
+                    self.model += self.u[i.id] - self.u[j.id] + self.capacity * pulp.lpSum([self.x[i.id, j.id, k_id] for k_id in self.vehicle_ids]) <= self.capacity - self.demands[j.id]
         # 容量の下限（需要以上）
         for i in self.customers:
-            self.model += self.u[i.id] >= i.demand
+            self.model += self.u[i.id] >= self.demands[i.id]
+
+    def model_two_index(self):
+        """車両添字のない2添字定式化（x[i,j] + MTZ型の積載量制約）"""
+        self.model = pulp.LpProblem("VRP_TwoIndex", pulp.LpMinimize)
+        n = len(self.customers_with_depot)
+        q = self.demands.tolist()
+        Q = self.capacity
+
+        # 2顧客の需要合計が容量を超える弧は作らない
+        arcs = [
+            (i, j) for i in range(n) for j in range(n)
+            if i != j and (i == 0 or j == 0 or q[i] + q[j] <= Q)
+        ]
+        self.x = {(i, j): pulp.LpVariable(f"x_{i}_{j}", cat="Binary") for i, j in arcs}
+        # u[i] = 地点iまでの積載量
+        self.u = {i: pulp.LpVariable(f"u_{i}", lowBound=q[i], upBound=Q, cat="Continuous") for i in range(1, n)}
+
+        out_arcs: list[list[tuple[pulp.LpVariable, float]]] = [[] for _ in range(n)]
+        in_arcs: list[list[tuple[pulp.LpVariable, float]]] = [[] for _ in range(n)]
+        for (i, j), var in self.x.items():
+            out_arcs[i].append((var, 1))
+            in_arcs[j].append((var, 1))
+
+        # 目的関数：総移動距離の最小化
+        self.model += pulp.LpAffineExpression((var, float(self.distances[i, j])) for (i, j), var in self.x.items())
+
+        # 制約1：各顧客に1本入り1本出る
+        for c in range(1, n):
+            self.model += pulp.LpAffineExpression(in_arcs[c]) == 1
+            self.model += pulp.LpAffineExpression(out_arcs[c]) == 1
+
+        # 制約2：デポの出入りは同数で、台数以下・需要から決まる最小台数以上
+        depot_out = pulp.LpAffineExpression(out_arcs[0])
+        self.model += depot_out == pulp.LpAffineExpression(in_arcs[0])
+        self.model += depot_out <= len(self.vehicles)
+        self.model += depot_out >= math.ceil(sum(q[1:]) / Q - 1e-9)
+
+        # 制約3：MTZ制約（部分巡回路除去 + 容量制約）
+        for (i, j), var in self.x.items():
+            if i != 0 and j != 0:
+                self.model += self.u[i] - self.u[j] + Q * var <= Q - q[j]
+
+    def model_cutting_plane(self):
+        """次数制約だけの2添字モデル（部分巡回路・容量の制約は解きながら追加する）"""
+        self.model = pulp.LpProblem("VRP_CuttingPlane", pulp.LpMinimize)
+        n = len(self.customers_with_depot)
+        q = self.demands.tolist()
+        Q = self.capacity
+
+        arcs = [
+            (i, j) for i in range(n) for j in range(n)
+            if i != j and (i == 0 or j == 0 or q[i] + q[j] <= Q)
+        ]
+        self.x = {(i, j): pulp.LpVariable(f"x_{i}_{j}", cat="Binary") for i, j in arcs}
+        self.u = {}
+        # 切除平面の生成用: 地点 j に入る弧 (i, 変数)
+        self._in_arcs: list[list[tuple[int, pulp.LpVariable]]] = [[] for _ in range(n)]
+        out_arcs: list[list[tuple[pulp.LpVariable, float]]] = [[] for _ in range(n)]
+        for (i, j), var in self.x.items():
+            self._in_arcs[j].append((i, var))
+            out_arcs[i].append((var, 1))
+
+        self.model += pulp.LpAffineExpression((var, float(self.distances[i, j])) for (i, j), var in self.x.items())
+        for c in range(1, n):
+            self.model += pulp.LpAffineExpression((var, 1) for _, var in self._in_arcs[c]) == 1
+            self.model += pulp.LpAffineExpression(out_arcs[c]) == 1
+        depot_out = pulp.LpAffineExpression(out_arcs[0])
+        self.model += depot_out == pulp.LpAffineExpression((var, 1) for _, var in self._in_arcs[0])
+        self.model += depot_out <= len(self.vehicles)
+        self.model += depot_out >= math.ceil(sum(q[1:]) / Q - 1e-9)
 
     def solve(self):
+        if self.formulation == "cutting_plane":
+            return self._solve_cutting_plane()
+
+        self._begin_solve()
         # モデル未構築なら構築
         if not hasattr(self, "model"):
-            self.model_mtz()
+            build_start = time.perf_counter()
+            with self.phase("model_build"):
+                if self.formulation == "two_index":
+                    self.model_two_index()
+                else:
+                    self.model_mtz()
+            self.model_build_s = time.perf_counter() - build_start
+        if self.warm_start is not None:
+            with self.phase("warm_start"):
+                self._warm_started = self._set_initial_values(self.warm_start)
+        self._count_model_size()
+
         # ソルバー実行
-        start_time = time.time()
-        self.model.solve(pulp.PULP_CBC_CMD(msg=0))
-        runtime_s = time.time() - start_time
+        start_time = time.perf_counter()
+        with self.phase("cbc"):
+            self.model.solve(pulp.PULP_CBC_CMD(
+                msg=self.msg,
+                timeLimit=self.time_limit,
+                gapRel=self.gap_rel,
+                threads=self.threads,
+                warmStart=self._warm_started,
+            ))
+        solve_s = time.perf_counter() - start_time
+        runtime_s = self.model_build_s + solve_s
         status_str = pulp.LpStatus[self.model.status]
-        
-        # 解の解析
-        if self.model.status == pulp.LpStatusOptimal:
-            routes, total_distance = self._extract_routes_and_distance()
+
+        # 解の解析（時間切れでも整数解があれば返す）
+        if self.model.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+            with self.phase("extract_routes"):
+                routes, total_distance = self._extract_routes_and_distance()
             try:
                 obj_val = float(pulp.value(self.model.objective))
             except Exception:
                 obj_val = total_distance
             total_distance = obj_val if obj_val is not None else total_distance
-            sol = self._make_solution(routes, total_distance, status=status_str, runtime_s=runtime_s, solver_name="MIP(CBC)")
+            if self.model.sol_status != pulp.LpSolutionOptimal:
+                status_str = "Feasible"
+            meta = {
+                "formulation": self.formulation,
+                "model_build_s": self.model_build_s,
+                "solve_s": solve_s,
+                "time_limit": self.time_limit,
+                "gap_rel": self.gap_rel,
+                "threads": self.threads,
+                "warm_start": self._warm_started,
+            }
+            if self._warm_started:
+                meta["warm_start_objective"] = self.warm_start.objective_value
+            sol = self._make_solution(routes, total_distance, status=status_str, runtime_s=runtime_s, solver_name="MIP(CBC)", meta=meta)
             self.solution = sol
             return sol
         else:
+            self.instrumentation.end()
             raise Exception(f"最適解が見つかりませんでした。ステータス: {status_str}")
 
+    def iter_solutions(self, time_limit: float | None = None) -> Iterator[Solution]:
+        """ヒューリスティック解 → CBC の暫定解の順に、改善した解を返す
+
+        CBC には実行途中の解を受け取る手段がないため、時間上限を ANYTIME_FIRST_SLICE から倍々に
+        延ばして解き直す（毎回それまでの最良解を warm start にし、最適性が示されたら終了）。
+        time_limit を省略した場合はコンストラクタの time_limit を使う。
+        """
+        start = time.perf_counter()
+        budget = time_limit if time_limit is not None else self.time_limit
+        incumbent = self.warm_start
+        if incumbent is None:
+            from .savings_solver import SavingsSolver
+            from .local_search import LocalSearch
+            incumbent = LocalSearch(self.instance).improve(SavingsSolver(self.instance).solve())
+        if incumbent.is_feasible:
+            yield incumbent
+
+        original = (self.time_limit, self.warm_start)
+        slice_s = self.ANYTIME_FIRST_SLICE
+        try:
+            while True:
+                remaining = None if budget is None else budget - (time.perf_counter() - start)
+                if remaining is not None and remaining <= 0:
+                    return
+                self.time_limit = slice_s if remaining is None else min(slice_s, remaining)
+                self.warm_start = incumbent if incumbent.is_feasible else None
+                try:
+                    sol = self.solve()
+                except Exception:
+                    # この時間では整数解が見つからなかった
+                    sol = None
+                if sol is not None and not sol.is_feasible:
+                    # 切除平面法が収束せず、車両数に収まらない修復解しかなかった
+                    sol = None
+                if sol is not None and (not incumbent.is_feasible or sol.total_distance < incumbent.total_distance - 1e-9):
+                    incumbent = sol
+                    yield sol
+                if sol is not None and sol.status == "Optimal":
+                    return
+                slice_s *= 2
+        finally:
+            self.time_limit, self.warm_start = original
+
+    def _solve_cutting_plane(self):
+        """LP緩和 → 整数解の順に解き、違反した丸め容量制約を追加して解き直す"""
+        start = self._begin_solve()
+        if not hasattr(self, "model"):
+            with self.phase("model_build"):
+                self.model_cutting_plane()
+        self.model_build_s = time.perf_counter() - start
+        if self.warm_start is not None:
+            with self.phase("warm_start"):
+                self._warm_started = self._set_initial_values(self.warm_start)
+        self._count_model_size()
+
+        iterations: list[dict] = []
+        total_cuts = 0
+        status_str = "Not Solved"
+        solved = False
+        stop_reason = None  # 収束しなかった理由: "time_limit" / "max_iterations" / "cbc_status"
+        last_phase = None  # 最後に CBC で解いたのが LP 緩和か整数計画か
+
+        # 前半はLP緩和で（整数性なしで）切除し、後半は整数解で切除する
+        phases = [("lp", self.lp_rounds), ("mip", self.max_iterations)]
+        for phase, rounds in phases:
+            for var in self.x.values():
+                var.cat = pulp.LpContinuous if phase == "lp" else pulp.LpInteger
+            for _ in range(rounds):
+                remaining = None
+                if self.time_limit is not None:
+                    remaining = self.time_limit - (time.perf_counter() - start)
+                    if remaining <= 0:
+                        stop_reason = "time_limit"
+                        break
+                iter_start = time.perf_counter()
+                with self.phase(f"cbc_{phase}"):
+                    self.model.solve(pulp.PULP_CBC_CMD(
+                        msg=self.msg,
+                        timeLimit=remaining,
+                        gapRel=self.gap_rel if phase == "mip" else None,
+                        threads=self.threads,
+                        warmStart=self._warm_started and phase == "mip",
+                    ))
+                status_str = pulp.LpStatus[self.model.status]
+                last_phase = phase
+                if self.model.status != pulp.LpStatusOptimal:
+                    # CBC が時間切れで止まった場合も Not Solved になる
+                    out_of_time = self.time_limit is not None and time.perf_counter() - start >= self.time_limit
+                    stop_reason = "time_limit" if out_of_time else "cbc_status"
+                    break
+
+                with self.phase("separation"):
+                    cuts = self._separate_capacity_cuts()
+                for cut in cuts:
+                    self.model += cut
+                total_cuts += len(cuts)
+                iterations.append({
+                    "iteration": len(iterations) + 1,
+                    "phase": phase,
+                    "cuts": len(cuts),
+                    "bound": float(pulp.value(self.model.objective)),
+                    "time_s": time.perf_counter() - iter_start,
+                })
+                if not cuts:
+                    solved = phase == "mip"
+                    break
+            else:
+                if phase == "mip":
+                    stop_reason = "max_iterations"
+            if stop_reason is not None:
+                break
+
+        self.instrumentation.count("cuts", total_cuts)
+        meta = {
+            "formulation": self.formulation,
+            "model_build_s": self.model_build_s,
+            "time_limit": self.time_limit,
+            "gap_rel": self.gap_rel,
+            "threads": self.threads,
+            "warm_start": self._warm_started,
+            "total_cuts": total_cuts,
+            "cutting_plane": iterations,
+        }
+        has_integer = last_phase == "mip" and self.model.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible)
+        if not solved and has_integer and stop_reason != "max_iterations":
+            # 時間切れで止まった整数解でも、違反する容量制約がなければそのまま実行可能解
+            with self.phase("separation"):
+                solved = not self._separate_capacity_cuts()
+            if solved:
+                status_str = "Feasible"
+        if not solved:
+            return self._cutting_plane_incumbent(start, stop_reason, status_str, has_integer, meta)
+
+        runtime_s = time.perf_counter() - start
+        with self.phase("extract_routes"):
+            routes, total_distance = self._extract_routes_and_distance()
+        if self.model.sol_status != pulp.LpSolutionOptimal:
+            status_str = "Feasible"
+        sol = self._make_solution(routes, total_distance, status=status_str, runtime_s=runtime_s, solver_name="MIP(CBC,cuts)", meta=meta)
+        self.solution = sol
+        return sol
+
+    def _cutting_plane_incumbent(self, start: float, stop_reason: str | None, status_str: str, has_integer: bool, meta: dict) -> Solution:
+        """切除平面法が収束しなかったときの解: 最後の整数解を直した解か warm start の良い方
+
+        - 最後の整数解（部分巡回路・容量超過を含む）は、弧をたどった顧客順を Split で区切り直して直す
+        - 実行可能な解があれば status="Feasible"、直した解が車両数に収まらなければ "Not Solved"
+        - どちらもなければ止まった理由を付けて例外にする
+        """
+        reason = {
+            "time_limit": f"時間上限 {self.time_limit} 秒に達し、容量制約の違反が残っています",
+            "max_iterations": f"反復上限 max_iterations={self.max_iterations} に達し、容量制約の違反が残っています",
+            "cbc_status": f"CBC のステータスが {status_str} です",
+        }.get(stop_reason, f"ステータス: {status_str}")
+        meta = dict(meta, stop_reason=stop_reason)
+
+        candidates: list[tuple[str, Solution]] = []
+        if has_integer:
+            from .split_solver import SplitSolver
+            with self.phase("repair"):
+                candidates.append(("repaired", SplitSolver(self.instance, tour=self._tour_from_arcs()).solve()))
+        if self.warm_start is not None and self.warm_start.is_feasible:
+            candidates.append(("warm_start", self.warm_start))
+        if not candidates:
+            self.instrumentation.end()
+            raise Exception(f"切除平面法で解が得られませんでした: {reason}（反復 {len(meta['cutting_plane'])} 回）")
+
+        feasible = [c for c in candidates if c[1].is_feasible]
+        source, incumbent = min(feasible or candidates, key=lambda c: c[1].total_distance)
+        meta["incumbent"] = source
+        meta["message"] = reason
+        sol = self._make_solution(
+            incumbent.routes, incumbent.total_distance, status="Feasible" if feasible else "Not Solved",
+            runtime_s=time.perf_counter() - start, solver_name="MIP(CBC,cuts)", meta=meta,
+        )
+        sol.is_feasible = bool(feasible)
+        self.solution = sol
+        return sol
+
+    def _tour_from_arcs(self) -> list[int]:
+        """2添字の整数解の弧をたどった顧客順（デポから出るルートの後に、部分巡回路を続ける）"""
+        successor: dict[int, int] = {}
+        depot_starts: list[int] = []
+        for (i, j), var in self.x.items():
+            if var.varValue is not None and var.varValue >= 0.5:
+                if i == 0:
+                    depot_starts.append(j)
+                else:
+                    successor[i] = j
+        order: list[int] = []
+        seen = {0}
+        for first in sorted(depot_starts) + [c.id for c in self.customers]:
+            current = first
+            while current not in seen:
+                seen.add(current)
+                order.append(current)
+                current = successor.get(current, 0)
+        return order
+
+    def _count_model_size(self):
+        if self.instrumentation.enabled:
+            self.instrumentation.count("variables", self.model.numVariables())
+            self.instrumentation.count("constraints", self.model.numConstraints())
+
+    def _separate_capacity_cuts(self) -> list[pulp.LpConstraint]:
+        """現在の解（整数・小数とも）から違反している丸め容量制約を作る
+
+        デポを除いた支持グラフ（x > 0 の弧）の連結成分 S ごとに、
+        S に入る弧の合計が ceil(q(S) / Q) 未満なら x(δ⁻(S)) >= ceil(q(S) / Q) を追加する。
+        整数解では部分巡回路（流入 0）と容量超過ルートがちょうどこの形で検出される。
+        """
+        n = len(self.customers_with_depot)
+        values = {key: var.varValue or 0.0 for key, var in self.x.items()}
+        cuts = []
+        found: set[frozenset[int]] = set()
+        # 閾値を変えて支持グラフを作ると、小数解でも別の候補集合が得られる
+        for threshold in self.SEPARATION_THRESHOLDS:
+            adjacency: list[list[int]] = [[] for _ in range(n)]
+            for (i, j), value in values.items():
+                if i != 0 and j != 0 and value > threshold:
+                    adjacency[i].append(j)
+                    adjacency[j].append(i)
+
+            seen = [False] * n
+            for c in range(1, n):
+                if seen[c]:
+                    continue
+                component = []
+                stack = [c]
+                seen[c] = True
+                while stack:
+                    a = stack.pop()
+                    component.append(a)
+                    for b in adjacency[a]:
+                        if not seen[b]:
+                            seen[b] = True
+                            stack.append(b)
+
+                members = frozenset(component)
+                if members in found:
+                    continue
+                need = math.ceil(sum(self.demands[m] for m in component) / self.capacity - 1e-9)
+                entering = [(i, j, var) for j in component for i, var in self._in_arcs[j] if i not in members]
+                inflow = sum(values[i, j] for i, j, _ in entering)
+                if inflow < need - 1e-6:
+                    found.add(members)
+                    cuts.append(pulp.LpAffineExpression((var, 1) for _, _, var in entering) >= need)
+        return cuts
+
     def _extract_routes_and_distance(self) -> tuple[dict[int, list[int]], float]:
-        """モデルのxからルートと総距離を抽出"""
+        """モデルのxからルートと総距離を抽出（値が1の弧を1度だけ走査）"""
+        # 後続ノード: 3添字なら (車両, 地点) -> 次の地点、2添字ならデポ以外は一意でデポからは複数
+        successor: dict[tuple[int, int], int] = {}
+        depot_starts: list[int] = []
+        for key, var in self.x.items():
+            if var.varValue is None or var.varValue < 0.5:
+                continue
+            if self.formulation != "mtz":
+                i, j = key
+                if i == 0:
+                    depot_starts.append(j)
+                else:
+                    successor[0, i] = j
+            else:
+                i, j, k_id = key
+                if i != j:
+                    successor[k_id, i] = j
+
         routes: dict[int, list[int]] = {}
         total_distance = 0.0
+        if self.formulation != "mtz":
+            firsts = dict(zip(self.vehicle_ids, sorted(depot_starts)))
+        else:
+            firsts = {k_id: successor.get((k_id, 0)) for k_id in self.vehicle_ids}
+
         for k_id in self.vehicle_ids:
+            current = firsts.get(k_id)
+            if not current:
+                # 使われない車両
+                routes[k_id] = [0, 0]
+                continue
+            lookup_k = 0 if self.formulation != "mtz" else k_id
             route: list[int] = [0]
-            current = 0
-            while True:
-                next_customer = None
-                for customer in self.customers_with_depot:
-                    key = (current, customer.id, k_id)
-                    if key in self.x and self.x[key].varValue == 1:
-                        next_customer = customer
-                        break
-                if next_customer is None:
-                    break
-                if next_customer.id != 0:
-                    route.append(next_customer.id)
-                total_distance += self.distances[current, next_customer.id]
-                current = next_customer.id
-                if current == 0:
-                    break
-            if route:
-                routes[k_id] = route
+            total_distance += self.distances[0, current]
+            while current != 0:
+                route.append(current)
+                nxt = successor.get((lookup_k, current), 0)
+                total_distance += self.distances[current, nxt]
+                current = nxt
             route.append(0)
+            routes[k_id] = route
         return routes, total_distance
 
+    def _set_initial_values(self, solution: Solution) -> bool:
+        """解をCBCの初期値として設定する。全顧客を訪問していない解は使わない"""
+        visited = sorted(c for r in solution.routes.values() for c in r if c != 0)
+        if visited != [c.id for c in self.customers]:
+            return False
+        routes = [[0] + [c for c in r if c != 0] + [0] for r in solution.routes.values() if len(r) > 2]
+        if len(routes) > len(self.vehicle_ids):
+            return False
+
+        for var in self.x.values():
+            var.setInitialValue(0)
+        for k_id, route in zip(self.vehicle_ids, routes):
+            load = 0.0
+            for i, j in zip(route, route[1:]):
+                key = (i, j) if self.formulation != "mtz" else (i, j, k_id)
+                if key not in self.x:
+                    return False
+                self.x[key].setInitialValue(1)
+                if j != 0 and self.u:
+                    load += self.demands[j]
+                    self.u[j].setInitialValue(load)
+        if self.formulation == "mtz":
+            # 使わない車両は x[0,0,k] = 1 でデポに留まる
+            for k_id in self.vehicle_ids[len(routes):]:
+                self.x[0, 0, k_id].setInitialValue(1)
+        return True
+
     def print_solution(self):
         """解を表示"""
         if self.solution is None:
             print("解がありません。")
             return
-        
-        print("=== VRP解（MTZ制約） ===")
+
+        label = {"mtz": "MTZ制約", "two_index": "2添字定式化", "cutting_plane": "切除平面法"}[self.formulation]
+        print(f"=== VRP解（{label}） ===")
         print(f"総移動距離: {self.solution.total_distance:.2f}")
         print(f"使用車両数: {self.solution.num_vehicles_used()}")
         print("\n各車両のルート:")
-        
+
         for k, route in self.solution.routes.items():
             route_str = " -> ".join(map(str, route))
             print(f"車両{k}: {route_str}")
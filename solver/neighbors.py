@@ -0,0 +1,91 @@
+import numpy as np
+
+
+def k_nearest_neighbors(distances: np.ndarray, k: int, *, block_size: int = 1024) -> np.ndarray:
+    """各ノードから近い順に k 個の顧客IDを返す（デポと自分自身は除外）
+
+    argpartition を行ブロック単位で適用するので、作業領域は block_size x N に収まる。
+    座標から計算する距離（LazyDistances）なら、全行を走査せずにその k近傍グラフを使う。
+    戻り値の shape は (N+1, k')（k' = min(k, 顧客数 - 1)）。
+    """
+    if hasattr(distances, "knn"):
+        return distances.knn(k).neighbors
+    n = distances.shape[0]
+    k = max(0, min(k, n - 2))
+    neighbors = np.empty((n, k), dtype=np.int64)
+    if k == 0:
+        return neighbors
+
+    for r0 in range(0, n, block_size):
+        r1 = min(r0 + block_size, n)
+        block = np.array(distances[r0:r1], dtype=np.float64)
+        block[:, 0] = np.inf
+        rows = np.arange(r1 - r0)
+        block[rows, rows + r0] = np.inf
+        part = np.argpartition(block, k - 1, axis=1)[:, :k]
+        part_d = np.take_along_axis(block, part, axis=1)
+        # 距離→IDの順で安定に並べる
+        order = np.lexsort((part, part_d), axis=1)
+        neighbors[r0:r1] = np.take_along_axis(part, order, axis=1)
+    return neighbors
+
+
+class NearestNeighborEngine:
+    """k近傍候補リストを使った「容量に入る最近傍の未訪問顧客」探索
+
+    - 各ノードの候補リストは距離昇順で事前計算しておく
+    - 訪問済みの顧客はリストから消さず、先頭側から読み飛ばす（遅延削除）
+    - リストに条件を満たす顧客が残っていないときだけ全件走査に切り替える
+    """
+
+    def __init__(self, distances: np.ndarray, demands: np.ndarray, k: int = 32):
+        self.distances = distances
+        self.demands = np.asarray(demands, dtype=np.float64)
+        self.neighbors = k_nearest_neighbors(distances, k)
+        self._lists: list[list[int]] = self.neighbors.tolist()
+        self._head: list[int] = [0] * distances.shape[0]
+
+        # デポ(0)は訪問対象外
+        self._unvisited = np.ones(distances.shape[0], dtype=bool)
+        self._unvisited[0] = False
+        self.remaining: int = distances.shape[0] - 1
+        self.stats = {"list_hits": 0, "fallback_scans": 0}
+
+    def is_unvisited(self, cid: int) -> bool:
+        return bool(self._unvisited[cid])
+
+    def visit(self, cid: int):
+        """顧客を訪問済みにする"""
+        if self._unvisited[cid]:
+            self._unvisited[cid] = False
+            self.remaining -= 1
+
+    def unvisited_ids(self) -> np.ndarray:
+        return np.flatnonzero(self._unvisited)
+
+    def nearest_feasible(self, current: int, capacity_left: float) -> int | None:
+        """current から最も近い、需要が capacity_left 以下の未訪問顧客IDを返す"""
+        if self.remaining == 0:
+            return None
+
+        row = self._lists[current]
+        unvisited = self._unvisited
+        demands = self.demands
+
+        # 先頭に溜まった訪問済みを読み飛ばす
+        p = self._head[current]
+        while p < len(row) and not unvisited[row[p]]:
+            p += 1
+        self._head[current] = p
+
+        for cid in row[p:]:
+            if unvisited[cid] and demands[cid] <= capacity_left:
+                self.stats["list_hits"] += 1
+                return cid
+
+        # リスト内に候補がない → 全件走査
+        self.stats["fallback_scans"] += 1
+        mask = unvisited & (demands <= capacity_left)
+        if not mask.any():
+            return None
+        return int(np.argmin(np.where(mask, self.distances[current], np.inf)))
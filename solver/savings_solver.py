@@ -0,0 +1,158 @@
+from .vrp_solver import VRPSolver
+from .neighbors import k_nearest_neighbors
+from instance import Instance
+from distances import LazyDistances
+import numpy as np
+import time
+
+# neighbor_k="auto" で全ペアを候補にする顧客数の上限（超えると k近傍に絞る）
+# 全ペアはペア数 N(N-1)/2 に比例した作業領域を使う（2000 顧客で約 200 万ペア・数十MB）
+_ALL_PAIRS_MAX_CUSTOMERS = 2000
+_AUTO_NEIGHBOR_K = 40
+
+
+class SavingsSolver(VRPSolver):
+    """Clarke-Wright の節約法（並列版）でVRPを解くソルバー
+
+    - 節約値 s(i, j) = d(0, i) + d(0, j) - d(i, j) をNumPyでまとめて計算し、降順に並べた配列から順に併合する
+    - ルート端点の管理は Union-Find（所属ルート・積載量）と各顧客の接続数で行う
+    - neighbor_k を指定すると各顧客の k 近傍の組だけを候補にする（大規模向け）。None なら全ペア
+    - 既定の "auto" は、顧客数が _ALL_PAIRS_MAX_CUSTOMERS 以下で密な距離行列なら全ペア、
+      それ以外（大規模・LazyDistances）では k = _AUTO_NEIGHBOR_K の近傍に絞る（全ペアはメモリが O(N^2)）
+    """
+
+    def __init__(self, instance: Instance, neighbor_k: int | str | None = "auto"):
+        super().__init__(instance)
+        if neighbor_k == "auto":
+            neighbor_k = self._auto_neighbor_k()
+        elif isinstance(neighbor_k, str):
+            raise ValueError(f"neighbor_k は整数・None・\"auto\" のいずれかです: {neighbor_k!r}")
+        self.neighbor_k = neighbor_k
+
+    def solve(self):
+        start = self._begin_solve()
+
+        with self.phase("savings"):
+            pairs_i, pairs_j, savings = self._compute_savings()
+        with self.phase("sort"):
+            order = np.argsort(-savings, kind="stable")
+        with self.phase("merge"):
+            links = self._merge(pairs_i[order].tolist(), pairs_j[order].tolist())
+        with self.phase("build_routes"):
+            routes, total_distance = self._build_routes(links)
+        if self.instrumentation.enabled:
+            self.instrumentation.count("candidate_evaluations", int(savings.size))
+
+        runtime = time.perf_counter() - start
+        status = "Feasible" if len(routes) <= len(self.vehicles) else "Infeasible"
+        sol = self._make_solution(
+            routes, total_distance, status=status, runtime_s=runtime, solver_name="Savings",
+            meta={"neighbor_k": self.neighbor_k, "num_candidates": int(savings.size), "num_routes": len(routes)},
+        )
+        # 車両数を超えるルートが必要になった場合は実行不可能として返す
+        sol.is_feasible = status == "Feasible"
+        self.solution = sol
+        return sol
+
+    def print_solution(self):
+        if self.solution is None:
+            print("解がありません。")
+            return
+        print("=== VRP解（Savings） ===")
+        print(f"総移動距離: {self.solution.total_distance:.2f}")
+        print(f"使用車両数: {self.solution.num_vehicles_used()}")
+        print("\n各車両のルート:")
+        for k, route in self.solution.routes.items():
+            route_str = " -> ".join(map(str, route))
+            print(f"車両{k}: {route_str}")
+
+    # ===== 内部ヘルパー =====
+    def _auto_neighbor_k(self) -> int | None:
+        """neighbor_k="auto" の解決: 小さい密な問題は全ペア（None）、それ以外は k近傍"""
+        if isinstance(self.distances, LazyDistances) or self.instance.num_customers > _ALL_PAIRS_MAX_CUSTOMERS:
+            return _AUTO_NEIGHBOR_K
+        return None
+
+    def _compute_savings(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """候補となる顧客ペア (i < j) と節約値を返す（正の節約値のみ）"""
+        n = self.distances.shape[0]
+        d0 = np.asarray(self.distances[0], dtype=np.float64)
+
+        if self.neighbor_k is None:
+            pairs_i, pairs_j = np.triu_indices(n - 1, k=1)
+            pairs_i = pairs_i + 1
+            pairs_j = pairs_j + 1
+        else:
+            neighbors = k_nearest_neighbors(self.distances, self.neighbor_k)[1:]
+            rows = np.repeat(np.arange(1, n), neighbors.shape[1])
+            cols = neighbors.ravel()
+            # (i, j) と (j, i) を1つにまとめる
+            keys = np.unique(np.minimum(rows, cols) * n + np.maximum(rows, cols))
+            pairs_i, pairs_j = keys // n, keys % n
+
+        savings = d0[pairs_i] + d0[pairs_j] - self.distances[pairs_i, pairs_j]
+        positive = savings > 0
+        return pairs_i[positive], pairs_j[positive], savings[positive]
+
+    def _merge(self, pairs_i: list[int], pairs_j: list[int]) -> list[list[int]]:
+        """節約値の大きい順にルート端点同士を連結し、各顧客の隣接顧客リストを返す"""
+        n = self.distances.shape[0]
+        parent = list(range(n))
+        load = self.demands.tolist()
+        links: list[list[int]] = [[] for _ in range(n)]
+
+        def find(a: int) -> int:
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            return a
+
+        capacity = self.capacity
+        for i, j in zip(pairs_i, pairs_j):
+            # どちらもルート端点（接続数 < 2）でなければ連結できない
+            if len(links[i]) == 2 or len(links[j]) == 2:
+                continue
+            ri, rj = find(i), find(j)
+            if ri == rj or load[ri] + load[rj] > capacity:
+                continue
+            links[i].append(j)
+            links[j].append(i)
+            parent[rj] = ri
+            load[ri] += load[rj]
+        return links
+
+    def _build_routes(self, links: list[list[int]]) -> tuple[dict[int, list[int]], float]:
+        """隣接リストを端点からたどってルートにし、車両IDを割り当てる"""
+        n = len(links)
+        visited = [False] * n
+        tours: list[list[int]] = []
+        for c in range(1, n):
+            if visited[c] or len(links[c]) == 2:
+                continue
+            tour = [c]
+            visited[c] = True
+            prev, cur = -1, c
+            while True:
+                nxt = next((x for x in links[cur] if x != prev), None)
+                if nxt is None:
+                    break
+                tour.append(nxt)
+                visited[nxt] = True
+                prev, cur = cur, nxt
+            tours.append(tour)
+
+        routes: dict[int, list[int]] = {}
+        total_distance: float = 0.0
+        vehicle_ids = list(self.vehicle_ids)
+        next_id = max(vehicle_ids, default=0) + 1
+        for k, tour in enumerate(tours):
+            route = [0] + tour + [0]
+            total_distance += float(self.distances[route[:-1], route[1:]].sum())
+            # 車両数を超えた分は仮の車両IDを振る
+            if k < len(vehicle_ids):
+                vid = vehicle_ids[k]
+            else:
+                vid = next_id
+                next_id += 1
+            routes[vid] = route
+        return routes, total_distance
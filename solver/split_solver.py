@@ -0,0 +1,228 @@
+from collections import deque
+import math
+import time
+
+import numpy as np
+
+from .vrp_solver import VRPSolver
+from .neighbors import NearestNeighborEngine
+from .sweep_solver import SweepSolver
+from instance import Instance
+
+
+class SplitSolver(VRPSolver):
+    """Route-first, cluster-second: 全顧客を1本の巡回（ジャイアントツアー）にしてから最適に分割する
+
+    tour: ジャイアントツアーの作り方
+        - "sweep": デポからの角度順（SweepSolver と同じ順序）
+        - "nn": 容量を無視した最近傍の巡回
+        - 顧客IDの列: その順序をそのまま使う
+    max_route_customers: 1ルートあたりの顧客数の上限（None なら容量だけ）
+    neighbor_k: tour="nn" のときの候補リストの長さ
+
+    分割はツアーの順序を保ったまま、総距離が最小になるルートの区切りを求める（Split）。
+    区切りの候補は両端キューで管理し、各顧客を1度ずつ出し入れするので O(N)（Bellman 法の O(N^2) ではない）。
+    車両数を超える分割になった場合だけ、ルート数ごとの層に分けて解き直す（O(車両数 x N)）。
+    """
+
+    def __init__(
+        self,
+        instance: Instance,
+        *,
+        tour: str | list[int] | np.ndarray = "sweep",
+        max_route_customers: int | None = None,
+        neighbor_k: int = 32,
+    ):
+        super().__init__(instance)
+        self.tour = tour
+        self.max_route_customers = max_route_customers
+        self.neighbor_k = neighbor_k
+
+    def solve(self):
+        start = self._begin_solve()
+
+        with self.phase("giant_tour"):
+            tour = self._giant_tour()
+        # 単独で容量を超える顧客はどのルートにも入らない
+        servable = self.demands[tour] <= self.capacity
+        skipped = int((~servable).sum())
+        tour = tour[servable]
+
+        with self.phase("split"):
+            cuts, fleet_limited = self._split(tour)
+        with self.phase("build_routes"):
+            routes, total_distance = self._build_routes(tour, cuts)
+
+        runtime = time.perf_counter() - start
+        if skipped:
+            status = "Partial"
+        elif len(routes) <= len(self.vehicles):
+            status = "Feasible"
+        else:
+            status = "Infeasible"
+        name = {"sweep": "Split", "nn": "Split(nn)"}.get(self.tour, "Split(tour)") if isinstance(self.tour, str) else "Split(tour)"
+        sol = self._make_solution(
+            routes, total_distance, status=status, runtime_s=runtime, solver_name=name,
+            meta={"split": {
+                "tour": self.tour if isinstance(self.tour, str) else "given",
+                "num_routes": len(routes),
+                "fleet_limited": fleet_limited,
+                "skipped_customers": skipped,
+                "max_route_customers": self.max_route_customers,
+            }},
+        )
+        # 車両数に収まる分割がなければ実行不可能として返す
+        sol.is_feasible = status == "Feasible"
+        self.solution = sol
+        return sol
+
+    def print_solution(self):
+        if self.solution is None:
+            print("解がありません。")
+            return
+        print(f"=== VRP解（{self.solution.solver_name}） ===")
+        print(f"総移動距離: {self.solution.total_distance:.2f}")
+        print(f"使用車両数: {self.solution.num_vehicles_used()}")
+        print("\n各車両のルート:")
+        for k, route in self.solution.routes.items():
+            route_str = " -> ".join(map(str, route))
+            print(f"車両{k}: {route_str}")
+
+    # ===== 内部ヘルパー =====
+    def _giant_tour(self) -> np.ndarray:
+        """全顧客を1度ずつ通る顧客IDの列"""
+        if not isinstance(self.tour, str):
+            return np.asarray(self.tour, dtype=np.int64)
+        if self.tour == "sweep":
+            return SweepSolver(self.instance)._angle_order()
+        if self.tour == "nn":
+            engine = NearestNeighborEngine(self.distances, self.demands, k=self.neighbor_k)
+            order = []
+            current = 0
+            while True:
+                current = engine.nearest_feasible(current, math.inf)
+                if current is None:
+                    break
+                engine.visit(current)
+                order.append(current)
+            return np.asarray(order, dtype=np.int64)
+        raise ValueError(f"未知のツアー: {self.tour!r}（'sweep' / 'nn' / 顧客IDの列）")
+
+    def _split(self, tour: np.ndarray) -> tuple[list[int], bool]:
+        """ツアーの区切り位置（各ルートの最後の位置 + 1 の列）と、車両数で制限したかを返す"""
+        n = len(tour)
+        if n == 0:
+            return [], False
+        arrays = self._prefix_arrays(tour)
+        _, pred = _split_layer(arrays, None, n, self.capacity, self.max_route_customers)
+        cuts = _cuts_from_pred([pred], n)
+        if len(cuts) <= len(self.vehicles):
+            return cuts, False
+
+        # 車両数を超えた: ルート数 k ごとに「k 本で先頭 t 人を回る最小距離」を求め、k <= 車両数 で最良を採る
+        preds = []
+        prev = [0.0] + [math.inf] * n
+        best_k, best_cost = None, math.inf
+        for k in range(1, len(self.vehicles) + 1):
+            prev, pred = _split_layer(arrays, prev, n, self.capacity, self.max_route_customers)
+            preds.append(pred)
+            if prev[n] < best_cost:
+                best_k, best_cost = k, prev[n]
+        if best_k is None:
+            # 車両数では回りきれない: 制限なしの分割を返す（Infeasible）
+            return cuts, True
+        return _cuts_from_pred(preds[:best_k], n), True
+
+    def _prefix_arrays(self, tour: np.ndarray) -> tuple[list[float], list[float], list[float], list[float]]:
+        """1始まりの累積距離 D・累積需要 Q・デポからの距離・デポへの距離（Python の list）"""
+        d = self.distances
+        inner = np.asarray(d[tour[:-1], tour[1:]], dtype=np.float64)
+        dist = np.zeros(len(tour) + 1)
+        dist[2:] = np.cumsum(inner)
+        load = np.zeros(len(tour) + 1)
+        load[1:] = np.cumsum(self.demands[tour])
+        from_depot = np.zeros(len(tour) + 1)
+        from_depot[1:] = np.asarray(d[0, tour], dtype=np.float64)
+        to_depot = np.zeros(len(tour) + 1)
+        to_depot[1:] = np.asarray(d[tour, 0], dtype=np.float64)
+        return dist.tolist(), load.tolist(), from_depot.tolist(), to_depot.tolist()
+
+    def _build_routes(self, tour: np.ndarray, cuts: list[int]) -> tuple[dict[int, list[int]], float]:
+        routes: dict[int, list[int]] = {}
+        total_distance = 0.0
+        d = self.distances
+        ids = self._route_ids(len(cuts))
+        begin = 0
+        for vid, end in zip(ids, cuts):
+            route = [0] + tour[begin:end].tolist() + [0]
+            total_distance += float(np.asarray(d[route[:-1], route[1:]], dtype=np.float64).sum())
+            routes[vid] = route
+            begin = end
+        return routes, total_distance
+
+    def _route_ids(self, count: int) -> list[int]:
+        """ルートに割り当てる車両ID（車両数を超えた分は続きの番号）"""
+        ids = self.vehicle_ids[:count]
+        next_id = max(self.vehicle_ids, default=0) + 1
+        while len(ids) < count:
+            ids.append(next_id)
+            next_id += 1
+        return ids
+
+
+# ===== Split（両端キュー） =====
+def _split_layer(
+    arrays: tuple[list[float], list[float], list[float], list[float]],
+    prev: list[float] | None,
+    n: int,
+    capacity: float,
+    max_customers: int | None,
+) -> tuple[list[float], list[int]]:
+    """Split の1層: cur[t] = min_i prev[i] + (ツアーの i+1..t 番目を1ルートで回る距離)
+
+    prev=None ならルート数を制限しない（prev は cur 自身）。ルート (i+1..t) の距離は
+    key(i) + D[t] + to_depot[t]（key(i) = prev[i] + from_depot[i+1] - D[i+1]）と書けるので、
+    t ごとに「容量に収まる i のうち key 最小」を両端キューで保つ:
+    - 後ろ: key が大きく、先に容量を外れる候補は以後も選ばれないので捨てる
+    - 前: 容量（と顧客数の上限）を外れた候補を捨てる
+    """
+    D, Q, from_depot, to_depot = arrays
+    cur = [0.0] + [math.inf] * n
+    if prev is None:
+        prev = cur
+    pred = [-1] * (n + 1)
+    eps = 1e-9
+
+    def key(i):
+        return prev[i] + from_depot[i + 1] - D[i + 1]
+
+    dq: deque[int] = deque()
+    for t in range(1, n + 1):
+        i = t - 1
+        if prev[i] < math.inf:
+            ki = key(i)
+            back = dq[-1] if dq else -1
+            # 同じ積載で key も小さい候補が後ろにあれば i は不要（顧客数に上限があると i の方が長く残るので除かない）
+            if not (back >= 0 and max_customers is None and Q[back] == Q[i] and key(back) <= ki):
+                while dq and key(dq[-1]) >= ki:
+                    dq.pop()
+                dq.append(i)
+        while dq and (Q[t] - Q[dq[0]] > capacity + eps or (max_customers is not None and t - dq[0] > max_customers)):
+            dq.popleft()
+        if dq:
+            front = dq[0]
+            cur[t] = key(front) + D[t] + to_depot[t]
+            pred[t] = front
+    return cur, pred
+
+
+def _cuts_from_pred(preds: list[list[int]], n: int) -> list[int]:
+    """各層の pred を末尾から辿って区切り位置（昇順）を返す（層が1つならその層だけを繰り返し辿る）"""
+    cuts = []
+    t = n
+    layer = len(preds) - 1
+    while t > 0:
+        cuts.append(t)
+        t = preds[max(layer, 0)][t]
+        layer -= 1
+    return cuts[::-1]
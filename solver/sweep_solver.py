@@ -1,32 +1,70 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+# 3.10 では as_completed のタイムアウトは組み込みの TimeoutError ではない
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from .vrp_solver import VRPSolver
-from instance import Customer
+from .neighbors import NearestNeighborEngine
+from instance import Instance, Customer
 import math
 import time
 
+import numpy as np
+
+# 1バッチで同時に評価する (回転数 x 顧客数) の要素数の上限
+_BATCH_ELEMENTS = 1 << 22
+
+# 並列評価のワーカー側で保持する距離行列と需要
+_worker_arrays: tuple[np.ndarray, np.ndarray] | None = None
+
 
 class SweepSolver(VRPSolver):
-    """Sweep法でVRPを解くクラス"""
+    """Sweep法でVRPを解くクラス
+
+    multi_start: 開始角度を回転させ（両方向）、総距離が最小の掃引を採用する
+    start_step: 多始点で試す開始位置の間隔（1 なら全顧客を開始点にする）
+    time_limit: 多始点の探索時間の上限（秒）。超えたらそれまでの最良を返す
+    workers: 多始点の評価に使うプロセス数（None/1 なら同一プロセス）
+    """
+
+    def __init__(
+        self,
+        instance: Instance,
+        *,
+        multi_start: bool = False,
+        start_step: int = 1,
+        time_limit: float | None = None,
+        workers: int | None = None,
+    ):
+        super().__init__(instance)
+        self.multi_start = multi_start
+        self.start_step = max(1, start_step)
+        self.time_limit = time_limit
+        self.workers = workers
+
     def solve(self):
         """Sweep法でVRPを解く（角度順に1顧客ずつ車両に割当、容量超で次車両）"""
-        start = time.time()
+        start = self._begin_solve()
 
-        sorted_customers = self._sorted_customers_by_angle()
-        routes, total_distance = self._build_routes_from_sorted(sorted_customers)
+        with self.phase("angles"):
+            order = self._angle_order()
+        meta = {}
+        if self.multi_start and len(order) > 1:
+            with self.phase("multi_start"):
+                order, meta = self._best_rotation(order, start)
+            self.instrumentation.count("rotations_evaluated", meta["multi_start"]["rotations_evaluated"])
+        sorted_customers = [self.customers_with_depot[cid] for cid in order]
+        with self.phase("build_routes"):
+            routes, total_distance = self._build_routes_from_sorted(sorted_customers)
 
-        runtime = time.time() - start
+        runtime = time.perf_counter() - start
         status = "Feasible" if len(sorted_customers) == sum(len(r) - 2 for r in routes.values()) else "Partial"
-        sol = self._make_solution(routes, total_distance, status=status, runtime_s=runtime, solver_name="Sweep")
+        name = "Sweep(multi)" if self.multi_start else "Sweep"
+        sol = self._make_solution(routes, total_distance, status=status, runtime_s=runtime, solver_name=name, meta=meta)
         self.solution = sol
         return sol
     
     def _demand(self, cid: int) -> float:
-        # 顧客ID -> 需要
-        # Vは [depot(0)] + customers(1..N) なので、idに一致するものを引く
-        # 規模が小さいため線形検索で充分
-        for c in self.customers_with_depot:
-            if c.id == cid:
-                return c.demand
-        return 0.0
+        # 顧客ID -> 需要（需要配列を ID で直接引く）
+        return float(self.demands[cid])
     
     def print_solution(self):
         if self.solution is None:
@@ -45,11 +83,84 @@ class SweepSolver(VRPSolver):
         return math.atan2(customer.y - self.instance.depot.y, customer.x - self.instance.depot.x) % (2 * math.pi)
 
     # ===== 内部ヘルパー =====
+    def _angle_order(self) -> np.ndarray:
+        """顧客ID（デポ除く）をデポからの角度の昇順に並べた配列（インスタンスは変更しない）"""
+        xs, ys = self.instance.xs, self.instance.ys
+        angles = np.arctan2(ys[1:] - ys[0], xs[1:] - xs[0]) % (2 * np.pi)
+        return np.argsort(angles, kind="stable") + 1
+
     def _sorted_customers_by_angle(self) -> list[Customer]:
-        """顧客のみを角度で昇順にソートして返す"""
-        customers = self.customers_with_depot
-        customers.sort(key=lambda c: self.compute_angle_from_depot(c))
-        return customers
+        """顧客のみを角度で昇順に並べた新しいリストを返す"""
+        return [self.customers_with_depot[cid] for cid in self._angle_order()]
+
+    def _best_rotation(self, order: np.ndarray, start: float) -> tuple[np.ndarray, dict]:
+        """開始位置と方向を変えた掃引をバッチで評価し、最良の顧客順を返す
+
+        評価は配列演算で行い（_evaluate_rotations）、採用した順序だけを
+        _build_routes_from_sorted で組み直す。
+        """
+        n = len(order)
+        jobs = [
+            (reverse, starts[i:i + self._batch_size(n)])
+            for reverse in (False, True)
+            for starts in [np.arange(0, n, self.start_step)]
+            for i in range(0, len(starts), self._batch_size(n))
+        ]
+        deadline = None if self.time_limit is None else start + self.time_limit
+        args = (order, float(self.capacity), len(self.vehicles))
+
+        best = (True, math.inf, 0, False)  # (容量・台数違反, 総距離, 開始位置, 逆回り)
+        evaluated = 0
+        timed_out = False
+
+        def consume(reverse, starts, infeasible, costs):
+            nonlocal best, evaluated
+            evaluated += len(starts)
+            i = int(np.lexsort((costs, infeasible))[0])
+            candidate = (bool(infeasible[i]), float(costs[i]), int(starts[i]), reverse)
+            if candidate[:2] < best[:2]:
+                best = candidate
+
+        if self.workers and self.workers > 1 and len(jobs) > 1:
+            # with 文は終了時に実行中のジョブを待つので使わない（時間切れなら待たずに返す）
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_sweep_worker,
+                initargs=(self.distances, self.demands),
+            )
+            try:
+                futures = {
+                    executor.submit(_evaluate_in_worker, *args, starts, reverse): (reverse, starts)
+                    for reverse, starts in jobs
+                }
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                for future in as_completed(futures, timeout=timeout):
+                    consume(*futures[future], *future.result())
+            except FuturesTimeoutError:
+                timed_out = True
+            finally:
+                executor.shutdown(wait=not timed_out, cancel_futures=True)
+        else:
+            for reverse, starts in jobs:
+                if deadline is not None and time.perf_counter() > deadline and evaluated:
+                    timed_out = True
+                    break
+                consume(reverse, starts, *_evaluate_rotations(self.distances, self.demands, *args, starts, reverse))
+
+        _, cost, best_start, reverse = best
+        meta = {
+            "multi_start": {
+                "rotations_evaluated": evaluated,
+                "rotations_total": sum(len(s) for _, s in jobs),
+                "best_start": best_start,
+                "direction": "cw" if reverse else "ccw",
+                "timed_out": timed_out,
+            }
+        }
+        return _rotated(order, best_start, reverse), meta
+
+    @staticmethod
+    def _batch_size(n: int) -> int:
+        return max(1, _BATCH_ELEMENTS // n)
 
     def _build_routes_from_sorted(self, sorted_customers: list[Customer]) -> tuple[dict[int, list[int]], float]:
         """角度順顧客列から容量制約を守って順に割当て、ルートと距離を返す"""
@@ -89,43 +200,134 @@ class SweepSolver(VRPSolver):
 
         return routes, total_distance
 
+
+# ===== 多始点Sweepの一括評価 =====
+def _rotated(order: np.ndarray, start: int, reverse: bool) -> np.ndarray:
+    """角度順を start から（reverse なら逆回りに）読んだ顧客順"""
+    seq = order[::-1] if reverse else order
+    if reverse:
+        start = len(order) - 1 - start
+    return np.roll(seq, -start)
+
+
+def _evaluate_rotations(
+    distances: np.ndarray,
+    demands: np.ndarray,
+    order: np.ndarray,
+    capacity: float,
+    num_vehicles: int,
+    starts: np.ndarray,
+    reverse: bool,
+) -> tuple[np.ndarray, np.ndarray]:
+    """複数の開始位置の掃引を同時に評価し、(台数・容量違反フラグ, 総距離) を返す
+
+    各行（開始位置）の累積需要に行ごとのオフセットを足して1本の単調列にし、
+    searchsorted で全行のルートの区切りを同時に求める（ルート数ぶんの反復）。
+    """
+    b, n = len(starts), len(order)
+    seq = order[::-1] if reverse else order
+    first = (n - 1 - starts) if reverse else starts
+    S = seq[(first[:, None] + np.arange(n)) % n]  # (b, n) 顧客ID
+
+    q = demands[S]
+    cum = np.cumsum(q, axis=1)
+    stride = float(cum[:, -1].max()) + capacity + 1.0
+    flat = (cum + stride * np.arange(b)[:, None]).ravel()
+
+    # 各行のルート開始位置から、容量内に収まる最後の位置までを1ルートとする
+    head = np.zeros(b, dtype=np.int64)
+    boundary = np.zeros((b, n), dtype=bool)  # boundary[:, j]: j がルートの最後
+    routes_used = np.zeros(b, dtype=np.int64)
+    stuck = np.zeros(b, dtype=bool)
+    rows = np.arange(b)
+    active = head < n
+    while active.any():
+        r = rows[active]
+        base = np.where(head[r] > 0, cum[r, head[r] - 1], 0.0)
+        limit = base + capacity + stride * r
+        end = np.searchsorted(flat, limit, side="right") - r * n  # 次ルートの開始位置
+        end = np.minimum(end, n)
+        blocked = end <= head[r]  # 1人も載せられない（需要 > 容量）
+        stuck[r[blocked]] = True
+        ok = r[~blocked]
+        boundary[ok, end[~blocked] - 1] = True
+        routes_used[ok] += 1
+        head[ok] = end[~blocked]
+        head[r[blocked]] = n
+        active = head < n
+
+    d = distances
+    inner = np.asarray(d[S[:, :-1], S[:, 1:]], dtype=np.float64)
+    via_depot = np.asarray(d[S[:, :-1], 0], dtype=np.float64) + np.asarray(d[0, S[:, 1:]], dtype=np.float64)
+    costs = (
+        np.asarray(d[0, S[:, 0]], dtype=np.float64)
+        + np.asarray(d[S[:, -1], 0], dtype=np.float64)
+        + np.where(boundary[:, :-1], via_depot, inner).sum(axis=1)
+    )
+    infeasible = stuck | (routes_used > num_vehicles)
+    return infeasible, costs
+
+
+def _init_sweep_worker(distances: np.ndarray, demands: np.ndarray):
+    global _worker_arrays
+    _worker_arrays = (distances, demands)
+
+
+def _evaluate_in_worker(order, capacity, num_vehicles, starts, reverse):
+    distances, demands = _worker_arrays
+    return _evaluate_rotations(distances, demands, order, capacity, num_vehicles, starts, reverse)
+
+
 class SweepNearestSolver(SweepSolver):
-    """Sweep法を角度起点 + 最近傍で改良"""
+    """Sweep法を角度起点 + 最近傍で改良
+
+    neighbor_k: 最近傍探索で事前計算する候補リストの長さ
+    """
+
+    def __init__(self, instance: Instance, neighbor_k: int = 32):
+        super().__init__(instance)
+        self.neighbor_k = neighbor_k
 
     def solve(self):
         """Sweep法でVRPを解く（角度順に1顧客ずつ車両に割当、容量超で次車両）最近傍で改良"""
-        start = time.time()
+        start = self._begin_solve()
 
-        sorted_customers = self._sorted_customers_by_angle()
-        routes, total_distance = self._build_routes_from_sorted(sorted_customers)
+        with self.phase("angles"):
+            sorted_customers = self._sorted_customers_by_angle()
+        with self.phase("build_routes"):
+            routes, total_distance = self._build_routes_from_sorted(sorted_customers)
+        if self.instrumentation.enabled:
+            self.instrumentation.count("candidate_list_hits", self._engine.stats["list_hits"])
+            self.instrumentation.count("fallback_scans", self._engine.stats["fallback_scans"])
 
-        runtime = time.time() - start
+        runtime = time.perf_counter() - start
         status = "Feasible" if len(sorted_customers) == sum(len(r) - 2 for r in routes.values()) else "Partial"
-        sol = self._make_solution(routes, total_distance, status=status, runtime_s=runtime, solver_name="SweepNearest")
+        sol = self._make_solution(
+            routes, total_distance, status=status, runtime_s=runtime, solver_name="SweepNearest",
+            meta={"neighbor_k": self.neighbor_k, **self._engine.stats},
+        )
         self.solution = sol
         return sol
-    # 角度順の候補列は顧客のみ（デポ除外）
-    def _sorted_customers_by_angle(self) -> list[Customer]:
-        return sorted(self.customers_with_depot, key=lambda c: self.compute_angle_from_depot(c))
 
     def _build_routes_from_sorted(self, sorted_customers: list[Customer]) -> tuple[dict[int, list[int]], float]:
         """各車両: 開始は角度最小の未訪問、以降は最近傍で容量限界まで追加"""
         routes: dict[int, list[int]] = {}
         total_distance: float = 0.0
 
-        # 未訪問集合（ID）と補助マップ
-        unvisited: set[int] = {c.id for c in self.customers_with_depot}
-        angle_of: dict[int, float] = {c.id: self.compute_angle_from_depot(c) for c in self.customers_with_depot}
+        # 未訪問管理は最近傍エンジンに任せ、開始点は角度順の列を先頭から読む
+        self._engine = engine = NearestNeighborEngine(self.distances, self.demands, k=self.neighbor_k)
+        angle_order: list[int] = [c.id for c in sorted_customers]
+        self._angle_head = 0
 
         vehicle_index = 0
-        while unvisited and vehicle_index < len(self.vehicles):
+        while engine.remaining and vehicle_index < len(self.vehicles):
             v = self.vehicles[vehicle_index]
             capacity_left = v.capacity
             current_id = 0
             route: list[int] = [0]
 
             # ルート開始: 角度が最小の未訪問を選ぶ（容量に入るもの）
-            start_id = self._select_start_customer(unvisited, angle_of, capacity_left)
+            start_id = self._select_start_customer(engine, angle_order, capacity_left)
             if start_id is None:
                 # どれも容量に入らない
                 routes[v.id] = [0, 0]
@@ -137,18 +339,18 @@ class SweepNearestSolver(SweepSolver):
             total_distance += self.distances[current_id, start_id]
             capacity_left -= self._demand(start_id)
             current_id = start_id
-            unvisited.remove(start_id)
+            engine.visit(start_id)
 
             # 以降は最近傍で埋める
             while True:
-                next_id = self._select_nearest_feasible(current_id, unvisited, capacity_left)
+                next_id = self._select_nearest_feasible(engine, current_id, capacity_left)
                 if next_id is None:
                     break
                 route.append(next_id)
                 total_distance += self.distances[current_id, next_id]
                 capacity_left -= self._demand(next_id)
                 current_id = next_id
-                unvisited.remove(next_id)
+                engine.visit(next_id)
 
             # クローズ
             total_distance += self.distances[current_id, 0]
@@ -159,16 +361,18 @@ class SweepNearestSolver(SweepSolver):
         return routes, total_distance
 
     # ===== NN用の補助関数 =====
-    def _select_start_customer(self, unvisited: set[int], angle_of: dict[int, float], capacity_left: float) -> int | None:
+    def _select_start_customer(self, engine: NearestNeighborEngine, angle_order: list[int], capacity_left: float) -> int | None:
         """未訪問のうち角度が最小で容量に入る顧客IDを返す"""
-        candidates = [cid for cid in unvisited if self._demand(cid) <= capacity_left]
-        if not candidates:
-            return None
-        return min(candidates, key=lambda cid: angle_of[cid])
+        # 先頭の訪問済みを読み飛ばす（遅延削除）
+        head = self._angle_head
+        while head < len(angle_order) and not engine.is_unvisited(angle_order[head]):
+            head += 1
+        self._angle_head = head
+        for cid in angle_order[head:]:
+            if engine.is_unvisited(cid) and self.demands[cid] <= capacity_left:
+                return cid
+        return None
 
-    def _select_nearest_feasible(self, current_id: int, unvisited: set[int], capacity_left: float) -> int | None:
+    def _select_nearest_feasible(self, engine: NearestNeighborEngine, current_id: int, capacity_left: float) -> int | None:
         """現在位置から最近傍で容量に入る未訪問の顧客IDを返す"""
-        candidates = [cid for cid in unvisited if self._demand(cid) <= capacity_left]
-        if not candidates:
-            return None
-        return min(candidates, key=lambda cid: self.distances[current_id, cid])
\ No newline at end of file
+        return engine.nearest_feasible(current_id, capacity_left)
@@ -0,0 +1,121 @@
+from datetime import timedelta
+import math
+import time
+
+import numpy as np
+
+from .vrp_solver import VRPSolver
+from instance import Instance
+
+try:
+    import vroom
+except ImportError:  # pyvroom が入っていない環境
+    vroom = None
+
+# VROOM の距離行列は uint32
+_MAX_MATRIX_VALUE = 2**32 - 1
+
+
+class VroomSolver(VRPSolver):
+    """VROOM（pyvroom）で解くソルバー（同一プロセス内・マルチスレッド）
+
+    - 距離行列: Instance.distances を distance_scale 倍して整数に丸めたもの（VROOM のコストは整数）
+    - 需要・容量: demand_scale 倍して整数にする。需要は切り上げ・容量は切り捨てにするので、
+      VROOM で容量内なら元の値でも必ず容量内になる
+    - exploration_level: 探索の広さ（1〜5。大きいほど遅く良い解）
+    - threads: VROOM が使うスレッド数
+    - time_limit: 探索時間の上限（秒、None なら制限なし）
+
+    返す Solution の総距離は元の距離行列で計算し直したもの。割り当てられなかった顧客があれば Partial。
+    """
+
+    def __init__(
+        self,
+        instance: Instance,
+        *,
+        exploration_level: int = 5,
+        threads: int = 4,
+        time_limit: float | None = None,
+        distance_scale: float = 1000.0,
+        demand_scale: float = 1000.0,
+    ):
+        if vroom is None:
+            raise ImportError("VroomSolver には pyvroom が必要です（pip install pyvroom）")
+        super().__init__(instance)
+        self.exploration_level = exploration_level
+        self.threads = threads
+        self.time_limit = time_limit
+        self.distance_scale = distance_scale
+        self.demand_scale = demand_scale
+
+    def solve(self):
+        start = self._begin_solve()
+
+        with self.phase("build_input"):
+            problem = self._build_input()
+        with self.phase("vroom"):
+            timeout = None if self.time_limit is None else timedelta(seconds=self.time_limit)
+            result = problem.solve(exploration_level=self.exploration_level, nb_threads=self.threads, timeout=timeout)
+        with self.phase("extract_routes"):
+            output = result.to_dict()
+            routes, total_distance = self._extract_routes(output)
+
+        unassigned = sorted(int(job["id"]) for job in output["unassigned"])
+        runtime = time.perf_counter() - start
+        status = "Partial" if unassigned else "Feasible"
+        summary = output["summary"]
+        sol = self._make_solution(
+            routes, total_distance, status=status, runtime_s=runtime, solver_name="VROOM",
+            meta={"vroom": {
+                "exploration_level": self.exploration_level,
+                "threads": self.threads,
+                "scaled_cost": int(summary["cost"]),
+                "unassigned": unassigned,
+                "computing_times_ms": summary.get("computing_times", {}),
+            }},
+        )
+        self.solution = sol
+        return sol
+
+    def print_solution(self):
+        if self.solution is None:
+            print("解がありません。")
+            return
+        print("=== VRP解（VROOM） ===")
+        print(f"総移動距離: {self.solution.total_distance:.2f}")
+        print(f"使用車両数: {self.solution.num_vehicles_used()}")
+        print("\n各車両のルート:")
+        for k, route in self.solution.routes.items():
+            route_str = " -> ".join(map(str, route))
+            print(f"車両{k}: {route_str}")
+
+    # ===== 内部ヘルパー =====
+    def _build_input(self) -> "vroom.Input":
+        """距離行列・車両・顧客（ジョブ）を VROOM の入力にする（地点の index = 顧客ID、0 はデポ）"""
+        problem = vroom.Input()
+        problem.set_durations_matrix("car", self._scaled_matrix())
+        for v in self.vehicles:
+            capacity = math.floor(v.capacity * self.demand_scale + 1e-9)
+            problem.add_vehicle(vroom.Vehicle(id=v.id, start=0, end=0, capacity=[capacity]))
+        demands = np.ceil(self.demands * self.demand_scale - 1e-9).astype(np.int64).tolist()
+        for c in self.customers:
+            problem.add_job(vroom.Job(id=c.id, location=c.id, delivery=[demands[c.id]]))
+        return problem
+
+    def _scaled_matrix(self) -> np.ndarray:
+        scaled = np.rint(np.asarray(self.distances, dtype=np.float64) * self.distance_scale)
+        if scaled.max(initial=0.0) > _MAX_MATRIX_VALUE:
+            raise ValueError(
+                f"distance_scale={self.distance_scale} では距離が VROOM の整数範囲（uint32）を超えます。小さくしてください"
+            )
+        return scaled.astype(np.uint32)
+
+    def _extract_routes(self, output: dict) -> tuple[dict[int, list[int]], float]:
+        """VROOM の出力（to_dict）を 車両ID -> [0, 顧客..., 0] と元の距離での総距離にする"""
+        routes: dict[int, list[int]] = {}
+        total_distance = 0.0
+        for r in output["routes"]:
+            route = [0] + [int(step["id"]) for step in r["steps"] if step["type"] == "job"] + [0]
+            routes[int(r["vehicle"])] = route
+            total_distance += float(np.asarray(self.distances[route[:-1], route[1:]], dtype=np.float64).sum())
+        return routes, total_distance
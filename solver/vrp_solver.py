@@ -1,12 +1,24 @@
+import time
+from typing import Callable, Iterator
+
+from .instrumentation import DISABLED, Instrumentation
 from instance import Instance, Customer, Vehicle
-from solution import Solution
+from solution import Solution, solution_rank
 
 class VRPSolver:
-    """VRPを解く基底クラス"""
+    """VRPを解く基底クラス
+
+    instrument() で計測を有効にすると、solve() ごとのフェーズ時間・カウンタ・プロファイルが
+    Solution.meta["instrumentation"] に入る（既定は無効で、計測のコストはかからない）。
+
+    時間制限付きで途中の解も受け取りたい場合は solve_anytime() / iter_solutions() を使う。
+    """
+    instrumentation = DISABLED
     def __init__(self, instance: Instance):
         self.instance = instance
         self.customers_with_depot: list[Customer] = instance.customers_with_depot  # デポを含む全地点
         self.customers: list[Customer] = instance.customers  # 顧客のみ
+        self.demands = instance.demands  # 需要配列（index = 顧客ID、0 はデポ）
         self.distances = instance.distances  # NumPy距離行列 (shape: (N+1, N+1))
         self.capacity: int = instance.capacity  # 車両容量
         self.vehicles: list[Vehicle] = instance.vehicles  # 車両オブジェクトのリスト
@@ -17,8 +29,61 @@ class VRPSolver:
         """VRPを解く(抽象メソッド)"""
         pass
 
-    def _make_solution(self, routes: dict[int, list[int]], total_distance: float, *, status: str, runtime_s: float, solver_name: str) -> Solution:
-        """共通のSolution組み立てヘルパー"""
+    def iter_solutions(self, time_limit: float | None = None) -> Iterator[Solution]:
+        """解を見つけた順に返す（改善しない解が混じってもよい）
+
+        既定は solve() の結果を1つ返すだけ。途中解を出せるソルバー（局所探索・MIPなど）は上書きする。
+        time_limit はあくまで目安で、厳密な打ち切りは solve_anytime() が行う。
+        """
+        yield self.solve()
+
+    def solve_anytime(
+        self,
+        time_limit: float | None = None,
+        callback: Callable[[Solution], object] | None = None,
+    ) -> Solution | None:
+        """time_limit（秒）までに見つかった最良の解を返す
+
+        iter_solutions() の解のうち、それまでの最良より良いもの（実行可能を優先し総距離が小さい）だけを
+        callback に渡す。callback が True を返すとその時点で打ち切る。解が1つもなければ None。
+        """
+        start = time.perf_counter()
+        best: Solution | None = None
+        solutions = self.iter_solutions(time_limit)
+        try:
+            for sol in solutions:
+                if best is None or solution_rank(sol) < solution_rank(best):
+                    best = sol
+                    best.meta["anytime_elapsed_s"] = time.perf_counter() - start
+                    if callback is not None and callback(best) is True:
+                        break
+                if time_limit is not None and time.perf_counter() - start >= time_limit:
+                    break
+        finally:
+            solutions.close()
+        self.solution = best
+        return best
+
+    def instrument(self, profile: str | None = None, *, top: int = 20) -> "VRPSolver":
+        """計測を有効にする（profile: None / "cprofile" / "tracemalloc"）。self を返す"""
+        self.instrumentation = Instrumentation(profile, top=top)
+        return self
+
+    def phase(self, name: str):
+        """名前付きのフェーズ時間を測るコンテキスト（無効時は何もしない）"""
+        return self.instrumentation.phase(name)
+
+    def _begin_solve(self) -> float:
+        """solve() の開始処理: 計測を始め、開始時刻（perf_counter）を返す"""
+        self.instrumentation.begin()
+        return time.perf_counter()
+
+    def _make_solution(self, routes: dict[int, list[int]], total_distance: float, *, status: str, runtime_s: float, solver_name: str, meta: dict | None = None) -> Solution:
+        """共通のSolution組み立てヘルパー（計測が有効なら結果を meta["instrumentation"] に入れる）"""
+        meta = dict(meta) if meta else {}
+        if self.instrumentation.enabled:
+            self.instrumentation.end()
+            meta["instrumentation"] = self.instrumentation.report()
         return Solution(
             routes=routes,
             objective_value=total_distance,
@@ -26,4 +91,5 @@ class VRPSolver:
             status=status,
             runtime_s=runtime_s,
             solver_name=solver_name,
+            meta=meta,
         )
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+
+def route_length(distances, route) -> float:
+    return float(sum(distances[a, b] for a, b in zip(route, route[1:])))
+
+
+def assert_valid_solution(solution, instance, *, check_capacity: bool = True):
+    """全顧客をちょうど1回訪問し、容量を守り、total_distance が routes から計算し直した値と一致する"""
+    visited = []
+    total = 0.0
+    for route in solution.routes.values():
+        assert route[0] == 0 and route[-1] == 0
+        customers = [c for c in route if c != 0]
+        visited.extend(customers)
+        if check_capacity:
+            assert float(np.sum(instance.demands[customers])) <= instance.capacity + 1e-9
+        total += route_length(instance.distances, route)
+    assert sorted(visited) == list(range(1, instance.num_customers + 1))
+    assert solution.total_distance == pytest.approx(total, rel=1e-9, abs=1e-9)
@@ -0,0 +1,52 @@
+import csv
+import json
+
+import pytest
+
+from batch import run_batch
+
+
+def _write_specs(path, n):
+    with open(path, "w") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": f"i{i}", "num_customers": 8, "num_vehicles": 4, "capacity": 20, "seed": i}) + "\n")
+
+
+def _read_ids(path):
+    with open(path, newline="") as f:
+        if str(path).endswith(".csv"):
+            return [row["id"] for row in csv.DictReader(f)]
+        return [json.loads(line)["id"] for line in f]
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".csv"])
+def test_resume_skips_done_and_redoes_truncated_line(tmp_path, suffix):
+    specs = tmp_path / "specs.jsonl"
+    out = tmp_path / f"out{suffix}"
+    _write_specs(specs, 4)
+    counts = run_batch(str(specs), str(out), ["NN"], workers=1)
+    assert counts["solved"] == 4
+
+    # 最終行の途中で落ちた状態を作る
+    data = out.read_bytes()
+    last = data.rstrip(b"\n").rfind(b"\n") + 1
+    truncated_id = _read_ids(out)[-1]
+    out.write_bytes(data[:last + 10])
+
+    counts = run_batch(str(specs), str(out), ["NN"], workers=1)
+    assert counts == {**counts, "solved": 1, "skipped": 3, "errors": 0}
+    ids = _read_ids(out)
+    assert sorted(ids) == [f"i{i}" for i in range(4)]
+    assert ids[-1] == truncated_id
+    assert out.read_bytes().endswith(b"\n")
+
+
+def test_resume_is_noop_when_complete(tmp_path):
+    specs = tmp_path / "specs.jsonl"
+    out = tmp_path / "out.jsonl"
+    _write_specs(specs, 3)
+    run_batch(str(specs), str(out), ["NN", "LS"], workers=1)
+    before = out.read_bytes()
+    counts = run_batch(str(specs), str(out), ["NN", "LS"], workers=1)
+    assert counts["solved"] == 0 and counts["skipped"] == 3
+    assert out.read_bytes() == before
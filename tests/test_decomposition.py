@@ -0,0 +1,22 @@
+import pytest
+
+from instance import Instance
+from solver import DecompositionSolver
+
+
+@pytest.mark.parametrize("method", DecompositionSolver.METHODS)
+def test_empty_instance(method):
+    solution = DecompositionSolver(Instance(0, 3, 10), method=method).solve()
+    assert solution.is_feasible
+    assert solution.total_distance == 0.0
+    assert all(route == [0, 0] for route in solution.routes.values())
+    assert solution.meta["num_clusters"] == 0
+
+
+@pytest.mark.parametrize("method", DecompositionSolver.METHODS)
+def test_visits_every_customer_once(method):
+    inst = Instance(60, 20, 20, seed=5)
+    solution = DecompositionSolver(inst, method=method, cluster_size=20, workers=1).solve()
+    visited = sorted(c for r in solution.routes.values() for c in r if c != 0)
+    assert visited == list(range(1, 61))
+    assert solution.meta["num_clusters"] == 3
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from distances import KNNGraph, LazyDistances
+from instance import build_distance_matrix
+from solver.neighbors import k_nearest_neighbors
+
+
+def _points(kind: str, n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    if kind == "uniform":
+        pts = rng.uniform(-100, 100, (n, 2))
+    elif kind == "clustered":
+        centers = rng.uniform(-1000, 1000, (5, 2))
+        pts = centers[rng.integers(0, 5, n)] + rng.normal(0, 1.0, (n, 2))
+    elif kind == "grid":
+        pts = rng.integers(0, 6, (n, 2)).astype(np.float64)  # 重複点と同距離が多い
+    pts[0] = 0.0
+    return pts[:, 0].copy(), pts[:, 1].copy()
+
+
+def _argsort_knn(matrix: np.ndarray, k: int):
+    """密な行列から、デポと自分を除いて（距離, ID）の昇順に k 個"""
+    n = len(matrix)
+    ids = np.arange(n)
+    neighbors = np.empty((n, k), dtype=np.int64)
+    for i in range(n):
+        row = matrix[i].copy()
+        row[0] = np.inf
+        row[i] = np.inf
+        neighbors[i] = np.lexsort((ids, row))[:k]
+    return neighbors
+
+
+@pytest.mark.parametrize("kind", ["uniform", "clustered"])
+@pytest.mark.parametrize("k", [1, 5, 16])
+def test_knn_graph_matches_argsort(kind, k):
+    xs, ys = _points(kind, 700)
+    matrix, _ = build_distance_matrix(xs, ys)
+    graph = KNNGraph.from_coordinates(xs, ys, k, leaf_size=32)
+    expected = _argsort_knn(matrix, k)
+    np.testing.assert_array_equal(graph.neighbors, expected)
+    np.testing.assert_allclose(graph.distances, np.take_along_axis(matrix, expected, axis=1))
+
+
+def test_knn_graph_with_ties_keeps_distances_exact():
+    # 同距離の点が多いと ID の選び方は実装次第になりうるが、距離の列は一意に決まる
+    xs, ys = _points("grid", 400, seed=1)
+    matrix, _ = build_distance_matrix(xs, ys)
+    graph = KNNGraph.from_coordinates(xs, ys, 8, leaf_size=16)
+    expected = _argsort_knn(matrix, 8)
+    np.testing.assert_allclose(graph.distances, np.take_along_axis(matrix, expected, axis=1))
+    rows = np.arange(len(xs))[:, None]
+    assert not np.any(graph.neighbors == 0)
+    assert not np.any(graph.neighbors == rows)
+    np.testing.assert_allclose(graph.distances, matrix[rows, graph.neighbors])
+
+
+def test_knn_graph_small_and_degenerate():
+    assert KNNGraph.from_coordinates(np.zeros(2), np.zeros(2), 5).k == 0
+    xs, ys = _points("uniform", 6)
+    graph = KNNGraph.from_coordinates(xs, ys, 10)
+    assert graph.k == 4
+    np.testing.assert_array_equal(graph.neighbors, _argsort_knn(build_distance_matrix(xs, ys)[0], 4))
+
+
+def test_lazy_distances_match_dense():
+    xs, ys = _points("uniform", 300, seed=2)
+    dense, _ = build_distance_matrix(xs, ys)
+    lazy = LazyDistances(xs, ys, tile_size=64, cache_bytes=64 * 64 * 8 * 3)
+    np.testing.assert_array_equal(np.asarray(lazy), dense)
+    np.testing.assert_array_equal(lazy[5], dense[5])
+    np.testing.assert_array_equal(lazy[10:200, 30:250], dense[10:200, 30:250])
+    rows, cols = np.array([1, 7, 299]), np.array([0, 150, 3])
+    np.testing.assert_array_equal(lazy[rows, cols], dense[rows, cols])
+    assert lazy[3, 9] == dense[3, 9]
+    assert lazy.item(3, 9) == dense[3, 9]
+    # 座標から計算する距離でも、近傍リストは密な行列から作ったものと同じ
+    np.testing.assert_array_equal(k_nearest_neighbors(lazy, 12), k_nearest_neighbors(dense, 12))
@@ -0,0 +1,53 @@
+import pytest
+
+from instance import Instance
+from solver import LocalSearch, SweepSolver
+from solver.neighbors import k_nearest_neighbors
+
+from .helpers import route_length
+
+
+def _loaded(instance, solution):
+    ls = LocalSearch(instance)
+    ls._load(solution)
+    ls._neighbors = k_nearest_neighbors(instance.distances, ls.neighbor_k).tolist()
+    return ls
+
+
+def _cost(ls) -> float:
+    return sum(route_length(ls.distances, r) for r in ls._routes)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("op", LocalSearch.OPERATORS)
+def test_move_delta_matches_recomputed_cost(op, seed):
+    # 列挙した全ての手について、適用後に計算し直した距離の変化が差分評価と一致し、容量も守られる
+    instance = Instance(25, 25, 30, seed=seed)
+    solution = SweepSolver(instance).solve()
+    ls = _loaded(instance, solution)
+    base = _cost(ls)
+    moves = [m for u in range(1, instance.num_customers + 1) for m in getattr(ls, f"_moves_{op}")(u)]
+    assert moves
+    for move in moves:
+        ls._load(solution)
+        ls._apply(move)
+        assert _cost(ls) - base == pytest.approx(move[0], abs=1e-9)
+        customers = sorted(c for r in ls._routes for c in r if c != 0)
+        assert customers == list(range(1, instance.num_customers + 1))
+        for r, route in enumerate(ls._routes):
+            assert route[0] == 0 and route[-1] == 0
+            assert sum(ls._dem[c] for c in route) <= ls._caps[r] + 1e-9
+            # 適用後のキャッシュ（位置・積載量）が経路と一致する
+            assert ls._loads[r] == pytest.approx(sum(ls._dem[c] for c in route))
+            assert all(ls._route_of[c] == r and ls._pos[c] == p for p, c in enumerate(route) if c != 0)
+
+
+@pytest.mark.parametrize("policy", ["first", "best"])
+def test_reported_distance_matches_routes(policy):
+    instance = Instance(40, 20, 25, seed=7)
+    initial = SweepSolver(instance).solve()
+    improved = LocalSearch(instance, policy=policy, seed=3).improve(initial)
+    recomputed = sum(route_length(instance.distances, r) for r in improved.routes.values())
+    assert improved.total_distance == pytest.approx(recomputed)
+    assert improved.meta["local_search"]["improvements"] > 0
+    assert initial.routes == SweepSolver(instance).solve().routes  # 元の解は変更しない
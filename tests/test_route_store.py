@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from instance import Instance
+from solution import RouteStore
+from solver import SweepSolver
+
+from .helpers import route_length
+
+
+def _check(store: RouteStore, instance: Instance):
+    """キャッシュ（積載量・距離・位置）を経路から計算し直した値と比べる"""
+    for r, vid in enumerate(store.route_ids):
+        nodes = store.route(r).tolist()
+        assert store.load(r) == pytest.approx(float(instance.demands[nodes].sum()), abs=1e-9)
+        assert store.cost(r) == pytest.approx(route_length(instance.distances, [0, *nodes, 0]), abs=1e-9)
+        for p, c in enumerate(nodes):
+            assert store.route_index(c) == r and store.position(c) == p and store.vehicle_of(c) == vid
+    visited = sorted(c for r in range(store.num_routes()) for c in store.route(r).tolist())
+    assert visited == sorted(set(range(1, instance.num_customers + 1)) - set(store.unvisited().tolist()))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edits_keep_caches_consistent(seed):
+    rng = np.random.default_rng(seed)
+    instance = Instance(30, 10, 30, seed=seed)
+    store = RouteStore(SweepSolver(instance).solve().routes, instance.distances, instance.demands, slack=1)
+    _check(store, instance)
+    for _ in range(300):
+        op = rng.integers(3)
+        if op == 0 and store.unvisited().size:
+            node = int(rng.choice(store.unvisited()))
+            r = int(rng.integers(store.num_routes()))
+            before = store.cost(r)
+            position = int(rng.integers(store.lengths[r] + 1))
+            delta = store.insertion_delta(node, r, position)
+            store.insert(node, r, position)
+            assert store.cost(r) - before == pytest.approx(delta, abs=1e-9)
+        elif op == 1:
+            visited = np.flatnonzero(store.route_of >= 0)
+            if visited.size:
+                node = int(rng.choice(visited))
+                r = store.route_index(node)
+                before, delta = store.cost(r), store.removal_delta(node)
+                store.remove(node)
+                assert store.cost(r) - before == pytest.approx(delta, abs=1e-9)
+        else:
+            visited = np.flatnonzero(store.route_of >= 0)
+            if visited.size:
+                node = int(rng.choice(visited))
+                r = int(rng.integers(store.num_routes()))
+                length = store.lengths[r] - (1 if store.route_index(node) == r else 0)
+                store.move(node, r, int(rng.integers(length + 1)))
+        _check(store, instance)
+    assert store.total_cost() == pytest.approx(sum(store.cost(r) for r in range(store.num_routes())))
+
+
+def test_to_dict_round_trip_and_set_route():
+    instance = Instance(20, 8, 30, seed=3)
+    solution = SweepSolver(instance).solve()
+    store = solution.attach_store(instance)
+    assert store.to_dict() == solution.routes
+    assert store.total_cost() == pytest.approx(solution.total_distance)
+    assert store.is_feasible(instance.capacity)
+
+    r = next(i for i in range(store.num_routes()) if store.lengths[i] > 2)
+    store.set_route(r, store.route(r)[::-1].copy())
+    _check(store, instance)
+    with pytest.raises(ValueError):
+        store.set_route(r, [1, 2])
+
+    new = store.add_route(99)
+    node = int(store.route(r)[0])
+    store.move(node, new, 0)
+    _check(store, instance)
+    solution.sync_routes()
+    assert solution.routes[99] == [0, node, 0]
+    assert solution.total_distance == pytest.approx(sum(route_length(instance.distances, x) for x in solution.routes.values()))
@@ -0,0 +1,65 @@
+from instance import Instance
+from solution import Solution
+from solution_cache import SolutionCache, instance_fingerprint
+from solver import NNSolver
+
+
+def _instance():
+    return Instance(20, 10, 20, seed=3)
+
+
+def test_hit_after_miss(tmp_path):
+    cache = SolutionCache(str(tmp_path))
+    inst = _instance()
+    first = cache.solve(NNSolver(inst))
+    second = cache.solve(NNSolver(inst))
+    assert first.meta["cache"]["hit"] is False
+    assert second.meta["cache"]["hit"] is True
+    assert second.routes == first.routes
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1 and cache.stats["stores"] == 1
+
+
+def test_same_content_shares_key(tmp_path):
+    cache = SolutionCache(str(tmp_path))
+    cache.solve(NNSolver(_instance()))
+    assert cache.solve(NNSolver(_instance())).meta["cache"]["hit"] is True
+    # パラメータが違えば別のキー
+    assert cache.solve(NNSolver(_instance(), neighbor_k=5)).meta["cache"]["hit"] is False
+
+
+def test_customer_setters_change_key(tmp_path):
+    # Customer.demand で需要を書き換えたら、古い解をヒットとして返さない
+    cache = SolutionCache(str(tmp_path))
+    inst = _instance()
+    old = cache.solve(NNSolver(inst))
+    for c in inst.customers:
+        c.demand = 1
+    new = cache.solve(NNSolver(inst))
+    fresh = NNSolver(inst).solve()
+    assert new.meta["cache"]["hit"] is False
+    assert new.routes == fresh.routes
+    assert new.num_vehicles_used() < old.num_vehicles_used()
+
+
+def test_direct_array_writes_change_key():
+    inst = _instance()
+    before = instance_fingerprint(inst)
+    inst.demands[1] += 1
+    assert instance_fingerprint(inst) != before
+    inst.demands[1] -= 1
+    assert instance_fingerprint(inst) == before
+    inst.customers[0].x += 1
+    assert instance_fingerprint(inst) != before
+
+
+def test_stale_entry_is_a_miss(tmp_path):
+    # キーに対応しない内容（存在しない顧客を訪問する解）は読んでも使わない
+    cache = SolutionCache(str(tmp_path))
+    inst = _instance()
+    solver = NNSolver(inst)
+    bogus = Solution(routes={1: [0, 99, 0]}, objective_value=0.0, total_distance=0.0, status="Feasible", is_feasible=True)
+    cache.put(cache.key(solver), bogus)
+    solution = cache.solve(solver)
+    assert solution.meta["cache"]["hit"] is False
+    assert cache.stats["stale"] == 1 and cache.stats["hits"] == 0
+    assert sorted(c for r in solution.routes.values() for c in r if c != 0) == list(range(1, 21))
@@ -0,0 +1,57 @@
+import pytest
+
+from instance import Instance
+from solver import SOLVERS, LocalSearch, NNSolver, SavingsSolver, SplitSolver, SweepSolver
+
+from .helpers import assert_valid_solution
+
+CONSTRUCTIVE = {
+    "NN": lambda inst: SOLVERS["NN"](inst),
+    "Sweep": lambda inst: SOLVERS["Sweep"](inst),
+    "SweepNearest": lambda inst: SOLVERS["SweepNearest"](inst),
+    "Savings": lambda inst: SavingsSolver(inst),
+    "Savings(k=5)": lambda inst: SavingsSolver(inst, neighbor_k=5),
+    "Split": lambda inst: SplitSolver(inst),
+    "Split(nn)": lambda inst: SplitSolver(inst, tour="nn"),
+    "LS": lambda inst: LocalSearch(inst, seed=0),
+    "LS(best)": lambda inst: LocalSearch(inst, policy="best"),
+    "ALNS": lambda inst: SOLVERS["ALNS"](inst, time_limit=None, max_iterations=200, seed=0),
+    "Decomposition": lambda inst: SOLVERS["Decomposition"](inst, cluster_size=15, workers=1),
+}
+
+
+@pytest.fixture(params=[(1, 30), (2, 40)], ids=["n30", "n40"])
+def instance(request):
+    seed, n = request.param
+    return Instance(n, 30, 25, seed=seed)
+
+
+@pytest.mark.parametrize("name", CONSTRUCTIVE)
+def test_solution_is_valid(name, instance):
+    solution = CONSTRUCTIVE[name](instance).solve()
+    assert_valid_solution(solution, instance)
+
+
+@pytest.mark.parametrize("name", ["NN", "Savings", "Split", "LS", "Decomposition"])
+def test_empty_instance(name):
+    solution = CONSTRUCTIVE[name](Instance(0, 3, 10)).solve()
+    assert solution.total_distance == 0.0
+    assert all(len(r) <= 2 for r in solution.routes.values())
+
+
+@pytest.mark.parametrize("initial", [NNSolver, SweepSolver])
+def test_local_search_improves_without_breaking(initial, instance):
+    start = initial(instance).solve()
+    improved = LocalSearch(instance).improve(start)
+    assert_valid_solution(improved, instance)
+    assert improved.total_distance <= start.total_distance + 1e-9
+    assert improved.meta["local_search"]["initial_distance"] == pytest.approx(start.total_distance)
+
+
+def test_mip_small_instance():
+    pytest.importorskip("pulp")
+    inst = Instance(6, 3, 25, seed=4)
+    solution = SOLVERS["MIP"](inst, formulation="two_index", time_limit=30).solve()
+    assert_valid_solution(solution, inst)
+    # 最適解は局所探索の解より悪くならない
+    assert solution.total_distance <= LocalSearch(inst).solve().total_distance + 1e-6
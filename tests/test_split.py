@@ -0,0 +1,71 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from instance import Instance
+from solver import SplitSolver
+
+from .helpers import assert_valid_solution, route_length
+
+
+def _brute_force(instance, tour, *, max_routes=None, max_customers=None) -> float:
+    """ツアーの区切り方を全て試した最小距離（実行可能な区切りがなければ inf）"""
+    n = len(tour)
+    best = math.inf
+    for k in range(n):
+        for inner in itertools.combinations(range(1, n), k):
+            cuts = [0, *inner, n]
+            if max_routes is not None and len(cuts) - 1 > max_routes:
+                continue
+            cost = 0.0
+            for a, b in zip(cuts, cuts[1:]):
+                part = tour[a:b]
+                if instance.demands[part].sum() > instance.capacity + 1e-9:
+                    break
+                if max_customers is not None and len(part) > max_customers:
+                    break
+                cost += route_length(instance.distances, [0, *part, 0])
+            else:
+                best = min(best, cost)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_split_matches_brute_force(seed):
+    instance = Instance(8, 8, 15, seed=seed)
+    tour = list(np.random.default_rng(seed).permutation(np.arange(1, 9)))
+    solution = SplitSolver(instance, tour=tour).solve()
+    assert_valid_solution(solution, instance)
+    assert solution.total_distance == pytest.approx(_brute_force(instance, tour))
+    # ルートは与えたツアーの順序を保つ
+    assert [c for vid in sorted(solution.routes) for c in solution.routes[vid] if c != 0] == tour
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_split_with_route_customer_limit(seed):
+    instance = Instance(7, 7, 100, seed=seed)
+    tour = list(range(1, 8))
+    solution = SplitSolver(instance, tour=tour, max_route_customers=2).solve()
+    assert_valid_solution(solution, instance)
+    assert all(len(r) - 2 <= 2 for r in solution.routes.values())
+    assert solution.total_distance == pytest.approx(_brute_force(instance, tour, max_customers=2))
+
+
+@pytest.mark.parametrize(("seed", "capacity"), [(0, 24), (7, 26), (0, 28), (1, 24), (6, 26)])
+def test_split_respects_fleet_size(seed, capacity):
+    # 制限なしの最適分割が車両数を超える場合は、車両数以内で最良の分割を選ぶ（なければ実行不可能）
+    instance = Instance(8, 2, capacity, seed=seed)
+    tour = list(range(1, 9))
+    expected = _brute_force(instance, tour, max_routes=2)
+    solution = SplitSolver(instance, tour=tour).solve()
+    assert solution.meta["split"]["fleet_limited"]
+    if math.isinf(expected):
+        assert not solution.is_feasible
+        assert solution.total_distance == pytest.approx(_brute_force(instance, tour))
+        return
+    assert solution.is_feasible
+    assert solution.num_vehicles_used() <= 2
+    assert_valid_solution(solution, instance)
+    assert solution.total_distance == pytest.approx(expected)